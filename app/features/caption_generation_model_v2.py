@@ -1,13 +1,16 @@
 import torch
 import torch.nn as nn
 from transformers import GPT2LMHeadModel, GPT2Tokenizer
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 import torch.nn.functional as nnf
 import os
+import time
+import numpy as np
 
 D = torch.device
 T = torch.Tensor
 CPU = torch.device('cpu')
+CAPTION_MAX_BATCH_SIZE = int(os.environ.get("CAPTION_MAX_BATCH_SIZE", 8))
 
 class CaptionGenerationModel():
     def __init__(self):
@@ -34,6 +37,23 @@ class CaptionGenerationModel():
         
         return generate2(self.model, self.tokenizer, embed=prefix_embed, entry_length=max_length)
 
+    def evaluate_batch(self, embeddings, max_length, max_batch: int = CAPTION_MAX_BATCH_SIZE) -> List[str]:
+        """
+        Generate captions for several CLIP embeddings, decoding up to max_batch of them together.
+        :param embeddings: CLIP embeddings, one row per image.
+        :param max_length: Maximum number of tokens per caption.
+        :param max_batch: Maximum number of captions decoded together.
+        :return: One caption per embedding.
+        """
+        embeddings = torch.tensor(np.asarray(embeddings)).float().reshape(-1, self.model.clip_project_input_size)
+        captions = []
+        for start in range(0, embeddings.shape[0], max_batch):
+            chunk = embeddings[start:start + max_batch]
+            with torch.no_grad():
+                prefix_embeds = self.model.clip_project(chunk).reshape(chunk.shape[0], self.prefix_length, -1)
+            captions.extend(generate_batch(self.model, self.tokenizer, prefix_embeds, entry_length=max_length))
+        return captions
+
 class MLP(nn.Module):
 
     def forward(self, x: T) -> T:
@@ -66,6 +86,7 @@ class ClipCaptionModel(nn.Module):
     def __init__(self, prefix_length: int, prefix_size: int = 512):
         super(ClipCaptionModel, self).__init__()
         self.prefix_length = prefix_length
+        self.clip_project_input_size = prefix_size
         self.gpt = GPT2LMHeadModel.from_pretrained('gpt2')
         self.gpt_embedding_size = self.gpt.transformer.wte.weight.shape[1]
         if prefix_length > 10:  # not enough memory
@@ -83,6 +104,23 @@ class ClipCaptionPrefix(ClipCaptionModel):
         self.gpt.eval()
         return self
     
+def top_k_top_p_candidates(logits: T, top_k: int = 50, top_p: float = 0.8, filter_value: float = -float("Inf")) -> Tuple[T, T]:
+    """
+    Select the candidate tokens of a decoding step with a top-k prefilter followed by nucleus (top-p) filtering.
+    Only the top_k logits are sorted instead of the whole vocabulary. Probabilities are normalized over the
+    full vocabulary, so the nucleus is the same as with a full sort as long as it fits in top_k tokens.
+    :param logits: Logits of the last position, shape (batch, vocab_size).
+    :return: Candidate logits, shape (batch, top_k), with the filtered ones set to filter_value, and their token indices.
+    """
+    top_logits, top_indices = torch.topk(logits, min(top_k, logits.shape[-1]), dim=-1)  # sorted descending
+    probs = torch.exp(top_logits - torch.logsumexp(logits, dim=-1, keepdim=True))
+    cumulative_probs = torch.cumsum(probs, dim=-1)
+    indices_to_remove = cumulative_probs > top_p
+    # Keep the token that crosses the threshold
+    indices_to_remove[..., 1:] = indices_to_remove[..., :-1].clone()
+    indices_to_remove[..., 0] = False
+    return top_logits.masked_fill(indices_to_remove, filter_value), top_indices
+
 def generate2(
         model,
         tokenizer,
@@ -94,13 +132,22 @@ def generate2(
         top_p=0.8,
         temperature=1.,
         stop_token: str = '.',
+        top_k: int = 50,
+        return_timings: bool = False,
 ):
+    """
+    Decode a caption from a prefix embedding or a prompt.
+    The attention keys and values of the prefix and of the generated tokens are cached, so each step
+    only runs the new token through GPT-2 instead of the whole sequence.
+    :param top_k: Number of candidates kept before nucleus filtering.
+    :param return_timings: Also return the prefill time and the time of each decoding step.
+    :return: Generated text, and a dictionary with timings if return_timings is set.
+    """
     model.eval()
-    generated_num = 0
     generated_list = []
     stop_token_index = tokenizer.encode(stop_token)[0]
-    filter_value = -float("Inf")
     device = next(model.parameters()).device
+    timings = {"prefill_seconds": 0.0, "step_seconds": []}
 
     with torch.no_grad():
 
@@ -114,34 +161,90 @@ def generate2(
 
                 generated = model.gpt.transformer.wte(tokens)
 
+            past_key_values = None
             for i in range(entry_length):
-
-                outputs = model.gpt(inputs_embeds=generated)
-                logits = outputs.logits
-                logits = logits[:, -1, :] / (temperature if temperature > 0 else 1.0)
-                sorted_logits, sorted_indices = torch.sort(logits, descending=True)
-                cumulative_probs = torch.cumsum(nnf.softmax(sorted_logits, dim=-1), dim=-1)
-                sorted_indices_to_remove = cumulative_probs > top_p
-                sorted_indices_to_remove[..., 1:] = sorted_indices_to_remove[
-                                                    ..., :-1
-                                                    ].clone()
-                sorted_indices_to_remove[..., 0] = 0
-
-                indices_to_remove = sorted_indices[sorted_indices_to_remove]
-                logits[:, indices_to_remove] = filter_value
-                next_token = torch.argmax(logits, -1).unsqueeze(0)
-                next_token_embed = model.gpt.transformer.wte(next_token)
+                step_start = time.perf_counter()
+                # The first step encodes the whole prefix, the next ones only the last token
+                outputs = model.gpt(inputs_embeds=generated, past_key_values=past_key_values, use_cache=True)
+                past_key_values = outputs.past_key_values
+                logits = outputs.logits[:, -1, :] / (temperature if temperature > 0 else 1.0)
+                candidate_logits, candidate_indices = top_k_top_p_candidates(logits, top_k, top_p)
+                next_token = candidate_indices.gather(-1, torch.argmax(candidate_logits, -1, keepdim=True))
+                generated = model.gpt.transformer.wte(next_token)
                 if tokens is None:
                     tokens = next_token
                 else:
                     tokens = torch.cat((tokens, next_token), dim=1)
-                generated = torch.cat((generated, next_token_embed), dim=1)
+
+                elapsed = time.perf_counter() - step_start
+                if i == 0:
+                    timings["prefill_seconds"] = elapsed
+                else:
+                    timings["step_seconds"].append(elapsed)
                 if stop_token_index == next_token.item():
                     break
 
-            output_list = list(tokens.squeeze().cpu().numpy())
+            output_list = list(tokens.squeeze(0).cpu().numpy())
             output_text = tokenizer.decode(output_list)
             generated_list.append(output_text)
 
+    if return_timings:
+        return generated_list[0], timings
     return generated_list[0]
 
+def select_cache_rows(past_key_values, indices: T):
+    """
+    Keep only the given batch rows of a GPT-2 attention cache, legacy tuple or Cache object.
+    """
+    if hasattr(past_key_values, "batch_select_indices"):
+        past_key_values.batch_select_indices(indices)
+        return past_key_values
+    return tuple(tuple(tensor.index_select(0, indices) for tensor in layer) for layer in past_key_values)
+
+def generate_batch(
+        model,
+        tokenizer,
+        embeds: T,
+        entry_length=10,  # maximum number of words
+        top_p=0.8,
+        temperature=1.,
+        stop_token: str = '.',
+        top_k: int = 50,
+) -> List[str]:
+    """
+    Decode captions for a batch of prefix embeddings together, with the same decoding as generate2.
+    The prefixes all have prefix_length positions, so the rows stay aligned without padding. Rows that
+    generate the stop token are removed from the batch and from the attention cache, so the remaining
+    steps only run the unfinished captions.
+    :param embeds: Prefix embeddings, shape (batch, prefix_length, embedding_size).
+    :return: One caption per row.
+    """
+    model.eval()
+    stop_token_index = tokenizer.encode(stop_token)[0]
+    batch_size = embeds.shape[0]
+    tokens = [[] for _ in range(batch_size)]
+    active_rows = torch.arange(batch_size)
+    generated = embeds
+    past_key_values = None
+
+    with torch.no_grad():
+        for i in range(entry_length):
+            outputs = model.gpt(inputs_embeds=generated, past_key_values=past_key_values, use_cache=True)
+            logits = outputs.logits[:, -1, :] / (temperature if temperature > 0 else 1.0)
+            candidate_logits, candidate_indices = top_k_top_p_candidates(logits, top_k, top_p)
+            next_token = candidate_indices.gather(-1, torch.argmax(candidate_logits, -1, keepdim=True))
+            for row, token in zip(active_rows.tolist(), next_token[:, 0].tolist()):
+                tokens[row].append(token)
+
+            unfinished = next_token[:, 0] != stop_token_index
+            if not unfinished.any():
+                break
+            past_key_values = outputs.past_key_values
+            if not unfinished.all():
+                keep = unfinished.nonzero(as_tuple=True)[0]
+                active_rows = active_rows[keep]
+                next_token = next_token[keep]
+                past_key_values = select_cache_rows(past_key_values, keep)
+            generated = model.gpt.transformer.wte(next_token)
+
+    return [tokenizer.decode(row_tokens) for row_tokens in tokens]
@@ -23,6 +23,21 @@ class ClipEmbedding(Embedding):
 
         # outputs = outputs / tf.norm(outputs, ord='euclidean', axis=-1, keepdims=True) #L2 normalization
         return outputs
+
+    def embed_images(self, images: list, max_batch_size: int = 32):
+        """
+        Generate embeddings for a list of images, running the model on batches of at most max_batch_size images.
+        :param images: List of input images.
+        :param max_batch_size: Maximum number of images per forward pass.
+        :return: Tensor with one embedding per image.
+        """
+        if not images:
+            return tf.zeros((0, self.embedding_dimension))
+        outputs = [
+            self.transform(images[start:start + max_batch_size], input_type='image')
+            for start in range(0, len(images), max_batch_size)
+        ]
+        return tf.concat(outputs, axis=0)
     
     def normalize(self, embedding: np.ndarray) -> np.ndarray:
         norm_factor = tf.norm(embedding, ord='euclidean', axis=-1, keepdims=True)
@@ -1,34 +1,40 @@
-from fastapi import FastAPI, File, UploadFile, Query, Form, HTTPException, Depends, Form, Security, Request
+from fastapi import FastAPI, File, UploadFile, Query, Form, HTTPException, Depends, Form, Security, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.openapi.models import APIKey
 from fastapi.openapi.models import SecuritySchemeType
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from PIL import Image
-from typing import List, Optional, Union
+from types import SimpleNamespace
+from typing import List, Literal, Optional, Union
 import os
 import re
+import mimetypes
+import redis
 from jose import jwt
 
 
-from pdfminer.high_level import extract_text
-from docx import Document 
-
 from app.services.image_description_service import ImageDescriptionService
 from app.services.embedding_service import EmbeddingService
 from app.services.search_service import SearchService
-from app.services.photos_service import PhotosService
+from app.services.faiss_index_service import FaissIndexService
+from app.services.photos_service import PhotosService, PhotosNotFoundError
 from app.services.events_service import EventsService
 from app.services.feedback_service import FeedbackService
 from app.services.filter_service import FilteringService
 # from app.services.authorization_service import AuthorizationService
 from app.services.post_service import PostService, PostCreateRequest, PostUpdateRequest
-from app.services.database_service import DatabaseService
+from app.services.database_service import get_connection_pool
 from app.services.upload_service import UploadService
 from app.services.context_service import ContextService
 from app.services.content_generation_service import ContentGenerationService, CaptionRequest    
 from app.services.auth_service import AuthService
+from app.services.model_registry import model_registry, current_rss
+from app.services.executor_service import ExecutorService
+from app.services.job_service import JobService, JobContext
+from app.services.rendition_service import RenditionService
+from app.services.file_serving_service import FileServingService
+from app.services.event_teardown_service import EventTeardownService, EVENT_TABLES
 from app.schemas.auth import UserRegisterRequest, UserLoginRequest, TokenResponse   
 
 from pydantic import BaseModel
@@ -51,6 +57,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # the photo listing returns the cursor of its next page in a header
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -58,19 +66,68 @@ IMAGE_DIR = "uploads/images"
 MODEL_NAME = 'Qwen/Qwen2.5-Coder-32B-Instruct'
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 ALGORITHM = "HS256"
+# 'pgvector' searches in the database, 'faiss' keeps in-memory per-event indexes in each worker
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "pgvector")
+# describe uploaded photos in the background so caption generation doesn't wait for ClipCap
+PRECOMPUTE_IMAGE_DESCRIPTIONS = os.environ.get("PRECOMPUTE_IMAGE_DESCRIPTIONS", "true").lower() == "true"
+# generate the thumbnail and medium renditions of uploaded photos in the background instead of on first request
+PRECOMPUTE_RENDITIONS = os.environ.get("PRECOMPUTE_RENDITIONS", "true").lower() == "true"
+# background job worker threads per API process, 0 when jobs run in separate worker.py processes
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+# photos described and rendered between two heartbeats of a background upload
+JOB_POST_PROCESSING_BATCH_SIZE = int(os.environ.get("JOB_POST_PROCESSING_BATCH_SIZE", 32))
 
 # define services
+# models are resolved from the shared model registry, so the services below share one copy of each model
 image_description_service = ImageDescriptionService()
 embedding_service = EmbeddingService()
-search_service = SearchService()
-photos_service = PhotosService()
+faiss_index_service = FaissIndexService() if SEARCH_BACKEND == "faiss" else None
+search_service = SearchService(index=faiss_index_service)
+rendition_service = RenditionService(image_dir=IMAGE_DIR)
+file_serving_service = FileServingService()
+photos_service = PhotosService(
+    embedding_service=embedding_service, search_index=faiss_index_service, rendition_service=rendition_service
+)
 events_service = EventsService()
+event_teardown_service = EventTeardownService(search_index=faiss_index_service)
 feedback_service = FeedbackService()
 upload_service = UploadService(base_upload_dir="uploads", remote_server_url="http://127.0.0.1:8000/upload")
-context_service = ContextService()
-content_generation_service = ContentGenerationService(model_name=MODEL_NAME)
+context_service = ContextService(embedding_service=embedding_service)
+content_generation_service = ContentGenerationService(
+    model_name=MODEL_NAME,
+    context_service=context_service,
+    photos_service=photos_service,
+    image_description_service=image_description_service,
+    embedding_service=embedding_service
+)
 filtering_service = FilteringService(photos_service=photos_service)
 auth_service = AuthService()
+# blocking database, inference and HTTP calls run on these executors instead of the event loop
+executor_service = ExecutorService()
+# photo and document ingestion jobs, handlers are registered with the endpoints below
+job_service = JobService()
+
+@app.on_event("startup")
+def preload_models():
+    """
+    Load the models once at startup so the first requests don't pay for it.
+    """
+    if os.environ.get("PRELOAD_MODELS", "true").lower() != "true":
+        return
+    embedding_service.img_model
+    embedding_service.txt_model
+    image_description_service.caption_generation_model
+
+@app.on_event("startup")
+def start_job_workers():
+    if JOB_WORKERS > 0:
+        job_service.start_workers(JOB_WORKERS)
+
+@app.on_event("shutdown")
+def close_connection_pool():
+    job_service.stop_workers()
+    executor_service.shutdown(wait=False)
+    get_connection_pool().closeall()
 
 @app.middleware("http")
 async def enforce_authentication(request: Request, call_next):
@@ -136,14 +193,9 @@ app.openapi = custom_openapi
 
 
 ### DEPENDENCIES
-# Dependency to provide a database connection
-def get_database_service():
-    with DatabaseService() as db_service:
-        yield db_service
-
-# Dependency to provide PostService with a DatabaseService instance
-def get_post_service(db: DatabaseService = Depends(get_database_service)):
-    return PostService(db=db)
+# Dependency to provide PostService, its methods borrow a database connection only while they query
+def get_post_service():
+    return PostService()
 
 # Dependency to validate the token
 def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security_scheme)):
@@ -205,48 +257,76 @@ class Photo(BaseModel):
         "/events/{eventId}/photos",
         tags=["photos"],
         summary="Get all photos for an event",
-        description="Get all photos for an event by providing the event ID.",
+        description="Get the photos of an event by providing the event ID. Results are paginated: pass the X-Next-Cursor header of a response as cursor to get the next page.",
         response_description="List of photos"
          )
-async def serve_image(
+async def list_photos(
     eventId: int,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of photos to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    sort: Literal["id", "-id", "created_at", "-created_at", "sharpness", "-sharpness"] = Query("id", description="Sort key, '-' for descending order"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'id,thumbnail_url'"),
     _: dict = Depends(require_authentication)
     ):
     """
-    Get all the photos for a given event
+    Get the photos of a given event from the images table, one page at a time.
     """
-    dir = os.path.join(IMAGE_DIR, str(eventId))
-    if not os.path.exists(dir):
+    try:
+        photos, next_cursor = await executor_service.run_db(
+            photos_service.list_photos,
+            eventId,
+            f"http://localhost:8000/events/{eventId}/photos",
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not photos and cursor is None:
         return JSONResponse(
             status_code=404,
             content={"error": f"No images found for event ID {eventId}."}
         )
-    images_names = os.listdir(dir)
-    #map the image names to Photo objects
-    images = [{"id": int(name.split('.')[0]), "name": name, "url": f"http://localhost:8000/events/{eventId}/photos/{name}", "resolution": "1920x1080"} for name in images_names]
-    return images
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return JSONResponse(content=photos, headers=headers)
 
 @app.get(
         "/events/{eventId}/photos/{photoName}",
         tags=["photos"],
         summary="Get a specific photo for an event",
-        description="Get a specific photo for an event by providing the event ID and photo name.",
+        description="Get a specific photo for an event by providing the event ID and photo name. Use size=thumb or size=medium for a downscaled rendition.",
         response_description="Photo"
          )
 async def serve_image(
     eventId: int, 
-    photoName: str
+    photoName: str,
+    request: Request,
+    size: Literal["original", "thumb", "medium"] = Query("original", description="Original file or a downscaled rendition")
     ):
     """
-    Get a specific photo for a given event
+    Get a specific photo for a given event.
+    Photos are served with content-hash ETags and immutable cache headers, conditional requests get a 304
+    and byte ranges are supported.
     """
-    dir = os.path.join(IMAGE_DIR, str(eventId))
-    if not os.path.exists(dir):
-        return JSONResponse(status_code=404, content={"error": "No images found for the event."})
-    image_path = os.path.join(dir, photoName)
-    if not os.path.exists(image_path):
+    if size != "original":
+        # Generated on the first request if the upload didn't already
+        path = await executor_service.run_rendition(rendition_service.get_rendition, eventId, photoName, size)
+        media_type = rendition_service.content_type
+        filename = f"{os.path.splitext(photoName)[0]}-{size}{rendition_service.extension}"
+    else:
+        path = os.path.join(IMAGE_DIR, str(eventId), os.path.basename(photoName))
+        # Photos are stored in their uploaded format
+        media_type = mimetypes.guess_type(photoName)[0] or "application/octet-stream"
+        filename = photoName
+
+    validators = await executor_service.run_io(file_serving_service.validators, path) if path else None
+    if validators is None:
+        if not await executor_service.run_io(os.path.exists, os.path.join(IMAGE_DIR, str(eventId))):
+            return JSONResponse(status_code=404, content={"error": "No images found for the event."})
         return JSONResponse(status_code=404, content={"error": "Image not found."})
-    return FileResponse(image_path, media_type="image/jpeg", filename=photoName)
+    stat_result, etag = validators
+    return file_serving_service.response(request.headers, path, stat_result, etag, media_type, filename)
 
 @app.post(
         "/events/{eventId}/photos",
@@ -257,9 +337,11 @@ async def serve_image(
          )
 async def upload_images(
     eventId: int,
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     apply_filter: bool = Form(False),
     threshold: float = Form(100.0),
+    background: bool = Form(False),
     _: dict = Depends(require_role("photographer"))
     ):
     """
@@ -268,30 +350,42 @@ async def upload_images(
     :param files: List of image files to upload.
     :param apply_filter: Flag to apply filtering for image quality.
     :param threshold: Threshold for image quality filtering.
-    :return: Success message and uploaded image IDs.
+    :param background: Process the images in a background job and return its ID right away, see GET /jobs/{job_id}.
+    :return: Success message and uploaded image IDs, or the job ID.
     """
+    if background:
+        job_id = job_service.new_job_id()
+        paths = await executor_service.run_io(upload_service.save_incoming, files, job_id)
+        await executor_service.run_db(
+            job_service.enqueue,
+            "photos",
+            {
+                "event_id": eventId,
+                "apply_filter": apply_filter,
+                "files": [{"path": path, "filename": file.filename} for path, file in zip(paths, files)],
+            },
+            total_items=len(files),
+            job_id=job_id
+        )
+        return JSONResponse(status_code=202, content={"job_id": job_id, "total_images": len(files), "event_id": eventId})
+
     try:
         if apply_filter:
-            uploaded_image_ids, sharp_count, blurred_count = filtering_service.process_and_upload_images(
+            uploaded_image_ids, sharp_count, blurred_count = await executor_service.run_ingestion(
+                filtering_service.process_and_upload_images,
                 event_id=eventId, files=files, threshold=threshold
             )
         else:
             # If no filtering is applied, upload all images 
-            uploaded_image_ids = []
-            for file in files:
-                try:
-                    image = Image.open(file.file)
-                    image_id = photos_service.add_photo(image, eventId)
-                    uploaded_image_ids.append(image_id)
-                except Exception as e:
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Error processing file {file.filename}: {str(e)}"
-                    )
-
+            uploaded_image_ids = await executor_service.run_ingestion(upload_unfiltered_images, eventId, files)
             sharp_count = len(uploaded_image_ids)
             blurred_count = 0
 
+        if PRECOMPUTE_IMAGE_DESCRIPTIONS and uploaded_image_ids:
+            background_tasks.add_task(precompute_image_descriptions, eventId, uploaded_image_ids)
+        if PRECOMPUTE_RENDITIONS and uploaded_image_ids:
+            background_tasks.add_task(precompute_renditions, eventId, uploaded_image_ids)
+
         return {
             "message": "Images processed and uploaded successfully.",
             "total_images": len(files),
@@ -309,36 +403,165 @@ async def upload_images(
             detail=f"Unexpected error occurred: {str(e)}"
         )
 
+def upload_unfiltered_images(event_id: int, files: List[UploadFile]) -> List[int]:
+    """
+    Upload all images without quality filtering.
+    :param event_id: Event ID for the images.
+    :param files: List of image files to upload.
+    :return: Uploaded image IDs.
+    """
+    # images are decoded at the embedding resolution, embedded in batches and stored as uploaded in one transaction
+    result = filtering_service.pipeline.run(
+        event_id=event_id, files=files, blur_threshold=filtering_service.image_filter.threshold, apply_filter=False
+    )
+    if result["errors"]:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Errors occurred during processing: {result['errors']}"
+        )
+    return result["uploaded_image_ids"]
+
+async def precompute_image_descriptions(event_id: int, image_ids: List[int]):
+    """
+    Describe freshly uploaded images so caption generation can reuse the descriptions.
+    :param event_id: Event ID of the images.
+    :param image_ids: Uploaded image IDs.
+    """
+    try:
+        # Decoding a description per image takes minutes for large uploads, the background executor keeps it
+        # from delaying search and login on the cpu executor
+        generated = await executor_service.run_background(
+            image_description_service.precompute_descriptions, event_id, image_ids
+        )
+        print(f"[DESCRIPTIONS] Generated {generated} image descriptions")
+    except Exception as e:
+        # Descriptions are generated on demand when caption generation needs them
+        print(f"[DESCRIPTIONS] Failed to precompute image descriptions: {e}")
+
+async def precompute_renditions(event_id: int, image_ids: List[int]):
+    """
+    Generate the renditions of freshly uploaded images so galleries don't wait for them.
+    :param event_id: Event ID of the images.
+    :param image_ids: Uploaded image IDs.
+    """
+    try:
+        generated = await executor_service.run_rendition(rendition_service.generate_renditions, event_id, image_ids)
+        print(f"[RENDITIONS] Generated {generated} renditions")
+    except Exception as e:
+        # Missing renditions are generated on first request
+        print(f"[RENDITIONS] Failed to precompute renditions: {e}")
+
+def run_photos_job(context: JobContext) -> dict:
+    """
+    Ingest the images saved for a background upload and describe them.
+    The ingestion result is checkpointed once committed, retries only redo the post-processing.
+    """
+    params = context.params
+    result = context.checkpoint
+    if result is None:
+        files = [SimpleNamespace(filename=file["filename"], file=open(file["path"], "rb")) for file in params["files"]]
+        try:
+            result = filtering_service.pipeline.run(
+                event_id=params["event_id"],
+                files=files,
+                blur_threshold=filtering_service.image_filter.threshold,
+                apply_filter=params["apply_filter"],
+                on_item=context.item_done,
+                on_commit=lambda image_ids: context.save_checkpoint({"uploaded_image_ids": image_ids})
+            )
+        finally:
+            for file in files:
+                file.file.close()
+        result = {
+            "uploaded_image_ids": result["uploaded_image_ids"],
+            "sharp_count": result["sharp_count"],
+            "blurred_count": result["blurred_count"],
+            "stats": result["stats"],
+        }
+        context.save_checkpoint(result)
+    else:
+        print(f"[JOB] {context.job_id} already ingested {len(result['uploaded_image_ids'])} images, resuming post-processing")
+        for image_id in result["uploaded_image_ids"]:
+            context.item_done({"status": "uploaded", "image_id": image_id})
+
+    uploaded_image_ids = result["uploaded_image_ids"]
+    # Both steps skip the images already done, in batches so the job keeps reporting progress
+    for start in range(0, len(uploaded_image_ids), JOB_POST_PROCESSING_BATCH_SIZE):
+        batch_ids = uploaded_image_ids[start:start + JOB_POST_PROCESSING_BATCH_SIZE]
+        if PRECOMPUTE_IMAGE_DESCRIPTIONS:
+            try:
+                image_description_service.precompute_descriptions(params["event_id"], batch_ids)
+            except Exception as e:
+                print(f"[DESCRIPTIONS] Failed to precompute image descriptions: {e}")
+        if PRECOMPUTE_RENDITIONS:
+            try:
+                rendition_service.generate_renditions(params["event_id"], batch_ids)
+            except Exception as e:
+                print(f"[RENDITIONS] Failed to precompute renditions: {e}")
+        context.heartbeat()
+    upload_service.remove_incoming(context.job_id)
+    return {
+        "event_id": params["event_id"],
+        "uploaded_image_ids": uploaded_image_ids,
+        "sharp_count": result.get("sharp_count", len(uploaded_image_ids)),
+        "blurred_count": result.get("blurred_count"),
+        "stats": result.get("stats"),
+    }
+
+job_service.register_handler(
+    "photos", run_photos_job, cleanup=lambda context: upload_service.remove_incoming(context.job_id)
+)
+
 @app.delete("/events/{eventId}/photos",
             tags=["photos"],
             summary="Delete selected images from an event",
-            description="Delete selected images from an event by providing a list of photo IDs.",
-            response_description="Success message"
+            description="Delete selected images from an event by providing a list of photo IDs. The rows are deleted in one transaction, files are removed in the background.",
+            response_description="Success message, deleted IDs and IDs not found in the event"
             )
 async def delete_images(
     eventId: int, 
     photoIds: List[int],
+    background_tasks: BackgroundTasks,
     _: dict = Depends(require_role("photographer", "content manager"))
 ):
-    for photoId in photoIds:
-        photos_service.delete_photo(str(eventId), photoId)
-    return {"message": "Images deleted successfully"}
+    deleted_photos, not_found_ids = await executor_service.run_db(photos_service.delete_photos, eventId, photoIds)
+    if deleted_photos:
+        background_tasks.add_task(remove_photo_files, eventId, deleted_photos)
+    return {
+        "message": "Images deleted successfully",
+        "deleted_ids": [photo["id"] for photo in deleted_photos],
+        "not_found_ids": not_found_ids
+    }
+
+async def remove_photo_files(event_id: int, deleted_photos: List[dict]):
+    """
+    Remove the files and renditions of deleted photos after the response is sent.
+    """
+    try:
+        await executor_service.run_io(photos_service.remove_photo_files, event_id, deleted_photos)
+    except Exception as e:
+        # The rows are gone but the files are still served, until reconcile_orphans.py --purge removes them
+        print(f"[DELETE] Failed to remove files of deleted photos {[photo['id'] for photo in deleted_photos]}: {e}")
 
 @app.get(
         "/events/{eventId}/photos/search/",
         tags=["photos"],
         summary="Search images by text",
-        description="Search images by text using the provided query and threshold.",
+        description="Search images by text using the provided query and threshold. Results are sorted by similarity and can be paginated with limit and offset.",
         response_description="List of image IDs"
         )
 async def search_images_by_text(
     eventId: int, 
     text: str, 
     threshold: float = Query(0.5),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of image IDs to return"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
     _: dict = Depends(require_authentication)
     ):
-    text_embedding_np, _ = embedding_service.embed_text([text])
-    results = search_service.search(eventId, text_embedding_np, threshold)
+    text_embedding_np = await executor_service.run_cpu(embedding_service.embed_text_query, text)
+    results = await executor_service.run_db(
+        search_service.search, eventId, text_embedding_np, threshold, limit=limit, offset=offset
+    )
     results_list = [int(item) for item in results]
     return results_list
 
@@ -360,7 +583,7 @@ async def add_event(
     event: Event,
     _: dict = Depends(require_role("content manager"))
 ):
-    event_id = events_service.add_event(event)
+    event_id = await executor_service.run_db(events_service.add_event, event)
     return {"event_id": event_id}
 
 @app.get(
@@ -374,7 +597,7 @@ async def get_all_events(
     org_id: int,
     _: dict = Depends(require_authentication)
     ):
-    events = events_service.get_all_events(org_id)
+    events = await executor_service.run_db(events_service.get_all_events, org_id)
     return events
 
 @app.get(
@@ -389,23 +612,45 @@ async def get_event(
     org_id: int,
     _: dict = Depends(require_authentication)
     ):
-    event = events_service.get_event(org_id, event_id)
+    event = await executor_service.run_db(events_service.get_event, org_id, event_id)
     return event
 
 @app.delete(
             "/events/{event_id}",
             tags=["events"],
             summary="Delete an event",
-            description="Delete an event by providing the event ID and organization ID.",
-            response_description="Success message"
+            description="Delete an event by providing the event ID and organization ID. Its photos, context, posts, feedback and files are deleted by a background job, see GET /jobs/{job_id}.",
+            response_description="Success message and teardown job ID"
             )
 async def delete_event(
     event_id: int, 
     org_id: int,
+    background_tasks: BackgroundTasks,
     _: dict = Depends(require_role("content manager"))
     ):
-    events_service.delete_event(org_id, event_id)
-    return {"message": "Event deleted successfully"}
+    deleted = await executor_service.run_db(events_service.delete_event, org_id, event_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Event {event_id} not found.")
+    try:
+        job_id = await executor_service.run_db(
+            job_service.enqueue, "event_teardown", {"event_id": event_id}, total_items=len(EVENT_TABLES) + 1
+        )
+    except redis.RedisError as e:
+        # Without the queue the teardown runs in this process, without progress reporting
+        print(f"[TEARDOWN] Failed to enqueue teardown of event {event_id}: {e}")
+        background_tasks.add_task(executor_service.run_db, event_teardown_service.teardown, event_id)
+        job_id = None
+    return {"message": "Event deleted successfully", "teardown_job_id": job_id}
+
+def run_event_teardown_job(context: JobContext) -> dict:
+    """
+    Delete the rows and files of a deleted event.
+    """
+    return event_teardown_service.teardown(
+        context.params["event_id"], on_step=context.item_done, on_batch=context.heartbeat
+    )
+
+job_service.register_handler("event_teardown", run_event_teardown_job)
     
 
 class EventContext(BaseModel):
@@ -424,6 +669,7 @@ async def upload_context(
     context_type: str = Query(..., description="Type of context to add: 'document' or 'main context'"),
     files: Optional[Union[List[UploadFile], str]] = File(None),
     text: Optional[str] = Form(None),
+    background: bool = Query(False, description="Process the context in a background job and return its ID right away"),
     _: dict = Depends(require_role("content manager"))
     ):
     """
@@ -432,7 +678,8 @@ async def upload_context(
     :param context_type: Type of context to add. It can be 'document' or 'main context'.
     :param files: List of files to upload.
     :param text: Textual context to add.
-    :return: Success message and event ID.
+    :param background: Process the context in a background job, see GET /jobs/{job_id}.
+    :return: Success message and event ID, or the job ID.
     """
     try:
         if isinstance(files, str):
@@ -443,14 +690,19 @@ async def upload_context(
                     status_code=422,
                     detail="Files are required for 'document' context type."
                 )
-            context_service.process_documents(event_id, files)
+            if background:
+                paths = await executor_service.run_io(upload_service.upload_documents, files, event_id)
+                return await enqueue_context_job(event_id, {"event_id": event_id, "paths": paths}, len(paths))
+            await executor_service.run_ingestion(context_service.process_documents, event_id, files)
         elif context_type == "main context":
             if not text:
                 raise HTTPException(
                     status_code=422,
                     detail="Text is required for 'main context' type."
                 )
-            context_service.add_context(event_id, text, "main_context")
+            if background:
+                return await enqueue_context_job(event_id, {"event_id": event_id, "text": text}, 1)
+            await executor_service.run_ingestion(context_service.add_context, event_id, text, "main_context")
         else:
             raise HTTPException(
                 status_code=400,
@@ -461,6 +713,27 @@ async def upload_context(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+async def enqueue_context_job(event_id: int, params: dict, total_items: int) -> JSONResponse:
+    job_id = await executor_service.run_db(job_service.enqueue, "context", params, total_items=total_items)
+    return JSONResponse(status_code=202, content={"job_id": job_id, "event_id": event_id})
+
+def run_context_job(context: JobContext) -> dict:
+    """
+    Store the documents or the text of a background context upload.
+    Documents are already saved in the documents directory, so retries process the same files.
+    """
+    params = context.params
+    if "paths" in params:
+        context_service.process_document_files(
+            params["event_id"], params["paths"], on_item=context.item_done, on_batch=context.heartbeat
+        )
+    else:
+        context_service.add_context(params["event_id"], params["text"], "main_context", on_batch=context.heartbeat)
+        context.item_done({"status": "stored"})
+    return {"event_id": params["event_id"]}
+
+job_service.register_handler("context", run_context_job)
+
 @app.get(
         "/events/{event_id}/context",
         tags=["context"],
@@ -480,9 +753,7 @@ async def get_event_context_by_event_id(
     """
     try:
         # Fetch contexts from the database using the event ID
-        db = DatabaseService()
-        contexts = db.read_records("contexts", {"event_id": event_id})
-        db.close()
+        contexts = await executor_service.run_db(context_service.get_context_by_event_id, event_id)
 
         if not contexts:
             raise HTTPException(status_code=404, detail=f"No contexts found for event ID {event_id}")
@@ -509,7 +780,8 @@ async def create_post(
     """
     Endpoint to create a new post.
     """
-    post_id = post_service.create_post(
+    post_id = await executor_service.run_db(
+        post_service.create_post,
         event_id=request.event_id,
         caption=request.caption,
         image_ids=request.image_ids,
@@ -533,7 +805,7 @@ async def get_post(
     """
     Endpoint to get a post by its ID.
     """
-    post = post_service.get_post(post_id)
+    post = await executor_service.run_db(post_service.get_post, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     return post
@@ -554,7 +826,7 @@ async def get_posts_by_event(
     """
     Endpoint to get all posts for a given event.
     """
-    posts = post_service.get_posts_by_event(event_id)
+    posts = await executor_service.run_db(post_service.get_posts_by_event, event_id)
     return posts
 
 @app.put(
@@ -574,7 +846,8 @@ async def update_post(
     """
     Endpoint to update an existing post.
     """
-    success = post_service.update_post(
+    success = await executor_service.run_db(
+        post_service.update_post,
         post_id=post_id,
         event_id=request.event_id,
         caption=request.caption,
@@ -600,7 +873,7 @@ async def delete_post(
     """
     Endpoint to delete a post by its ID.
     """
-    success = post_service.delete_post(post_id)
+    success = await executor_service.run_db(post_service.delete_post, post_id)
     if not success:
         raise HTTPException(status_code=404, detail="Post not found or not deleted")
     return {"message": "Post deleted successfully"}
@@ -631,7 +904,7 @@ async def generate_post_caption(
     """
     try:
         # Fetch the post details to retrieve the associated event ID
-        post = post_service.get_post(post_id)
+        post = await executor_service.run_db(post_service.get_post, post_id)
         if not post:
             raise HTTPException(status_code=404, detail=f"Post with ID {post_id} not found.")
 
@@ -639,9 +912,12 @@ async def generate_post_caption(
         image_ids = post["image_ids"]
 
         # Generate descriptions for all images associated with the post
-        image_descriptions = content_generation_service.get_image_descriptions(event_id, image_ids)
-        # Generate the post caption
-        result = content_generation_service.generate_post_caption(
+        image_descriptions = await executor_service.run_cpu(
+            content_generation_service.get_image_descriptions, event_id, image_ids
+        )
+        # Generate the post caption, most of its time is spent waiting on the inference API
+        result = await executor_service.run_http(
+            content_generation_service.generate_post_caption,
             image_description=image_descriptions,
             user_prompt=request.user_prompt,
             event_id=event_id,
@@ -652,6 +928,8 @@ async def generate_post_caption(
         return result
     except HTTPException as http_exc:
         raise http_exc
+    except PhotosNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating caption: {str(e)}")
 
@@ -673,7 +951,7 @@ async def add_feedback(
     feedback: Feedback,
     _: dict = Depends(require_role("content reviewer"))
     ):
-    feedback_id = feedback_service.add_feedback(event_id, post_id, feedback)
+    feedback_id = await executor_service.run_db(feedback_service.add_feedback, event_id, post_id, feedback)
     return {"feedback_id": feedback_id}
 
 @app.get(
@@ -688,7 +966,7 @@ async def get_feedback(
     post_id: int,
     _: dict = Depends(require_role("content manager", "content reviewer"))
     ):
-    feedback = feedback_service.get_feedback(event_id, post_id)
+    feedback = await executor_service.run_db(feedback_service.get_feedback, event_id, post_id)
     return feedback
 
 # @app.put("/events/{event_id}/posts/{post_id}/feedback/{feedback_id}")
@@ -709,9 +987,80 @@ async def delete_feedback(
     feedback_id: int,
     _: dict = Depends(require_role("content reviewer"))
     ):
-    feedback_service.delete_feedback(event_id, post_id, feedback_id)
+    await executor_service.run_db(feedback_service.delete_feedback, event_id, post_id, feedback_id)
     return {"message": "Feedback deleted successfully"}
 
+## JOBS ENDPOINTS
+@app.get(
+        "/jobs/{job_id}",
+        tags=["jobs"],
+        summary="Get a background job",
+        description="Get the status, progress, per-item results and throughput of a background upload job.",
+        response_description="Job status and results"
+        )
+async def get_job(
+    job_id: str,
+    _: dict = Depends(require_authentication)
+    ):
+    job = await executor_service.run_db(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+## SYSTEM ENDPOINTS
+@app.get(
+        "/models",
+        tags=["system"],
+        summary="Get loaded models",
+        description="Get the models loaded in this worker process with their reference counts and memory cost.",
+        response_description="Loaded models and process memory"
+        )
+async def get_loaded_models(
+    _: dict = Depends(require_authentication)
+    ):
+    return {
+        "process_rss_bytes": current_rss(),
+        "models": model_registry.loaded_models()
+    }
+
+@app.get(
+        "/db/pool",
+        tags=["system"],
+        summary="Get database pool metrics",
+        description="Get the size, usage and wait time metrics of the database connection pool of this worker process.",
+        response_description="Connection pool metrics"
+        )
+async def get_database_pool_metrics(
+    _: dict = Depends(require_authentication)
+    ):
+    return get_connection_pool().metrics()
+
+@app.get(
+        "/search/index",
+        tags=["system"],
+        summary="Get search index statistics",
+        description="Get the events loaded in the in-memory search index of this worker process, its memory usage and cache statistics.",
+        response_description="Search index statistics"
+        )
+async def get_search_index_stats(
+    _: dict = Depends(require_authentication)
+    ):
+    if faiss_index_service is None:
+        return {"backend": SEARCH_BACKEND}
+    return {"backend": SEARCH_BACKEND, **faiss_index_service.stats()}
+
+@app.get(
+        "/search/cache",
+        tags=["system"],
+        summary="Get text embedding cache statistics",
+        description="Get the hit and miss counters of the text query embedding cache of this worker process.",
+        response_description="Text embedding cache statistics"
+        )
+async def get_text_embedding_cache_stats(
+    _: dict = Depends(require_authentication)
+    ):
+    return embedding_service.text_cache.metrics()
+
 ### AUTH ENDPOINTS
 @app.post(
           "/auth/register", 
@@ -728,7 +1077,8 @@ async def register(user_data: UserRegisterRequest):
     :return: Access token for the registered user
     """
     try:
-        user = auth_service.register_user(user_data)
+        # password hashing is CPU bound
+        user = await executor_service.run_cpu(auth_service.register_user, user_data)
         access_token = auth_service.create_access_token(
             data={"sub": user.email},
             roles=user.roles
@@ -752,7 +1102,7 @@ async def login(login_data: UserLoginRequest):
     :param login_data: User login data
     :return: Access token for the authenticated
     """
-    token = auth_service.authenticate_user(login_data)
+    token = await executor_service.run_cpu(auth_service.authenticate_user, login_data)
     if not token:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     return token
@@ -776,7 +1126,7 @@ async def logout(
     """
     try:
         token = authorization.credentials
-        auth_service.logout_user(token)
+        await executor_service.run_db(auth_service.logout_user, token)
         return {"message": "Successfully logged out"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -10,12 +10,14 @@ import os
 SECRET_KEY = "secret"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 
 class AuthService:
     def __init__(self):
         try:
             self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-            self.redis_client = redis.StrictRedis(host="localhost", port=6379, db=0, decode_responses=True)
+            self.redis_client = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
             self.redis_client.ping() 
         except redis.ConnectionError as e:
             raise Exception("Failed to connect to Redis server. Ensure Redis is running.")
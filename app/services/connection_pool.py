@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out of the pool in time."""
+
+
+class _PooledConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of database connections.
+    Keeps up to `max_size` connections open and allows `max_overflow` extra connections under load,
+    which are closed as soon as they are returned. Callers wait up to `timeout` seconds for a
+    connection when the pool is exhausted.
+    """
+
+    def __init__(
+            self,
+            connect: Callable[[], Any],
+            max_size: int = 10,
+            max_overflow: int = 5,
+            timeout: float = 30.0,
+            max_lifetime: float = 1800.0,
+            health_check_interval: float = 30.0
+            ):
+        """
+        Initialize the connection pool.
+        :param connect: Callable that opens a new database connection.
+        :param max_size: Number of connections kept open in the pool.
+        :param max_overflow: Number of extra connections allowed when the pool is exhausted.
+        :param timeout: Seconds to wait for a free connection before raising PoolTimeoutError.
+        :param max_lifetime: Seconds after which a connection is closed and replaced.
+        :param health_check_interval: Connections idle for longer than this are pinged before use.
+        """
+        self._connect = connect
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._checked_out: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def getconn(self):
+        """
+        Check a connection out of the pool, opening a new one if there is capacity left.
+        :return: An open database connection.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        pooled = None
+        with self._condition:
+            while True:
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size + self.max_overflow:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                self._waiting += 1
+                self._condition.wait(remaining)
+                self._waiting -= 1
+
+        try:
+            if pooled is None or not self._is_usable(pooled):
+                if pooled is not None:
+                    self._close_quietly(pooled.connection)
+                pooled = self._open()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        wait_seconds = time.monotonic() - start
+        with self._condition:
+            self._checked_out[id(pooled.connection)] = pooled
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_seconds"] += wait_seconds
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait_seconds)
+        return pooled.connection
+
+    def putconn(self, connection, discard: bool = False):
+        """
+        Return a connection to the pool. Open transactions are rolled back.
+        :param connection: Connection obtained from getconn.
+        :param discard: Close the connection instead of keeping it in the pool.
+        """
+        with self._condition:
+            pooled = self._checked_out.pop(id(connection), None)
+        if pooled is None:
+            return
+
+        if not discard and not connection.closed:
+            try:
+                if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._condition:
+            expired = time.monotonic() - pooled.created_at > self.max_lifetime
+            if discard or connection.closed or expired or self._size > self.max_size:
+                self._size -= 1
+                if expired:
+                    self._stats["connections_recycled"] += 1
+                self._close_quietly(connection)
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def closeall(self):
+        """
+        Close every idle connection. Checked out connections are closed when they are returned.
+        """
+        with self._condition:
+            while self._idle:
+                self._close_quietly(self._idle.pop().connection)
+                self._size -= 1
+            self.max_size = 0
+            self.max_overflow = 0
+            self._condition.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get the current state and usage statistics of the pool.
+        :return: Dictionary with pool sizes, wait times and connection counters.
+        """
+        with self._condition:
+            checkouts = self._stats["checkouts"]
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._checked_out),
+                "overflow": max(self._size - self.max_size, 0),
+                "waiting": self._waiting,
+                "max_size": self.max_size,
+                "max_overflow": self.max_overflow,
+                "avg_wait_seconds": self._stats["total_wait_seconds"] / checkouts if checkouts else 0.0,
+                **self._stats,
+            }
+
+    def _open(self) -> _PooledConnection:
+        connection = self._connect()
+        with self._condition:
+            self._stats["connections_created"] += 1
+        return _PooledConnection(connection)
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        """
+        Check an idle connection before handing it out: recycle it when it is too old
+        and ping it when it has been idle for a while.
+        """
+        now = time.monotonic()
+        if pooled.connection.closed:
+            return False
+        if now - pooled.created_at > self.max_lifetime:
+            with self._condition:
+                self._stats["connections_recycled"] += 1
+            return False
+        if now - pooled.last_used > self.health_check_interval:
+            try:
+                with pooled.connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                pooled.connection.rollback()
+            except Exception:
+                with self._condition:
+                    self._stats["health_check_failures"] += 1
+                return False
+        return True
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -1,12 +1,11 @@
 from langchain.prompts import PromptTemplate
 from app.services.context_service import ContextService 
 from app.services.image_description_service import ImageDescriptionService
-from app.services.photos_service import PhotosService
+from app.services.photos_service import PhotosService, PhotosNotFoundError
 from app.services.database_service import DatabaseService
 from app.services.embedding_service import EmbeddingService
 from app.services.upload_service import UploadService
 from typing import Optional
-import json
 import numpy as np
 from pydantic import BaseModel
 import requests
@@ -21,7 +20,11 @@ class ContentGenerationService:
     def __init__(
             self, 
             model_name: str, 
-            max_length: int = 512
+            max_length: int = 512,
+            context_service: Optional[ContextService] = None,
+            photos_service: Optional[PhotosService] = None,
+            image_description_service: Optional[ImageDescriptionService] = None,
+            embedding_service: Optional[EmbeddingService] = None
             ):
         """
         Initialize the ContentGenerationService.
@@ -29,18 +32,22 @@ class ContentGenerationService:
         :param context_service: Instance of the ContextService.
         :param photos_service: Instance of the PhotosService.
         :param image_description_service: Instance of the ImageDescriptionService.
+        :param embedding_service: Instance of the EmbeddingService.
         :param model_name: HuggingFace model name for the pipeline.
         :param max_length: Maximum length of the generated text.
         """
-        self.context_service = ContextService()
-        self.photos_service = PhotosService()
-        self.image_description_service = ImageDescriptionService()
-        self.embedding_service = EmbeddingService()
+        self.context_service = context_service or ContextService()
+        self.photos_service = photos_service or PhotosService()
+        self.image_description_service = image_description_service or ImageDescriptionService()
+        self.embedding_service = embedding_service or EmbeddingService()
         self.max_length = max_length
         self.api_token = os.environ.get('HUGGINGFACE_API_TOKEN')
         self.model_name = model_name
         self.api_url = f"https://api-inference.huggingface.co/models/{model_name}"
         self.headers = {"Authorization": f"Bearer {self.api_token}"}
+        # Reuse HTTPS connections to the inference API between requests
+        self.http_session = requests.Session()
+        self.request_timeout = float(os.environ.get("HUGGINGFACE_REQUEST_TIMEOUT", 60))
         
         self.prompt_template = PromptTemplate(
             template="""
@@ -82,7 +89,7 @@ class ContentGenerationService:
         else:
             context_embedding = embedding_result
 
-        context_embedding = json.dumps(context_embedding.tolist())
+        context_embedding = np.asarray(context_embedding, dtype=np.float32)
 
         # Retrieve similar records from the database
         db = DatabaseService()
@@ -104,24 +111,30 @@ class ContentGenerationService:
     
     def get_image_descriptions(self, event_id: int, image_ids: list):
         """
-        Generate descriptions for all images associated with the post.
+        Get descriptions for all images associated with the post.
+        Stored descriptions are reused, missing ones are generated and stored for the next call.
 
         :param event_id: Event ID to fetch images.
         :param image_ids: List of image IDs.
         :return: List of image descriptions.
         """
-        descriptions = []
-        for image_id in image_ids:
-            # Fetch image embedding
-            photo_record = self.photos_service.get_photo(event_id, image_id)
-            image_embedding = np.array(json.loads(photo_record[0]["embedding"]))
-            norm_factor = photo_record[0]["norm"]
-            normalized_embedding = image_embedding * norm_factor
-
-            # Generate image description
-            description = self.image_description_service.generate_caption(normalized_embedding)
-            descriptions.append(description)
-        return descriptions
+        descriptions = self.image_description_service.get_descriptions(event_id, image_ids) if image_ids else {}
+        missing_ids = [image_id for image_id in dict.fromkeys(image_ids) if image_id not in descriptions]
+        missing_embeddings = []
+        if missing_ids:
+            # Fetch the embeddings of all images without a description at once
+            photos, not_found_ids = self.photos_service.get_photos(event_id, missing_ids)
+            if not_found_ids:
+                raise PhotosNotFoundError(event_id, not_found_ids)
+            # ClipCap was trained on unnormalized CLIP embeddings
+            missing_embeddings = [photos[image_id]["embedding"] * photos[image_id]["norm"] for image_id in missing_ids]
+
+        # Generate the missing descriptions, decoded together in batches
+        captions = self.image_description_service.generate_captions(missing_embeddings) if missing_ids else []
+        generated = dict(zip(missing_ids, captions))
+        self.image_description_service.store_descriptions(generated)
+        descriptions.update(generated)
+        return [descriptions[image_id] for image_id in image_ids]
 
     def generate_post_caption(self, image_description: list, user_prompt: str, event_id: int, tone="friendly", max_new_tokens=50):
         """
@@ -148,9 +161,10 @@ class ContentGenerationService:
         )
 
         # Generate caption using the Hugging Face Inference API
-        response = requests.post(
+        response = self.http_session.post(
             self.api_url,
             headers=self.headers,
+            timeout=self.request_timeout,
             json={
             "inputs": formatted_prompt,
             "parameters": {
@@ -1,19 +1,58 @@
+import hashlib
 import os
-import json
-from typing import List, Optional
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from fastapi import UploadFile
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.services.database_service import DatabaseService
+from app.services.document_extraction_service import DocumentExtractionService
 from app.services.embedding_service import EmbeddingService
 from app.services.upload_service import UploadService
 
+# Number of chunks embedded and inserted at a time
+CONTEXT_INGEST_BATCH_SIZE = int(os.environ.get("CONTEXT_INGEST_BATCH_SIZE", 64))
+# Streamed text is split once this many chunks worth of text are buffered
+CHUNKER_WINDOW_CHUNKS = 8
+# Chunks are unique per event and owner (document, or 0 for the main context), see contexts_owner_content_hash_key
+CONTEXT_CHUNK_CONFLICT = "(event_id, COALESCE(doc_id, 0), content_hash) DO NOTHING"
+
+# Queries run as is by the service and planned by the query-plan check (see query_plan_service.py)
+DOCUMENT_BY_TITLE_QUERY = """
+SELECT id FROM documents WHERE event_id = %s AND title = %s AND file_ext = %s
+ORDER BY id LIMIT 1 FOR UPDATE
+"""
+# doc_id is NULL for the main context, COALESCE matches the unique index
+EXISTING_CHUNKS_QUERY = """
+SELECT content_hash FROM contexts
+WHERE event_id = %s AND COALESCE(doc_id, 0) = %s AND content_hash = ANY(%s)
+"""
+# Chunks of the previous version of a document that are not in the new one
+STALE_CHUNKS_QUERY = """
+DELETE FROM contexts
+WHERE doc_id = %s AND (content_hash IS NULL OR content_hash <> ALL(%s))
+"""
+
 class ContextService:
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(
+            self,
+            chunk_size: int = 500,
+            chunk_overlap: int = 50,
+            embedding_service: Optional[EmbeddingService] = None,
+            extraction_service: Optional[DocumentExtractionService] = None,
+            batch_size: int = CONTEXT_INGEST_BATCH_SIZE
+            ):
         self.DOCUMENT_DIR = "uploads/documents"
-        self.embedding_service = EmbeddingService()
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.extraction_service = extraction_service or DocumentExtractionService()
         self.upload_service = UploadService()
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        # The splitter is stateless, one instance serves every call
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap
+        )
 
     def add_document(self, event_id: int, file_name: str, file_ext: str) -> int:
         """
@@ -35,49 +74,196 @@ class ContextService:
         db.close()
         return doc_id
 
-    def add_context(self, event_id: int, text: str, context_type: str, doc_id: Optional[int] = None):
+    def add_context(
+            self,
+            event_id: int,
+            text: str,
+            context_type: str,
+            doc_id: Optional[int] = None,
+            on_batch: Optional[Callable[[], None]] = None
+            ):
         """
         Add context to the database with embeddings.
         :param event_id: ID of the event.
         :param text: Text content to add as context.
         :param context_type: Type of context ('document' or 'main_context').
         :param doc_id: Document ID (if context_type is 'document').
+        :param on_batch: Optional callable called after each batch of chunks, see store_chunks.
         """
-        db = DatabaseService()
-        chunks = self.split_text_into_chunks(text)
-        embeddings = [self.embedding_service.embed_context(chunk) for chunk in chunks]
-
-        for chunk, embedding in zip(chunks, embeddings):
-            db.insert_record(
-                "contexts",
-                {
-                    "event_id": event_id,
-                    "doc_id": doc_id,
-                    "context_type": context_type,
-                    "content": chunk,
-                    "embedding": json.dumps(embedding.tolist()),  # Ensure serializable
-                },
-            )
-        db.close()
+        with DatabaseService() as db:
+            try:
+                stored, _ = self.store_chunks(
+                    db, event_id, self.split_text_into_chunks(text), context_type, doc_id, on_batch=on_batch
+                )
+                db.connection.commit()
+                print(f"[CONTEXT] Event {event_id}: {stored} new chunks")
+            except Exception:
+                db.connection.rollback()
+                raise
 
     def process_documents(self, event_id: int, files: List[UploadFile]):
         """
         Process uploaded documents: save files, extract content, and add contexts.
+        Documents are streamed page by page (PDF) or paragraph by paragraph (DOCX), chunked incrementally
+        and stored in bounded batches, so memory use doesn't grow with the document size.
+        A document uploaded again (same title and extension) replaces the previous version: unchanged chunks
+        are kept without being embedded again and chunks that are no longer in the document are deleted.
+        Each document and its chunks are stored in a single transaction.
         :param event_id: ID of the event.
         :param files: List of uploaded files.
         """
         saved_files = self.upload_service.upload_documents(files, event_id)
+        self.process_document_files(event_id, saved_files)
 
-        for file_path in saved_files:
+    def process_document_files(
+            self,
+            event_id: int,
+            file_paths: List[str],
+            on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+            on_batch: Optional[Callable[[], None]] = None
+            ):
+        """
+        Extract, chunk and store documents already saved in the documents directory, see process_documents.
+        :param event_id: ID of the event.
+        :param file_paths: Paths of the saved documents.
+        :param on_item: Optional callable receiving the result of each document once it is stored,
+                        e.g. {"file": "a.pdf", "status": "stored", "doc_id": 2, "new_chunks": 10}.
+        :param on_batch: Optional callable called after each batch of chunks, see store_chunks.
+        """
+        for file_path in file_paths:
             file_name, file_ext = os.path.splitext(os.path.basename(file_path))
-            
-            # Add document metadata to the database
-            doc_id = self.add_document(event_id, file_name, file_ext)
 
-            # Read file content and add as context
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            self.add_context(event_id, content, "document", doc_id)
+            with DatabaseService() as db:
+                try:
+                    doc_id = self.get_or_create_document(db, event_id, file_name, file_ext)
+                    segments = self.extraction_service.iter_text(file_path)
+                    stored, content_hashes = self.store_chunks(
+                        db, event_id, self.iter_chunks(segments), "document", doc_id, on_batch=on_batch
+                    )
+                    db.cursor.execute(STALE_CHUNKS_QUERY, (doc_id, list(content_hashes)))
+                    removed = db.cursor.rowcount
+                    db.connection.commit()
+                    print(f"[CONTEXT] {file_name}{file_ext}: {stored} new chunks, "
+                          f"{len(content_hashes) - stored} unchanged, {removed} removed")
+                except Exception:
+                    db.connection.rollback()
+                    raise
+            if on_item is not None:
+                on_item({
+                    "file": f"{file_name}{file_ext}",
+                    "status": "stored",
+                    "doc_id": doc_id,
+                    "new_chunks": stored,
+                    "unchanged_chunks": len(content_hashes) - stored,
+                    "removed_chunks": removed,
+                })
+
+    def get_or_create_document(self, db: DatabaseService, event_id: int, file_name: str, file_ext: str) -> int:
+        """
+        Get the document of an event with the given title and extension, or add it.
+        The row is locked until the transaction ends, so concurrent uploads of the same document are serialized.
+        :param db: Database service holding the transaction.
+        :return: The document ID.
+        """
+        db.cursor.execute(DOCUMENT_BY_TITLE_QUERY, (event_id, file_name, file_ext))
+        document = db.cursor.fetchone()
+        if document:
+            return document["id"]
+        return db.insert_records(
+            "documents", [{"event_id": event_id, "title": file_name, "file_ext": file_ext}], commit=False
+        )[0]
+
+    @staticmethod
+    def content_hash(chunk: str) -> str:
+        return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+    def store_chunks(
+            self,
+            db: DatabaseService,
+            event_id: int,
+            chunks: Iterable[str],
+            context_type: str,
+            doc_id: Optional[int] = None,
+            on_batch: Optional[Callable[[], None]] = None
+            ) -> Tuple[int, Set[str]]:
+        """
+        Embed and insert context chunks in batches of batch_size. The transaction is not committed, the caller owns it.
+        Chunks are identified by the hash of their content, chunks their owner (the document, or the main context
+        of the event) already has are skipped before embedding. Chunks are deduplicated per owner and not across
+        the event, so replacing a document never deletes a chunk another document also contains.
+        :param db: Database service holding the transaction.
+        :param event_id: ID of the event.
+        :param chunks: Iterable of text chunks, consumed lazily.
+        :param context_type: Type of context ('document' or 'main_context').
+        :param doc_id: Document ID (if context_type is 'document').
+        :param on_batch: Optional callable called after each batch, e.g. to report a job is alive while a
+                         large document is stored.
+        :return: Number of chunks stored and the content hashes of all the chunks.
+        """
+        chunks = iter(chunks)
+        stored = 0
+        content_hashes = set()
+        while True:
+            batch = list(islice(chunks, self.batch_size))
+            if not batch:
+                break
+            if on_batch is not None:
+                on_batch()
+            new_chunks = {}
+            for chunk in batch:
+                content_hash = self.content_hash(chunk)
+                if content_hash not in content_hashes:
+                    content_hashes.add(content_hash)
+                    new_chunks[content_hash] = chunk
+            if not new_chunks:
+                continue
+
+            db.cursor.execute(EXISTING_CHUNKS_QUERY, (event_id, doc_id or 0, list(new_chunks)))
+            for record in db.cursor.fetchall():
+                new_chunks.pop(record["content_hash"], None)
+            if not new_chunks:
+                continue
+
+            embeddings = self.embedding_service.embed_contexts(list(new_chunks.values()))
+            rows = [
+                {
+                    "event_id": event_id,
+                    "doc_id": doc_id,
+                    "context_type": context_type,
+                    "content": chunk,
+                    "content_hash": content_hash,
+                    "embedding": embedding,  # Adapted to a pgvector value
+                }
+                for (content_hash, chunk), embedding in zip(new_chunks.items(), embeddings)
+            ]
+            # A concurrent upload may have stored the same chunk since the lookup
+            db.insert_records(
+                "contexts", rows, return_ids=False, commit=False, on_conflict=CONTEXT_CHUNK_CONFLICT
+            )
+            stored += len(rows)
+        return stored, content_hashes
+
+    def iter_chunks(self, segments: Iterable[str]) -> Iterator[str]:
+        """
+        Split a stream of text segments into chunks incrementally.
+        Text is buffered until it holds a few chunks, then all chunks but the last one are yielded and the
+        last one is kept as the start of the buffer, so chunks continue across page and paragraph boundaries.
+        :param segments: Iterable of text segments, e.g. the pages of a document.
+        :return: Iterator over text chunks.
+        """
+        window = self.chunk_size * CHUNKER_WINDOW_CHUNKS
+        buffer = ""
+        for segment in segments:
+            buffer += segment
+            if len(buffer) < window:
+                continue
+            chunks = self.text_splitter.split_text(buffer)
+            yield from chunks[:-1]
+            # The splitter strips whitespace, keep the trailing one so words don't get glued to the next segment
+            trailing_whitespace = buffer[len(buffer.rstrip()):]
+            buffer = (chunks[-1] + trailing_whitespace) if chunks else ""
+        if buffer.strip():
+            yield from self.text_splitter.split_text(buffer)
 
     def split_text_into_chunks(self, text: str) -> List[str]:
         """
@@ -85,11 +271,7 @@ class ContextService:
         :param text: Input text.
         :return: List of text chunks.
         """
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap
-        )
-        return text_splitter.split_text(text)
+        return self.text_splitter.split_text(text)
     
     def get_context_by_event_id(self, event_id: int) -> List[dict]:
         """
@@ -1,15 +1,117 @@
+import os
+import threading
+from functools import lru_cache
+from typing import Optional
+import numpy as np
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import AsIs, adapt, register_adapter
+from psycopg2.extras import RealDictCursor, execute_values
+from app.services.connection_pool import ConnectionPool
+
+DB_CONFIG = {
+    "user": os.environ.get("DB_USER", "myuser"),
+    "password": os.environ.get("DB_PASSWORD", "mypassword"),
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "port": int(os.environ.get("DB_PORT", 5432)),
+    "database": os.environ.get("DB_NAME", "mydb"),
+}
+
+# Settings of the approximate nearest neighbour indexes that can be tuned per query
+SEARCH_PARAM_SETTINGS = {
+    "ef_search": "hnsw.ef_search",
+    "probes": "ivfflat.probes",
+    "iterative_scan": "hnsw.iterative_scan",
+}
+
+DEFAULT_SEARCH_PARAMS = {
+    "ef_search": os.environ.get("VECTOR_EF_SEARCH"),
+    "probes": os.environ.get("VECTOR_PROBES"),
+    "iterative_scan": os.environ.get("VECTOR_ITERATIVE_SCAN"),
+}
+
+@lru_cache(maxsize=8)
+def _vector_format(dimension: int) -> str:
+    # 9 significant digits are enough to round-trip any float32
+    return "'[" + ",".join(["%.9g"] * dimension) + "]'::vector"
+
+def adapt_numpy_array(array: np.ndarray):
+    """
+    Adapt NumPy arrays for psycopg2: 1-D float arrays are sent as pgvector values, other arrays as SQL arrays.
+    psycopg2 only sends parameters as text, so vectors are formatted with one format string per dimension,
+    several times faster than json.dumps(array.tolist()).
+    """
+    if array.ndim == 1 and array.dtype.kind == "f":
+        return AsIs(_vector_format(array.shape[0]) % tuple(array.astype(np.float32).tolist()))
+    return adapt(array.tolist())
+
+register_adapter(np.ndarray, adapt_numpy_array)
+
+def decode_vector_text(value, cursor=None) -> Optional[np.ndarray]:
+    """
+    Decode a vector in pgvector's text format, e.g. '[0.1,0.2]'.
+    :param value: Text of the vector, None for NULL.
+    :return: The vector as a float32 NumPy array.
+    """
+    if value is None:
+        return None
+    return np.array(value[1:-1].split(","), dtype=np.float32)
+
+def decode_vector_binary(data) -> np.ndarray:
+    """
+    Decode a vector in pgvector's binary format, as returned by vector_send(column).
+    The format is a 2 byte dimension, 2 unused bytes and the values as big-endian float4.
+    Bulk reads should select vector_send(column), decoding it is much cheaper than parsing the text format.
+    :param data: Bytes of the binary vector.
+    :return: The vector as a float32 NumPy array.
+    """
+    return np.frombuffer(data, dtype=">f4", offset=4).astype(np.float32)
+
+def register_vector_type(connection):
+    """
+    Return vector columns of a connection as float32 NumPy arrays instead of text.
+    The type OID depends on the database, so it is looked up on each new connection.
+    :param connection: psycopg2 connection.
+    :return: The connection.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regtype('vector')::oid")
+        oid = cursor.fetchone()[0]
+    connection.commit()
+    if oid is not None:
+        vector_type = psycopg2.extensions.new_type((oid,), "VECTOR", decode_vector_text)
+        psycopg2.extensions.register_type(vector_type, connection)
+    return connection
+
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Get the process-wide connection pool, creating it on first use.
+    Pool sizes can be tuned with the DB_POOL_* environment variables.
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = ConnectionPool(
+                    connect=lambda: register_vector_type(psycopg2.connect(**DB_CONFIG)),
+                    max_size=int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+                    max_overflow=int(os.environ.get("DB_POOL_MAX_OVERFLOW", 5)),
+                    timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                    max_lifetime=float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+                    health_check_interval=float(os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),
+                )
+    return _connection_pool
 
 class DatabaseService:
-    def __init__(self):
-        self.connection = psycopg2.connect(
-            user="myuser",
-            password="mypassword",
-            host="localhost",
-            port=5432,
-            database="mydb"
-        )
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        """
+        Check a connection out of the connection pool.
+        :param pool: Connection pool to use. Defaults to the process-wide pool.
+        """
+        self.pool = pool or get_connection_pool()
+        self.connection = self.pool.getconn()
         self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
 
     def __enter__(self):
@@ -20,10 +122,17 @@ class DatabaseService:
     
     def __exit__(self, exc_type, exc_value, traceback):
         """
-        Exit method for context manager, it closes the connection
+        Exit method for context manager, it returns the connection to the pool
         """
         self.close()
 
+    def __del__(self):
+        # Return the connection if the caller never closed the service (e.g. an exception was raised)
+        try:
+            self.close()
+        except Exception:
+            pass
+
     def insert_record(self, table, data, return_id=True):
         """
         Insert a record into the specified table.
@@ -46,11 +155,50 @@ class DatabaseService:
             return self.cursor.fetchone()["id"]
         return None
 
-    def read_records(self, table, conditions=None):
+    def insert_records(self, table, rows, return_ids=True, commit=True, on_conflict=None):
+        """
+        Insert several records into the specified table with a single statement.
+        :param table: Name of the table.
+        :param rows: List of dictionaries containing column-value pairs, all with the same columns.
+        :param return_ids: Whether to return the IDs of the inserted records.
+        :param commit: Whether to commit the transaction. Pass False to insert as part of a larger transaction.
+        :param on_conflict: Optional conflict action, e.g. '(event_id, COALESCE(doc_id, 0), content_hash) DO NOTHING'.
+                            Skipped rows return no ID.
+        :return: The IDs of the inserted records in the order of rows if return_ids is True, otherwise None.
+        """
+        if not rows:
+            return [] if return_ids else None
+        columns = list(rows[0].keys())
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        if on_conflict:
+            query += f" ON CONFLICT {on_conflict}"
+        if return_ids:
+            query += " RETURNING id"
+
+        values = [[row[column] for column in columns] for row in rows]
+        result = execute_values(self.cursor, query, values, page_size=len(values), fetch=return_ids)
+        if commit:
+            self.connection.commit()
+
+        if return_ids:
+            return [record["id"] for record in result]
+        return None
+
+    @staticmethod
+    def select_query(table, conditions=None):
+        """
+        Build the query of read_records.
+        :return: The query and its parameters.
+        """
         query = f"SELECT * FROM {table}"
         if conditions:
             query += " WHERE " + ' AND '.join([f"{k}=%s" for k in conditions.keys()])
-            self.cursor.execute(query, list(conditions.values()))
+        return query, list((conditions or {}).values())
+
+    def read_records(self, table, conditions=None):
+        query, params = self.select_query(table, conditions)
+        if params:
+            self.cursor.execute(query, params)
         else:
             self.cursor.execute(query)
         return self.cursor.fetchall()
@@ -74,31 +222,129 @@ class DatabaseService:
         return self.cursor.rowcount 
     
     def delete_record(self, table, conditions):
+        """
+        Delete records from the database based on conditions
+        :param table: Name of the table
+        :param conditions: Dictionary with column-value pairs for WHERE clause
+        :return: Number of rows deleted
+        """
         query = f"DELETE FROM {table} WHERE " + ' AND '.join([f"{k}=%s" for k in conditions.keys()])
         self.cursor.execute(query, list(conditions.values()))
         self.connection.commit()
+        return self.cursor.rowcount
+
+    def set_search_params(self, search_params=None):
+        """
+        Tune approximate nearest neighbour index scans for the current transaction.
+        :param search_params: Dictionary with any of 'ef_search' (HNSW candidate list size),
+            'probes' (IVFFlat lists to scan) and 'iterative_scan' (HNSW iterative scans, pgvector >= 0.8,
+            keeps scanning until enough rows pass the event filter). Defaults to the VECTOR_* environment variables.
+        """
+        params = dict(DEFAULT_SEARCH_PARAMS)
+        params.update({k: v for k, v in (search_params or {}).items() if v is not None})
+        for name, value in params.items():
+            if value is None:
+                continue
+            if name not in SEARCH_PARAM_SETTINGS:
+                raise ValueError(f"Invalid search parameter '{name}'. Expected one of {list(SEARCH_PARAM_SETTINGS)}.")
+            self.cursor.execute(f"SET LOCAL {SEARCH_PARAM_SETTINGS[name]} = %s", (value,))
+
+    def uses_vector_index(self, search_params=None):
+        """
+        Whether event-scoped similarity queries may use the vector indexes. An HNSW scan yields at most
+        ef_search candidates from all the events and the event filter is applied to them afterwards, so
+        events other than the largest ones would get few or no results. Only iterative scans (pgvector >= 0.8)
+        keep scanning until enough rows of the event match, without them the rows of the event are scanned exactly.
+        :param search_params: Index scan settings, see set_search_params.
+        """
+        params = dict(DEFAULT_SEARCH_PARAMS)
+        params.update({k: v for k, v in (search_params or {}).items() if v is not None})
+        return params.get("iterative_scan") not in (None, "", "off")
 
-    def get_similar_records(self, table, vector_column, event_id, query_vector):
+    def event_rows(self, table, search_params=None):
+        """
+        Build the WITH clause and the source of an event-scoped similarity query, which filters on %(event_id)s.
+        For exact scans the rows of the event are read through the event_id index in a materialized CTE,
+        which the planner can't order with the vector index.
+        :return: The WITH clause (empty when the vector index may be used) and the relation to select from.
+        """
+        if self.uses_vector_index(search_params):
+            return "", table
+        return f"WITH event_rows AS MATERIALIZED (SELECT * FROM {table} WHERE event_id = %(event_id)s)", "event_rows"
+
+    def get_similar_records(self, table, vector_column, event_id, query_vector, search_params=None):
+        with_clause, source = self.event_rows(table, search_params)
+        # Ordering by the distance operator itself (not by an expression on it) lets Postgres use the vector index
         query = f"""
-        SELECT *, 1 - ({vector_column} <=> %s) AS similarity
-        FROM {table}
-        WHERE event_id = %s
-        ORDER BY similarity DESC
+        {with_clause}
+        SELECT *, 1 - ({vector_column} <=> %(vector)s) AS similarity
+        FROM {source}
+        WHERE event_id = %(event_id)s
+        ORDER BY {vector_column} <=> %(vector)s
         """
-        self.cursor.execute(query, (query_vector, event_id))
+        self.set_search_params(search_params)
+        self.cursor.execute(query, {"vector": query_vector, "event_id": event_id})
         return self.cursor.fetchall()
     
-    def get_top_k_similar_records(self, table, vector_column, event_id, query_vector, n: int = 3):
+    def get_similar_record_ids(self, table, vector_column, event_id, query_vector, threshold, limit=None, offset=0, search_params=None):
+        """
+        Get the IDs and similarity scores of the records most similar to a query vector.
+        Only the ID and score are selected, the similarity cutoff and pagination are applied by the database.
+        Pages are stable with exact scans (ties are ordered by ID). With the vector index, see uses_vector_index,
+        pages are only as stable as the iterative scan: 'strict_order' keeps them in order, 'relaxed_order' may not.
+        :param table: Name of the table.
+        :param vector_column: Name of the vector column.
+        :param event_id: Event ID the records belong to.
+        :param query_vector: Query vector.
+        :param threshold: Only records with a similarity above this value are returned.
+        :param limit: Maximum number of records to return, None for all of them.
+        :param offset: Number of records to skip.
+        :param search_params: Index scan settings, see set_search_params.
+        :return: List of records with 'id' and 'similarity', most similar first.
+        """
+        with_clause, source = self.event_rows(table, search_params)
+        # A tie-breaker would keep the vector index from providing the order, it is only added to exact scans
+        order = f"{vector_column} <=> %(vector)s" + (", id" if with_clause else "")
+        # similarity > threshold  <=>  cosine distance < 1 - threshold
         query = f"""
-        SELECT *, 1 - ({vector_column} <=> %s) AS similarity
-        FROM {table}
-        WHERE event_id = %s
-        ORDER BY similarity DESC
-        LIMIT %s
+        {with_clause}
+        SELECT id, 1 - ({vector_column} <=> %(vector)s) AS similarity
+        FROM {source}
+        WHERE event_id = %(event_id)s AND {vector_column} <=> %(vector)s < %(max_distance)s
+        ORDER BY {order}
+        LIMIT %(limit)s OFFSET %(offset)s
         """
-        self.cursor.execute(query, (query_vector, event_id, n))
+        self.set_search_params(search_params)
+        self.cursor.execute(query, {
+            "vector": query_vector,
+            "event_id": event_id,
+            "max_distance": 1 - threshold,
+            "limit": limit,
+            "offset": offset,
+        })
+        return self.cursor.fetchall()
+
+    def get_top_k_similar_records(self, table, vector_column, event_id, query_vector, n: int = 3, search_params=None):
+        with_clause, source = self.event_rows(table, search_params)
+        query = f"""
+        {with_clause}
+        SELECT *, 1 - ({vector_column} <=> %(vector)s) AS similarity
+        FROM {source}
+        WHERE event_id = %(event_id)s
+        ORDER BY {vector_column} <=> %(vector)s
+        LIMIT %(limit)s
+        """
+        self.set_search_params(search_params)
+        self.cursor.execute(query, {"vector": query_vector, "event_id": event_id, "limit": n})
         return self.cursor.fetchall()
 
     def close(self):
+        """
+        Close the cursor and return the connection to the pool.
+        Uncommitted work is rolled back by the pool.
+        """
+        if getattr(self, "connection", None) is None:
+            return
         self.cursor.close()
-        self.connection.close()
\ No newline at end of file
+        self.pool.putconn(self.connection)
+        self.connection = None
\ No newline at end of file
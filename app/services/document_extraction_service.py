@@ -0,0 +1,61 @@
+import os
+from typing import Iterator
+from docx import Document
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextContainer
+
+# Size of the blocks plain text files are read in
+TEXT_BLOCK_SIZE = 64 * 1024
+
+class DocumentExtractionService:
+    """
+    Extract the text of context documents as a stream of segments (PDF pages, DOCX paragraphs or
+    blocks of plain text), so documents are never loaded into memory as a whole string.
+    """
+
+    def __init__(self, text_block_size: int = TEXT_BLOCK_SIZE):
+        self.text_block_size = text_block_size
+        self.extractors = {
+            ".pdf": self.iter_pdf_pages,
+            ".docx": self.iter_docx_paragraphs,
+        }
+
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        """
+        Stream the text of a document.
+        :param file_path: Path of the document. PDF and DOCX files are parsed, other files are read as UTF-8 text.
+        :return: Iterator over text segments, in document order.
+        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        extractor = self.extractors.get(file_ext, self.iter_text_blocks)
+        return extractor(file_path)
+
+    def iter_pdf_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Stream the text of a PDF one page at a time, pages are laid out lazily by pdfminer.
+        """
+        for page_layout in extract_pages(file_path):
+            page_text = "".join(
+                element.get_text() for element in page_layout if isinstance(element, LTTextContainer)
+            )
+            if page_text.strip():
+                yield page_text
+
+    def iter_docx_paragraphs(self, file_path: str) -> Iterator[str]:
+        """
+        Stream the paragraphs of a DOCX file.
+        """
+        for paragraph in Document(file_path).paragraphs:
+            if paragraph.text.strip():
+                yield paragraph.text + "\n\n"
+
+    def iter_text_blocks(self, file_path: str) -> Iterator[str]:
+        """
+        Stream a plain text file in fixed size blocks.
+        """
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            while True:
+                block = f.read(self.text_block_size)
+                if not block:
+                    break
+                yield block
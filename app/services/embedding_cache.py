@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import numpy as np
+import redis
+
+# Redis holding the shared level of the cache, same settings as the token blacklist
+REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+
+class EmbeddingCache:
+    """
+    Two-level cache of embeddings keyed by model and normalized text.
+    Level 1 is an in-process LRU, level 2 is Redis so the entries are shared by every worker.
+    Redis is optional: when it is unreachable the cache keeps working with the LRU only.
+    """
+
+    def __init__(
+            self,
+            max_entries: Optional[int] = None,
+            ttl_seconds: Optional[int] = None,
+            use_redis: Optional[bool] = None,
+            redis_client: Optional[redis.Redis] = None,
+            namespace: str = "embedding"
+            ):
+        """
+        Initialize the EmbeddingCache.
+        :param max_entries: Maximum number of entries in the in-process LRU. Defaults to TEXT_EMBEDDING_CACHE_SIZE.
+        :param ttl_seconds: Time to live of the entries in both levels. Defaults to TEXT_EMBEDDING_CACHE_TTL.
+        :param use_redis: Whether to use Redis as second level. Defaults to TEXT_EMBEDDING_CACHE_REDIS.
+        :param redis_client: Redis client to use, created lazily when not provided.
+        :param namespace: Prefix of the Redis keys.
+        """
+        self.max_entries = max_entries or int(os.environ.get("TEXT_EMBEDDING_CACHE_SIZE", 1024))
+        self.ttl_seconds = ttl_seconds or int(os.environ.get("TEXT_EMBEDDING_CACHE_TTL", 86400))
+        if use_redis is None:
+            use_redis = os.environ.get("TEXT_EMBEDDING_CACHE_REDIS", "true").lower() == "true"
+        self.use_redis = use_redis
+        self.namespace = namespace
+        self._redis_client = redis_client
+        # Don't retry Redis on every request while it is down
+        self._redis_retry_after = 0.0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "redis_errors": 0}
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize a query so trivially different spellings share an entry.
+        The CLIP tokenizer lower-cases and splits on whitespace, so this doesn't change the embedding.
+        """
+        return " ".join(text.lower().split())
+
+    def key(self, model_id: str, text: str) -> str:
+        digest = hashlib.sha256(self.normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{model_id}:{digest}"
+
+    def get_or_compute(self, model_id: str, text: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Get an embedding from the cache, computing and storing it on a miss.
+        :param model_id: Identifier of the model that produces the embedding.
+        :param text: Input text.
+        :param compute: Callable returning the embedding on a miss.
+        :return: The embedding as a 1-D float32 NumPy array.
+        """
+        embedding = self.get(model_id, text)
+        if embedding is None:
+            embedding = np.asarray(compute(), dtype=np.float32).ravel()
+            self.set(model_id, text, embedding)
+        return embedding
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """
+        Get an embedding from the cache.
+        :param model_id: Identifier of the model that produced the embedding.
+        :param text: Input text.
+        :return: The embedding, or None on a miss.
+        """
+        key = self.key(model_id, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, embedding = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._metrics["l1_hits"] += 1
+                    return embedding
+                del self._entries[key]
+
+        client = self._redis()
+        if client is not None:
+            try:
+                payload = client.get(key)
+            except redis.RedisError:
+                self._redis_failed()
+                payload = None
+            if payload is not None:
+                embedding = np.frombuffer(payload, dtype=np.float32)
+                self._set_local(key, embedding)
+                with self._lock:
+                    self._metrics["l2_hits"] += 1
+                return embedding
+
+        with self._lock:
+            self._metrics["misses"] += 1
+        return None
+
+    def set(self, model_id: str, text: str, embedding: np.ndarray):
+        """
+        Store an embedding in both cache levels.
+        :param model_id: Identifier of the model that produced the embedding.
+        :param text: Input text.
+        :param embedding: 1-D embedding, stored in Redis as raw float32 bytes.
+        """
+        key = self.key(model_id, text)
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        self._set_local(key, embedding)
+
+        client = self._redis()
+        if client is not None:
+            try:
+                client.setex(key, self.ttl_seconds, embedding.tobytes())
+            except redis.RedisError:
+                self._redis_failed()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Get the hit and miss counters of the cache.
+        """
+        with self._lock:
+            lookups = self._metrics["l1_hits"] + self._metrics["l2_hits"] + self._metrics["misses"]
+            hits = self._metrics["l1_hits"] + self._metrics["l2_hits"]
+            return {
+                **self._metrics,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "l1_entries": len(self._entries),
+                "l1_max_entries": self.max_entries,
+                "redis_enabled": self.use_redis,
+            }
+
+    def _set_local(self, key: str, embedding: np.ndarray):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _redis(self) -> Optional[redis.Redis]:
+        if not self.use_redis or time.monotonic() < self._redis_retry_after:
+            return None
+        if self._redis_client is None:
+            self._redis_client = redis.StrictRedis(
+                host=REDIS_HOST, port=REDIS_PORT, db=0, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._redis_client
+
+    def _redis_failed(self):
+        with self._lock:
+            self._metrics["redis_errors"] += 1
+        self._redis_retry_after = time.monotonic() + 30
@@ -1,12 +1,77 @@
+import os
+import threading
+from typing import List, Optional
 from app.features.clip_embedding import ClipEmbedding
+from app.services.embedding_cache import EmbeddingCache
+from app.services.model_registry import ModelRegistry, model_registry
 from langchain_community.embeddings import HuggingFaceEmbeddings
 import numpy as np
 
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+TEXT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_MAX_BATCH_SIZE = int(os.environ.get("EMBEDDING_MAX_BATCH_SIZE", 32))
+
 class EmbeddingService:
-    def __init__(self):
-        self.img_model = ClipEmbedding() # Initialize CLIP model for image embeddings
-        self.txt_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    def __init__(
+            self,
+            registry: Optional[ModelRegistry] = None,
+            max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+            text_cache: Optional[EmbeddingCache] = None
+            ):
+        """
+        Initialize the EmbeddingService.
+        Models are resolved lazily from the shared model registry, so every service
+        instance in the process uses the same CLIP and MiniLM models.
+        :param registry: Model registry to resolve models from. Defaults to the process-wide registry.
+        :param max_batch_size: Maximum number of images embedded in one forward pass.
+        :param text_cache: Cache of text query embeddings. Defaults to an in-process LRU backed by Redis.
+        """
+        self.registry = registry or model_registry
+        self.max_batch_size = max_batch_size
+        self.text_cache = text_cache or EmbeddingCache(namespace="text-embedding")
+        self.img_model_key = f"clip:{CLIP_MODEL_NAME}"
+        self.txt_model_key = f"sentence-transformers:{TEXT_MODEL_NAME}"
+        self._img_model = None
+        self._txt_model = None
+        self._lock = threading.Lock()
+
+    @property
+    def img_model(self) -> ClipEmbedding:
+        """CLIP model for image and text query embeddings."""
+        if self._img_model is None:
+            with self._lock:
+                if self._img_model is None:
+                    self._img_model = self.registry.acquire(
+                        self.img_model_key, lambda: ClipEmbedding(CLIP_MODEL_NAME)
+                    )
+        return self._img_model
+
+    @property
+    def txt_model(self) -> HuggingFaceEmbeddings:
+        """Sentence-transformers model for context embeddings."""
+        if self._txt_model is None:
+            with self._lock:
+                if self._txt_model is None:
+                    # Embeddings are L2 normalized by sentence-transformers, batched when encoding documents
+                    self._txt_model = self.registry.acquire(
+                        self.txt_model_key,
+                        lambda: HuggingFaceEmbeddings(
+                            model_name=TEXT_MODEL_NAME, encode_kwargs={"normalize_embeddings": True}
+                        )
+                    )
+        return self._txt_model
 
+    def close(self):
+        """
+        Release the models held by this service.
+        """
+        with self._lock:
+            if self._img_model is not None:
+                self.registry.release(self.img_model_key)
+                self._img_model = None
+            if self._txt_model is not None:
+                self.registry.release(self.txt_model_key)
+                self._txt_model = None
 
     def embed_image(self, image):
         """
@@ -16,7 +81,17 @@ class EmbeddingService:
         """
         embedding = self.img_model.transform(image, input_type='image')
         return self.img_model.normalize(embedding)
-    
+
+    def embed_images(self, images, max_batch_size: Optional[int] = None):
+        """
+        Generate embeddings for a list of images in batches and normalize them.
+        :param images: List of input images.
+        :param max_batch_size: Maximum number of images per forward pass. Defaults to the service setting.
+        :return: Normalized image embeddings and their norm factors, one row per image.
+        """
+        embeddings = self.img_model.embed_images(images, max_batch_size=max_batch_size or self.max_batch_size)
+        return self.img_model.normalize(embeddings)
+
     def embed_text(self, text):
         """
         Generate an embedding for text queries and normalize it.
@@ -25,7 +100,28 @@ class EmbeddingService:
         """
         embedding = self.img_model.transform(text, input_type='text')
         return self.img_model.normalize(embedding)
-    
+
+    def embed_text_query(self, text: str) -> np.ndarray:
+        """
+        Generate a normalized embedding for a search query, served from the text embedding cache when possible.
+        :param text: Input text string.
+        :return: Normalized text embedding as a NumPy array with shape (1, dimension).
+        """
+        embedding = self.text_cache.get_or_compute(
+            self.img_model_key, text, lambda: self.embed_text([text])[0]
+        )
+        return embedding.reshape(1, -1)
+
+    def embed_contexts(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate normalized embeddings for several context chunks in batched forward passes.
+        :param texts: List of input text strings.
+        :return: Normalized text embeddings as a float32 NumPy array, one row per text.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(self.txt_model.embed_documents(list(texts)), dtype=np.float32)
+
     def embed_context(self, text):
         """
         Generate an embedding for context and normalize it.
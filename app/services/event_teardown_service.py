@@ -0,0 +1,173 @@
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.services.database_service import DatabaseService
+from app.services.faiss_index_service import FaissIndexService
+
+# Rows deleted per transaction, each batch holds its row locks only until it commits
+EVENT_TEARDOWN_BATCH_SIZE = int(os.environ.get("EVENT_TEARDOWN_BATCH_SIZE", 1000))
+# Tables with rows of an event, children first. Image descriptions are deleted with their images (ON DELETE CASCADE).
+EVENT_TABLES = ["feedbacks", "posts", "contexts", "documents", "images"]
+# Directories with files of an event, under the upload directory
+EVENT_DIRECTORIES = ["images", "documents", "renditions"]
+# Photos of an event that still exist, planned by the query-plan check (see query_plan_service.py)
+EXISTING_PHOTOS_QUERY = "SELECT id FROM images WHERE event_id = %s AND id = ANY(%s)"
+
+def build_teardown_query(table: str) -> str:
+    """
+    Build the query deleting a batch of rows of an event from a table, its parameters are the event ID
+    and the batch size.
+    :param table: One of EVENT_TABLES.
+    """
+    if table not in EVENT_TABLES:
+        raise ValueError(f"Invalid table '{table}'. Expected one of {EVENT_TABLES}.")
+    return f"""
+    DELETE FROM {table} WHERE id IN (
+        SELECT id FROM {table} WHERE event_id = %s LIMIT %s FOR UPDATE SKIP LOCKED
+    )
+    """
+
+class EventTeardownService:
+    """
+    Delete everything that belongs to an event after its events row is gone: the rows of its tables, in
+    batches of batch_size rows per transaction so large events never hold locks for long, and its upload
+    directories. Teardown is idempotent, an interrupted teardown can simply be run again.
+    """
+
+    def __init__(
+            self,
+            upload_dir: str = "uploads",
+            batch_size: int = EVENT_TEARDOWN_BATCH_SIZE,
+            search_index: Optional[FaissIndexService] = None
+            ):
+        """
+        Initialize the EventTeardownService.
+        :param upload_dir: Base directory of the uploads.
+        :param batch_size: Rows deleted per transaction.
+        :param search_index: In-memory search index to drop the event from, if enabled.
+        """
+        self.upload_dir = upload_dir
+        self.batch_size = batch_size
+        self.search_index = search_index
+
+    def teardown(
+            self,
+            event_id: int,
+            on_step: Optional[Callable[[Dict[str, Any]], None]] = None,
+            on_batch: Optional[Callable[[], None]] = None
+            ) -> Dict[str, int]:
+        """
+        Delete the rows and the files of an event.
+        :param event_id: Event ID.
+        :param on_step: Optional callable receiving the result of each table and of the files once they are deleted,
+                        e.g. {"table": "images", "status": "deleted", "rows": 1200}.
+        :param on_batch: Optional callable called after each committed batch, e.g. to report the job is alive.
+        :return: Number of deleted rows per table, and 'directories' with the number of removed directories.
+        """
+        deleted = {}
+        for table in EVENT_TABLES:
+            deleted[table] = self.delete_rows(table, event_id, on_batch)
+            print(f"[TEARDOWN] Event {event_id}: deleted {deleted[table]} rows from {table}")
+            if on_step is not None:
+                on_step({"table": table, "status": "deleted", "rows": deleted[table]})
+
+        if self.search_index is not None:
+            self.search_index.invalidate(event_id)
+        deleted["directories"] = self.remove_files(event_id)
+        if on_step is not None:
+            on_step({"files": "uploads", "status": "deleted", "directories": deleted["directories"]})
+        return deleted
+
+    def delete_rows(self, table: str, event_id: int, on_batch: Optional[Callable[[], None]] = None) -> int:
+        """
+        Delete the rows of an event from a table, batch_size rows per transaction.
+        :return: Number of deleted rows.
+        """
+        query = build_teardown_query(table)
+        deleted = 0
+        with DatabaseService() as db:
+            while True:
+                try:
+                    # SKIP LOCKED keeps batches from waiting on rows another transaction holds,
+                    # rows skipped this way are found later by reconcile_orphans.py
+                    db.cursor.execute(query, (event_id, self.batch_size))
+                    batch_deleted = db.cursor.rowcount
+                    db.connection.commit()
+                except Exception:
+                    db.connection.rollback()
+                    raise
+                deleted += batch_deleted
+                if on_batch is not None:
+                    on_batch()
+                if batch_deleted == 0:
+                    break
+        return deleted
+
+    def remove_files(self, event_id: int) -> int:
+        """
+        Remove the upload directories of an event.
+        :return: Number of removed directories.
+        """
+        removed = 0
+        for directory in EVENT_DIRECTORIES:
+            path = os.path.join(self.upload_dir, directory, str(event_id))
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def find_orphan_events(self) -> List[int]:
+        """
+        Find the IDs of deleted events that still have rows or upload directories, e.g. deleted before
+        teardown existed or while the teardown job was interrupted.
+        :return: Sorted event IDs.
+        """
+        event_ids = set()
+        with DatabaseService() as db:
+            for table in EVENT_TABLES:
+                db.cursor.execute(
+                    f"""
+                    SELECT DISTINCT event_id FROM {table} t
+                    WHERE event_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM events e WHERE e.id = t.event_id)
+                    """
+                )
+                event_ids.update(record["event_id"] for record in db.cursor.fetchall())
+
+            directory_event_ids = set()
+            for directory in EVENT_DIRECTORIES:
+                path = os.path.join(self.upload_dir, directory)
+                if os.path.isdir(path):
+                    directory_event_ids.update(int(name) for name in os.listdir(path) if name.isdigit())
+            if directory_event_ids:
+                db.cursor.execute(
+                    "SELECT id FROM events WHERE id = ANY(%s)", (sorted(directory_event_ids),)
+                )
+                existing_ids = {record["id"] for record in db.cursor.fetchall()}
+                event_ids.update(directory_event_ids - existing_ids)
+        return sorted(event_ids)
+
+    def find_orphan_photo_files(self, event_id: int, min_age_seconds: float = 3600) -> List[str]:
+        """
+        Find the photo files of an existing event without a row in the images table, e.g. left by a
+        bulk delete whose file cleanup didn't run.
+        :param event_id: Event ID.
+        :param min_age_seconds: Only files older than this are considered, uploads save their files before
+                                their rows are committed.
+        :return: Paths of the orphan files.
+        """
+        event_dir = os.path.join(self.upload_dir, "images", str(event_id))
+        if not os.path.isdir(event_dir):
+            return []
+        files = {}
+        cutoff = time.time() - min_age_seconds
+        for name in os.listdir(event_dir):
+            image_id = os.path.splitext(name)[0]
+            if image_id.isdigit() and os.path.getmtime(os.path.join(event_dir, name)) < cutoff:
+                files.setdefault(int(image_id), []).append(os.path.join(event_dir, name))
+        if not files:
+            return []
+        with DatabaseService() as db:
+            db.cursor.execute(EXISTING_PHOTOS_QUERY, (event_id, sorted(files)))
+            existing_ids = {record["id"] for record in db.cursor.fetchall()}
+        return sorted(path for image_id, paths in files.items() if image_id not in existing_ids for path in paths)
@@ -20,7 +20,12 @@ class EventsService:
         return event_id
 
     def delete_event(self, org_id, event_id):
+        """
+        Delete an event row. Its photos, context, posts, feedback and files are deleted afterwards
+        by the EventTeardownService.
+        :return: Whether the event existed in the organization.
+        """
         db = DatabaseService()
-        db.delete_record("events", {"org_id": org_id, "id": event_id})
+        deleted = db.delete_record("events", {"org_id": org_id, "id": event_id})
         db.close()
-        return True
\ No newline at end of file
+        return deleted > 0
\ No newline at end of file
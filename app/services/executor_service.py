@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Default number of worker threads per executor, each one can be overridden with an environment variable
+DEFAULT_EXECUTOR_WORKERS = {
+    "db": ("DB_EXECUTOR_WORKERS", 16),
+    "cpu": ("CPU_EXECUTOR_WORKERS", 2),
+    "http": ("HTTP_EXECUTOR_WORKERS", 16),
+    "io": ("IO_EXECUTOR_WORKERS", 8),
+    "background": ("BACKGROUND_EXECUTOR_WORKERS", 1),
+    "rendition": ("RENDITION_EXECUTOR_WORKERS", 2),
+    "ingestion": ("INGESTION_EXECUTOR_WORKERS", 2),
+}
+
+class ExecutorService:
+    """
+    Dedicated thread pools for blocking work, so async request handlers never block the event loop.
+    - db: Postgres and Redis calls.
+    - cpu: model inference and other CPU-bound work such as password hashing.
+    - http: outbound HTTP requests.
+    - io: file system work.
+    - background: precomputation after uploads, such as image descriptions, which can take minutes per upload.
+    - rendition: decoding originals into thumbnails, after uploads and on a gallery's first load.
+    - ingestion: uploads of photos and documents processed while the request waits, each one running for
+      as long as its files take to decode, embed and store.
+    Keeping them separate means a burst of slow inference can't starve quick database calls, and ingesting or
+    precomputing a large upload can't starve the inference of search and the password hashing of login.
+    """
+
+    def __init__(self, workers: Optional[Dict[str, int]] = None):
+        """
+        Initialize the executors.
+        :param workers: Optional mapping of executor name to number of worker threads.
+        """
+        workers = workers or {}
+        self.executors: Dict[str, ThreadPoolExecutor] = {}
+        for name, (env_var, default) in DEFAULT_EXECUTOR_WORKERS.items():
+            max_workers = workers.get(name) or int(os.environ.get(env_var, default))
+            self.executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-executor")
+
+    async def run(self, executor: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking function on one of the executors and await its result.
+        :param executor: Name of the executor ('db', 'cpu', 'http', 'io', 'background', 'rendition' or 'ingestion').
+        :param func: Blocking function to run.
+        :return: The return value of the function.
+        """
+        if executor not in self.executors:
+            raise ValueError(f"Invalid executor '{executor}'. Expected one of {list(self.executors)}.")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executors[executor], functools.partial(func, *args, **kwargs))
+
+    async def run_db(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("db", func, *args, **kwargs)
+
+    async def run_cpu(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("cpu", func, *args, **kwargs)
+
+    async def run_http(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("http", func, *args, **kwargs)
+
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("io", func, *args, **kwargs)
+
+    async def run_background(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("background", func, *args, **kwargs)
+
+    async def run_rendition(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("rendition", func, *args, **kwargs)
+
+    async def run_ingestion(self, func: Callable, *args, **kwargs) -> Any:
+        return await self.run("ingestion", func, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down all executors.
+        :param wait: Wait for running tasks to finish.
+        """
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import faiss
+import numpy as np
+from app.services.database_service import DatabaseService, decode_vector_binary
+
+# Number of locks the loads of event indexes are spread over
+LOCK_STRIPES = 64
+
+class _EventIndex:
+    def __init__(self, index, dimension: int):
+        self.index = index
+        self.dimension = dimension
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        # Flat index vectors plus the id map
+        return self.index.ntotal * (self.dimension * 4 + 8)
+
+class FaissIndexService:
+    """
+    In-memory FAISS indexes of the image embeddings, one per event.
+    Indexes are loaded lazily from the images table on the first search of an event, kept up to date
+    when photos are added or deleted and evicted least recently used first when over the memory budget.
+    Embeddings are L2 normalized, so inner product equals the cosine similarity computed by pgvector.
+    Each worker process holds its own indexes: changes made by other workers are picked up when an
+    index is older than max_age_seconds and reloaded.
+    """
+
+    def __init__(
+            self,
+            dimension: int = 512,
+            memory_budget_bytes: Optional[int] = None,
+            max_age_seconds: Optional[float] = None
+            ):
+        """
+        Initialize the FaissIndexService.
+        :param dimension: Dimension of the image embeddings.
+        :param memory_budget_bytes: Memory the indexes may use before cold events are evicted. Defaults to FAISS_MEMORY_BUDGET_MB.
+        :param max_age_seconds: Age after which an index is reloaded from the database. Defaults to FAISS_INDEX_MAX_AGE.
+        """
+        self.dimension = dimension
+        self.memory_budget_bytes = memory_budget_bytes or int(os.environ.get("FAISS_MEMORY_BUDGET_MB", 512)) * 2**20
+        self.max_age_seconds = max_age_seconds or float(os.environ.get("FAISS_INDEX_MAX_AGE", 300))
+        self._indexes: "OrderedDict[int, _EventIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # Changes received while an event is being loaded, applied once the load finishes
+        self._pending: Dict[int, List] = {}
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def search(self, event_id: int, embedding: np.ndarray, threshold: float, limit: Optional[int] = None, offset: int = 0) -> List[int]:
+        """
+        Search the images of an event that are similar to an embedding.
+        :param event_id: Event ID.
+        :param embedding: Normalized query embedding with shape (1, dimension).
+        :param threshold: Only images with a similarity above this value are returned.
+        :param limit: Maximum number of image IDs to return, None for all of them.
+        :param offset: Number of results to skip.
+        :return: Image IDs, most similar first.
+        """
+        event_index = self._get_event_index(event_id)
+        query = np.ascontiguousarray(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        with event_index.lock:
+            total = event_index.index.ntotal
+            k = total if limit is None else min(offset + limit, total)
+            if k == 0:
+                return []
+            similarities, ids = event_index.index.search(query, k)
+
+        results = [int(image_id) for similarity, image_id in zip(similarities[0], ids[0])
+                   if image_id != -1 and similarity > threshold]
+        return results[offset:] if limit is None else results[offset:offset + limit]
+
+    def add(self, event_id: int, image_ids: List[int], embeddings: np.ndarray):
+        """
+        Add photos to the index of their event, if it is loaded.
+        :param event_id: Event ID.
+        :param image_ids: IDs of the photos.
+        :param embeddings: Normalized embeddings, one row per photo.
+        """
+        self._apply(int(event_id), ("add", list(image_ids), embeddings))
+
+    def remove(self, event_id: int, image_ids: List[int]):
+        """
+        Remove photos from the index of their event, if it is loaded.
+        :param event_id: Event ID.
+        :param image_ids: IDs of the photos.
+        """
+        self._apply(int(event_id), ("remove", list(image_ids), None))
+
+    def invalidate(self, event_id: int):
+        """
+        Drop the index of an event, it is reloaded on its next search.
+        :param event_id: Event ID.
+        """
+        with self._lock:
+            self._indexes.pop(int(event_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the loaded events, memory usage and cache statistics.
+        """
+        with self._lock:
+            return {
+                "events": {event_id: entry.index.ntotal for event_id, entry in self._indexes.items()},
+                "memory_bytes": sum(entry.size_bytes for entry in self._indexes.values()),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                **self._stats,
+            }
+
+    def _get_event_index(self, event_id: int) -> _EventIndex:
+        event_id = int(event_id)
+        with self._lock:
+            entry = self._indexes.get(event_id)
+            if entry is not None and time.monotonic() - entry.loaded_at < self.max_age_seconds:
+                self._indexes.move_to_end(event_id)
+                self._stats["hits"] += 1
+                return entry
+            load_lock = self._load_locks[event_id % LOCK_STRIPES]
+
+        with load_lock:
+            with self._lock:
+                entry = self._indexes.get(event_id)
+                if entry is not None and time.monotonic() - entry.loaded_at < self.max_age_seconds:
+                    return entry
+                self._pending[event_id] = []
+
+            try:
+                entry = self._load(event_id)
+            finally:
+                with self._lock:
+                    pending = self._pending.pop(event_id, [])
+
+            for change in pending:
+                self._apply_to(entry, change)
+
+            with self._lock:
+                self._indexes[event_id] = entry
+                self._indexes.move_to_end(event_id)
+                self._stats["loads"] += 1
+                self._evict(keep=event_id)
+            return entry
+
+    def _load(self, event_id: int) -> _EventIndex:
+        db = DatabaseService()
+        try:
+            # Binary vectors are much cheaper to decode than the text format
+            db.cursor.execute("SELECT id, vector_send(embedding) AS embedding FROM images WHERE event_id = %s", (event_id,))
+            records = db.cursor.fetchall()
+        finally:
+            db.close()
+
+        index = faiss.IndexIDMap(faiss.IndexFlatIP(self.dimension))
+        if records:
+            ids = np.array([record["id"] for record in records], dtype=np.int64)
+            vectors = np.stack([decode_vector_binary(record["embedding"]) for record in records])
+            index.add_with_ids(vectors, ids)
+        return _EventIndex(index, self.dimension)
+
+    def _apply(self, event_id: int, change):
+        with self._lock:
+            if event_id in self._pending:
+                self._pending[event_id].append(change)
+                return
+            entry = self._indexes.get(event_id)
+        if entry is not None:
+            self._apply_to(entry, change)
+
+    def _apply_to(self, entry: _EventIndex, change):
+        action, image_ids, embeddings = change
+        ids = np.array(image_ids, dtype=np.int64)
+        with entry.lock:
+            # Removing first keeps ids unique when a change is applied on top of a fresh load
+            entry.index.remove_ids(ids)
+            if action == "add":
+                vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+                entry.index.add_with_ids(vectors, ids)
+
+    def _evict(self, keep: int):
+        total = sum(entry.size_bytes for entry in self._indexes.values())
+        for event_id in list(self._indexes.keys()):
+            if total <= self.memory_budget_bytes:
+                break
+            if event_id == keep:
+                continue
+            total -= self._indexes.pop(event_id).size_bytes
+            self._stats["evictions"] += 1
@@ -1,9 +1,114 @@
 # from app.features.caption_generation_model import CaptionGenerationModel
+import os
+import threading
+from typing import Dict, List, Optional
+from psycopg2.extras import execute_values
 from app.features.caption_generation_model_v2 import CaptionGenerationModel
+from app.services.database_service import DatabaseService, decode_vector_binary
+from app.services.photos_service import PHOTOS_BY_ID_QUERY
+from app.services.model_registry import ModelRegistry, model_registry
+
+CAPTION_MODEL_KEY = "clipcap:coco_weights"
+# Stored descriptions are keyed by this version, change it when the weights or the decoding change
+CAPTION_MODEL_VERSION = os.environ.get("CAPTION_MODEL_VERSION", "clipcap-coco-v1")
+# Queries run as is by the service and planned by the query-plan check (see query_plan_service.py)
+# Descriptions are read through the images of the event, so IDs of other events are never described
+STORED_DESCRIPTIONS_QUERY = """
+SELECT d.image_id, d.description FROM image_descriptions d
+JOIN images i ON i.id = d.image_id
+WHERE i.event_id = %s AND d.image_id = ANY(%s) AND d.model_version = %s
+"""
 
 class  ImageDescriptionService:
-    def __init__(self):
-        self.caption_generation_model = CaptionGenerationModel()
+    def __init__(self, registry: Optional[ModelRegistry] = None, model_version: str = CAPTION_MODEL_VERSION):
+        self.registry = registry or model_registry
+        self.model_version = model_version
+        self._caption_generation_model = None
+        self._lock = threading.Lock()
+
+    @property
+    def caption_generation_model(self) -> CaptionGenerationModel:
+        """ClipCap model resolved from the shared model registry."""
+        if self._caption_generation_model is None:
+            # Startup preload, precompute and caption requests resolve it from different threads, it is acquired once
+            with self._lock:
+                if self._caption_generation_model is None:
+                    self._caption_generation_model = self.registry.acquire(CAPTION_MODEL_KEY, CaptionGenerationModel)
+        return self._caption_generation_model
+
+    def close(self):
+        """
+        Release the caption model held by this service.
+        """
+        with self._lock:
+            if self._caption_generation_model is not None:
+                self.registry.release(CAPTION_MODEL_KEY)
+                self._caption_generation_model = None
 
     def generate_caption(self, embedding, max_length=30):
-        return self.caption_generation_model.evaluate(embedding, max_length)
\ No newline at end of file
+        return self.caption_generation_model.evaluate(embedding, max_length)
+
+    def generate_captions(self, embeddings, max_length=30) -> List[str]:
+        """
+        Generate captions for several images, decoded together in batches.
+        :param embeddings: Unnormalized CLIP embeddings, one row per image.
+        :param max_length: Maximum number of tokens per caption.
+        :return: One caption per embedding.
+        """
+        if len(embeddings) == 0:
+            return []
+        return self.caption_generation_model.evaluate_batch(embeddings, max_length)
+
+    def get_descriptions(self, event_id: int, image_ids: List[int]) -> Dict[int, str]:
+        """
+        Get the stored descriptions of images of an event for the current caption model version.
+        :param event_id: Event ID of the images.
+        :param image_ids: List of image IDs.
+        :return: Dictionary mapping image IDs to their description, images without one are left out.
+        """
+        if not image_ids:
+            return {}
+        with DatabaseService() as db:
+            db.cursor.execute(STORED_DESCRIPTIONS_QUERY, (event_id, list(image_ids), self.model_version))
+            return {record["image_id"]: record["description"] for record in db.cursor.fetchall()}
+
+    def store_descriptions(self, descriptions: Dict[int, str]):
+        """
+        Store image descriptions for the current caption model version.
+        Decoding is deterministic, so a description stored concurrently for the same image is kept.
+        :param descriptions: Dictionary mapping image IDs to their description.
+        """
+        if not descriptions:
+            return
+        with DatabaseService() as db:
+            execute_values(
+                db.cursor,
+                """
+                INSERT INTO image_descriptions (image_id, model_version, description) VALUES %s
+                ON CONFLICT (image_id, model_version) DO NOTHING
+                """,
+                [(image_id, self.model_version, description) for image_id, description in descriptions.items()]
+            )
+            db.connection.commit()
+
+    def precompute_descriptions(self, event_id: int, image_ids: List[int]) -> int:
+        """
+        Generate and store the descriptions of images of an event that don't have one yet, e.g. right after upload.
+        :param event_id: Event ID of the images, IDs of other events are ignored.
+        :param image_ids: List of image IDs.
+        :return: Number of descriptions generated.
+        """
+        stored = self.get_descriptions(event_id, image_ids)
+        missing = [image_id for image_id in image_ids if image_id not in stored]
+        if not missing:
+            return 0
+        with DatabaseService() as db:
+            db.cursor.execute(PHOTOS_BY_ID_QUERY, (event_id, missing))
+            records = db.cursor.fetchall()
+
+        # ClipCap was trained on unnormalized CLIP embeddings
+        embeddings = [decode_vector_binary(record["embedding"]) * record["norm"] for record in records]
+        captions = self.generate_captions(embeddings)
+        descriptions = {record["id"]: caption for record, caption in zip(records, captions)}
+        self.store_descriptions(descriptions)
+        return len(descriptions)
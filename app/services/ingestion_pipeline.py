@@ -0,0 +1,320 @@
+import os
+import queue
+import threading
+import time
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from app.features.image_filtering import ImageFilter
+from app.services.database_service import DatabaseService
+
+_SENTINEL = object()
+# CLIP input resolution, images that are not blur-checked are decoded at the smallest scale that covers it
+EMBED_DECODE_SIZE = 224
+# EXIF orientations that rotate the image by 90 degrees, its displayed width and height are swapped
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+EXIF_ORIENTATION_TAG = 0x0112
+
+def decode_image(file_content: bytes, blur_threshold: float, apply_filter: bool = True) -> Dict[str, Any]:
+    """
+    Decode an image and check its sharpness. Defined at module level so it can run in a process pool.
+    :param file_content: Encoded image bytes.
+    :param blur_threshold: Images with a Laplacian variance below this value are considered blurry.
+    :param apply_filter: Whether to check the image sharpness. The blur check needs the full resolution,
+                         without it JPEGs are decoded at a reduced scale (PIL draft mode) for embedding.
+    :return: Dictionary with the status ('sharp', 'blurred' or 'error'), the RGB image, the metadata of the
+             file ('format', 'width', 'height', 'byte_size') and the time spent.
+    """
+    start = time.perf_counter()
+    try:
+        # Only reads the header
+        header = Image.open(BytesIO(file_content))
+        width, height = header.size
+        # Resolution as displayed, i.e. after the EXIF rotation applied when decoding
+        if header.getexif().get(EXIF_ORIENTATION_TAG) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        metadata = {
+            "format": header.format,
+            "width": width,
+            "height": height,
+            "byte_size": len(file_content),
+        }
+    except Exception:
+        return {"status": "error", "seconds": time.perf_counter() - start}
+
+    sharpness = None
+    if apply_filter:
+        image = cv2.imdecode(np.frombuffer(file_content, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return {"status": "error", "seconds": time.perf_counter() - start}
+        image_filter = ImageFilter(threshold=blur_threshold)
+        sharpness = image_filter.variance_of_laplacian(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+        if sharpness < blur_threshold:
+            return {"status": "blurred", "sharpness": sharpness, "seconds": time.perf_counter() - start}
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    else:
+        header.draft("RGB", (EMBED_DECODE_SIZE, EMBED_DECODE_SIZE))
+        # Rotate like cv2.imdecode does, so embeddings don't depend on the decode path
+        image = np.asarray(ImageOps.exif_transpose(header).convert("RGB"))
+
+    return {
+        "status": "sharp",
+        "image": image,
+        "sharpness": sharpness,
+        "metadata": metadata,
+        "seconds": time.perf_counter() - start,
+    }
+
+class StageStats:
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.busy_seconds += seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "workers": self.workers,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items * self.workers / self.busy_seconds, 2) if self.busy_seconds else None,
+        }
+
+class IngestionPipeline:
+    """
+    Staged photo ingestion pipeline connected by bounded queues:
+    1. decode: decodes images and checks their sharpness on a thread or process pool.
+    2. embed: embeds sharp images in CLIP batches.
+    3. persist: inserts each embedded batch and saves its files, all in a single transaction.
+    The stages run concurrently, so decoding the next images overlaps with embedding and storing the previous ones.
+    """
+
+    def __init__(
+            self,
+            photos_service,
+            decode_workers: Optional[int] = None,
+            use_processes: bool = False,
+            queue_size: Optional[int] = None,
+            log: Optional[Callable[[str], None]] = None
+            ):
+        """
+        Initialize the pipeline.
+        :param photos_service: PhotosService used to embed and store photos.
+        :param decode_workers: Number of decode workers. Defaults to INGESTION_DECODE_WORKERS or the number of cores.
+        :param use_processes: Decode in a process pool instead of a thread pool.
+        :param queue_size: Maximum number of images decoded ahead of the embedding stage.
+        :param log: Optional callable receiving a message for each processed file.
+        """
+        self.photos_service = photos_service
+        self.embedding_service = photos_service.embedding_service
+        self.decode_workers = decode_workers or int(os.environ.get("INGESTION_DECODE_WORKERS", os.cpu_count() or 1))
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.decode_executor = executor_class(max_workers=self.decode_workers)
+        self.queue_size = queue_size or 2 * self.decode_workers
+        self.log = log or (lambda message: None)
+
+    def run(
+            self,
+            event_id: int,
+            files: List,
+            blur_threshold: float,
+            apply_filter: bool = True,
+            on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
+            on_commit: Optional[Callable[[List[int]], None]] = None
+            ) -> Dict[str, Any]:
+        """
+        Run the pipeline on a list of uploaded files.
+        :param event_id: Event ID for the photos.
+        :param files: List of uploaded files (objects with `filename` and `file` attributes).
+        :param blur_threshold: Sharpness threshold for filtering.
+        :param apply_filter: Whether to drop blurry images.
+        :param on_item: Optional callable receiving the result of each file once it is filtered out or stored,
+                        e.g. {"file": "a.png", "status": "uploaded", "image_id": 3}.
+        :param on_commit: Optional callable receiving the uploaded image IDs right after they are committed,
+                          e.g. so a retried job doesn't ingest the same files again.
+        :return: Dictionary with the uploaded image IDs, sharp and blurred counts, per-file errors and per-stage stats.
+        """
+        start = time.perf_counter()
+        stats = {
+            "decode": StageStats("decode", self.decode_workers),
+            "embed": StageStats("embed"),
+            "persist": StageStats("persist"),
+        }
+        state = {
+            "blurred_count": 0, "errors": [], "uploaded_image_ids": [], "failure": None,
+            "on_item": on_item or (lambda item: None),
+            "on_commit": on_commit or (lambda image_ids: None),
+        }
+        stop = threading.Event()
+        decoded_queue = queue.Queue(maxsize=self.queue_size)
+        embedded_queue = queue.Queue(maxsize=2)
+
+        stages = [
+            threading.Thread(target=self._embed_stage, args=(decoded_queue, embedded_queue, stats, state, stop)),
+            threading.Thread(target=self._persist_stage, args=(embedded_queue, event_id, stats, state, stop)),
+        ]
+        for stage in stages:
+            stage.start()
+        try:
+            for file in files:
+                if stop.is_set():
+                    break
+                content = file.file.read()
+                future = self.decode_executor.submit(decode_image, content, blur_threshold, apply_filter)
+                # The encoded bytes are kept, photos are stored as uploaded
+                self._put(decoded_queue, (file.filename, content, future), stop)
+        except Exception as feed_error:
+            self._fail(state, stop, feed_error)
+        finally:
+            self._put(decoded_queue, _SENTINEL, stop)
+            for stage in stages:
+                stage.join()
+
+        if state["failure"] is not None:
+            raise state["failure"]
+
+        wall_seconds = time.perf_counter() - start
+        uploaded_image_ids = state["uploaded_image_ids"]
+        return {
+            "uploaded_image_ids": uploaded_image_ids,
+            "sharp_count": len(uploaded_image_ids),
+            "blurred_count": state["blurred_count"],
+            "errors": state["errors"],
+            "stats": {
+                "wall_seconds": round(wall_seconds, 3),
+                "images_per_second": round(len(files) / wall_seconds, 2) if wall_seconds else None,
+                "stages": {name: stage.to_dict() for name, stage in stats.items()},
+            },
+        }
+
+    def _embed_stage(self, decoded_queue, embedded_queue, stats, state, stop):
+        batch = []
+
+        def flush():
+            if not batch:
+                return
+            start = time.perf_counter()
+            embeddings, norm_factors = self.embedding_service.embed_images([image for _, image, _ in batch])
+            stats["embed"].add(len(batch), time.perf_counter() - start)
+            self._put(embedded_queue, (list(batch), embeddings, norm_factors), stop)
+            batch.clear()
+
+        try:
+            while True:
+                item = self._get(decoded_queue, stop)
+                if item is None:
+                    return
+                if item is _SENTINEL:
+                    flush()
+                    return
+                file_name, content, future = item
+                try:
+                    decoded = future.result()
+                except Exception as decode_error:
+                    decoded = {"status": "error", "seconds": 0.0, "message": str(decode_error)}
+                stats["decode"].add(1, decoded["seconds"])
+
+                if decoded["status"] == "error":
+                    error_message = f"[ERROR] {file_name} - Processing failed: {decoded['message']}" \
+                        if "message" in decoded else f"[ERROR] Unable to read image: {file_name}"
+                    state["errors"].append(error_message)
+                    self.log(error_message)
+                    state["on_item"]({"file": file_name, "status": "error", "error": error_message})
+                elif decoded["status"] == "blurred":
+                    state["blurred_count"] += 1
+                    self.log(f"[BLURRY] {file_name} - Identified as blurry.")
+                    state["on_item"]({"file": file_name, "status": "blurred"})
+                else:
+                    original = dict(decoded["metadata"], content=content, sharpness=decoded["sharpness"])
+                    batch.append((file_name, Image.fromarray(decoded["image"]), original))
+                    if len(batch) >= self.embedding_service.max_batch_size:
+                        flush()
+        except Exception as stage_error:
+            self._fail(state, stop, stage_error)
+        finally:
+            self._put(embedded_queue, _SENTINEL, stop)
+
+    def _persist_stage(self, embedded_queue, event_id, stats, state, stop):
+        db = None
+        committed = False
+        saved_paths = []
+        stored_embeddings = []
+        try:
+            while True:
+                item = self._get(embedded_queue, stop)
+                if item is None:
+                    break
+                if item is _SENTINEL:
+                    if db is not None and not stop.is_set():
+                        db.connection.commit()
+                        committed = True
+                        state["on_commit"](list(state["uploaded_image_ids"]))
+                        try:
+                            self.photos_service.index_photos(
+                                event_id, state["uploaded_image_ids"], np.concatenate(stored_embeddings)
+                            )
+                        except Exception as index_error:
+                            # The photos are stored, the search index reloads them from the database
+                            print(f"[INGESTION] Failed to index photos of event {event_id}: {index_error}")
+                    break
+                batch, embeddings, norm_factors = item
+                start = time.perf_counter()
+                db = db or DatabaseService()
+                image_ids, paths = self.photos_service.store_photos(
+                    db, [image for _, image, _ in batch], embeddings, norm_factors, event_id,
+                    originals=[original for _, _, original in batch]
+                )
+                saved_paths.extend(paths)
+                stored_embeddings.append(np.asarray(embeddings))
+                stats["persist"].add(len(batch), time.perf_counter() - start)
+                state["uploaded_image_ids"].extend(image_ids)
+                for (file_name, _, _), image_id in zip(batch, image_ids):
+                    self.log(f"[UPLOADED] {file_name} - Uploaded successfully with ID {image_id}.")
+                    state["on_item"]({"file": file_name, "status": "uploaded", "image_id": image_id})
+        except Exception as stage_error:
+            self._fail(state, stop, stage_error)
+        finally:
+            if stop.is_set() and not committed:
+                # Nothing was committed, undo the rows and the files of this run
+                state["uploaded_image_ids"].clear()
+                if db is not None:
+                    db.connection.rollback()
+                for path in saved_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+            if db is not None:
+                db.close()
+
+    @staticmethod
+    def _fail(state, stop, error):
+        if state["failure"] is None:
+            state["failure"] = error
+        stop.set()
+
+    @staticmethod
+    def _put(target_queue: queue.Queue, item, stop: threading.Event):
+        # Block while the queue is full, unless the pipeline is stopping
+        while True:
+            try:
+                target_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    return
+
+    @staticmethod
+    def _get(source_queue: queue.Queue, stop: threading.Event):
+        # Returns None when the pipeline is stopping
+        while True:
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return None
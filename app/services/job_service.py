@@ -0,0 +1,307 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+import redis
+
+# Redis used as the job broker, same settings as the token blacklist
+REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+
+class JobContext:
+    """
+    Handle given to job handlers to read the job parameters and report per-item progress.
+    """
+
+    def __init__(self, service: "JobService", job_id: str, params: Dict[str, Any], attempt: int):
+        self.service = service
+        self.job_id = job_id
+        self.params = params
+        self.attempt = attempt
+
+    @property
+    def is_last_attempt(self) -> bool:
+        return self.attempt >= self.service.max_attempts
+
+    def set_total(self, total_items: int):
+        """
+        Set the number of items of the job, for progress reporting.
+        """
+        self.service.redis.hset(self.service.job_key(self.job_id), "total_items", total_items)
+
+    def heartbeat(self):
+        """
+        Report the job is still running, for long items.
+        """
+        self.service.redis.hset(self.service.job_key(self.job_id), "heartbeat_at", time.time())
+
+    @property
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        """
+        Progress saved by a previous attempt with save_checkpoint, None on the first attempt.
+        """
+        checkpoint = self.service.redis.hget(self.service.job_key(self.job_id), "checkpoint")
+        return json.loads(checkpoint) if checkpoint else None
+
+    def save_checkpoint(self, checkpoint: Dict[str, Any]):
+        """
+        Save the progress of the job, kept across retries so they can skip the work already committed.
+        :param checkpoint: JSON serializable progress, e.g. {"uploaded_image_ids": [3, 4]}.
+        """
+        self.service.redis.hset(self.service.job_key(self.job_id), mapping={
+            "checkpoint": json.dumps(checkpoint), "heartbeat_at": time.time(),
+        })
+
+    def item_done(self, result: Dict[str, Any]):
+        """
+        Record the result of one item. Items with status 'error' are counted as failed.
+        :param result: JSON serializable result of the item, e.g. {"file": "a.png", "status": "uploaded", "image_id": 3}.
+        """
+        job_key = self.service.job_key(self.job_id)
+        pipe = self.service.redis.pipeline()
+        pipe.rpush(self.service.results_key(self.job_id), json.dumps(result))
+        pipe.hincrby(job_key, "processed_items", 1)
+        if result.get("status") == "error":
+            pipe.hincrby(job_key, "failed_items", 1)
+        pipe.hset(job_key, "heartbeat_at", time.time())
+        pipe.execute()
+
+class JobService:
+    """
+    Background jobs with Redis as the broker.
+    Jobs are stored in a hash per job and their IDs pushed to a queue list. Workers move the ID to a
+    processing list while they run it, so jobs of a crashed worker can be put back in the queue.
+    Failed jobs are retried up to max_attempts times. Workers run as threads of the API process or in
+    separate processes (see worker.py), they only need the handlers to be registered.
+    """
+
+    def __init__(
+            self,
+            redis_client: Optional[redis.Redis] = None,
+            namespace: str = "jobs",
+            max_attempts: Optional[int] = None,
+            result_ttl: Optional[int] = None,
+            stale_after: Optional[float] = None
+            ):
+        """
+        Initialize the JobService.
+        :param redis_client: Redis client to use, created lazily when not provided.
+        :param namespace: Prefix of the Redis keys.
+        :param max_attempts: Number of times a job is run before it is marked as failed. Defaults to JOB_MAX_ATTEMPTS.
+        :param result_ttl: Seconds finished jobs are kept. Defaults to JOB_RESULT_TTL.
+        :param stale_after: Seconds without progress after which a running job is considered lost. Defaults to JOB_STALE_AFTER.
+        """
+        self._redis = redis_client
+        self.namespace = namespace
+        self.max_attempts = max_attempts or int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+        self.result_ttl = result_ttl or int(os.environ.get("JOB_RESULT_TTL", 7 * 24 * 3600))
+        self.stale_after = stale_after or float(os.environ.get("JOB_STALE_AFTER", 900))
+        self.queue_key = f"{namespace}:queue"
+        self.processing_key = f"{namespace}:processing"
+        self.handlers: Dict[str, Callable[[JobContext], Any]] = {}
+        self.cleanups: Dict[str, Callable[[JobContext], None]] = {}
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+        return self._redis
+
+    def job_key(self, job_id: str) -> str:
+        return f"{self.namespace}:{job_id}"
+
+    def results_key(self, job_id: str) -> str:
+        return f"{self.namespace}:{job_id}:results"
+
+    def register_handler(
+            self,
+            job_type: str,
+            handler: Callable[[JobContext], Any],
+            cleanup: Optional[Callable[[JobContext], None]] = None
+            ):
+        """
+        Register the function that runs the jobs of a type.
+        :param job_type: Type of the jobs.
+        :param handler: Callable receiving a JobContext, its return value is stored as the job result.
+        :param cleanup: Optional callable run once a job has failed for the last time, e.g. to remove its files.
+        """
+        self.handlers[job_type] = handler
+        if cleanup is not None:
+            self.cleanups[job_type] = cleanup
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    def enqueue(self, job_type: str, params: Dict[str, Any], total_items: int = 0, job_id: Optional[str] = None) -> str:
+        """
+        Add a job to the queue.
+        :param job_type: Type of the job, a handler must be registered for it in the workers.
+        :param params: JSON serializable parameters of the job.
+        :param total_items: Number of items of the job, for progress reporting.
+        :param job_id: ID of the job, for callers that need it before enqueuing (e.g. to save the job files).
+        :return: The job ID.
+        """
+        job_id = job_id or self.new_job_id()
+        pipe = self.redis.pipeline()
+        pipe.hset(self.job_key(job_id), mapping={
+            "id": job_id,
+            "type": job_type,
+            "status": "queued",
+            "params": json.dumps(params),
+            "attempts": 0,
+            "total_items": total_items,
+            "processed_items": 0,
+            "failed_items": 0,
+            "created_at": time.time(),
+        })
+        pipe.lpush(self.queue_key, job_id)
+        pipe.execute()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status, progress, per-item results and throughput of a job.
+        :param job_id: Job ID.
+        :return: Dictionary describing the job, or None if it doesn't exist.
+        """
+        job = self.redis.hgetall(self.job_key(job_id))
+        if not job:
+            return None
+        results = [json.loads(result) for result in self.redis.lrange(self.results_key(job_id), 0, -1)]
+
+        processed_items = int(job.get("processed_items", 0))
+        started_at = float(job["started_at"]) if job.get("started_at") else None
+        finished_at = float(job["finished_at"]) if job.get("finished_at") else None
+        elapsed = ((finished_at or time.time()) - started_at) if started_at else None
+        return {
+            "id": job["id"],
+            "type": job["type"],
+            "status": job["status"],
+            "attempts": int(job.get("attempts", 0)),
+            "total_items": int(job.get("total_items", 0)),
+            "processed_items": processed_items,
+            "failed_items": int(job.get("failed_items", 0)),
+            "created_at": float(job["created_at"]),
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "items_per_second": round(processed_items / elapsed, 2) if elapsed else None,
+            "error": job.get("error"),
+            "result": json.loads(job["result"]) if job.get("result") else None,
+            "items": results,
+        }
+
+    def process_next(self, timeout: int = 1) -> bool:
+        """
+        Run the next job of the queue, waiting up to timeout seconds for one.
+        :return: Whether a job was run.
+        """
+        job_id = self.redis.brpoplpush(self.queue_key, self.processing_key, timeout=timeout)
+        if job_id is None:
+            return False
+
+        job_key = self.job_key(job_id)
+        job = self.redis.hgetall(job_key)
+        if not job:
+            self.redis.lrem(self.processing_key, 0, job_id)
+            return True
+
+        attempt = int(job.get("attempts", 0)) + 1
+        now = time.time()
+        # Progress is reported again from scratch on retries
+        pipe = self.redis.pipeline()
+        pipe.hset(job_key, mapping={
+            "status": "running", "attempts": attempt, "started_at": now, "heartbeat_at": now,
+            "processed_items": 0, "failed_items": 0,
+        })
+        pipe.delete(self.results_key(job_id))
+        pipe.execute()
+
+        context = JobContext(self, job_id, json.loads(job["params"]), attempt)
+        handler = self.handlers.get(job["type"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for jobs of type '{job['type']}'")
+            result = handler(context)
+        except Exception as job_error:
+            print(f"[JOB] {job['type']} {job_id} attempt {attempt} failed: {job_error}")
+            traceback.print_exc()
+            self._finish_failed(context, job, job_error)
+        else:
+            self.redis.hset(job_key, mapping={
+                "status": "succeeded", "finished_at": time.time(), "result": json.dumps(result),
+            })
+            self._expire(job_id)
+        finally:
+            self.redis.lrem(self.processing_key, 0, job_id)
+        return True
+
+    def recover_stale_jobs(self) -> int:
+        """
+        Put back in the queue the jobs of workers that stopped reporting progress, e.g. because they crashed.
+        :return: Number of jobs put back in the queue.
+        """
+        recovered = 0
+        for job_id in self.redis.lrange(self.processing_key, 0, -1):
+            heartbeat_at = self.redis.hget(self.job_key(job_id), "heartbeat_at")
+            if heartbeat_at is None or time.time() - float(heartbeat_at) > self.stale_after:
+                if self.redis.lrem(self.processing_key, 0, job_id):
+                    self.redis.lpush(self.queue_key, job_id)
+                    recovered += 1
+        return recovered
+
+    def start_workers(self, count: int):
+        """
+        Start worker threads in this process.
+        :param count: Number of worker threads.
+        """
+        self._stop.clear()
+        self.recover_stale_jobs()
+        for index in range(count):
+            worker = threading.Thread(target=self.run_worker, name=f"job-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def run_worker(self):
+        """
+        Run jobs until stop_workers is called.
+        """
+        while not self._stop.is_set():
+            try:
+                self.process_next(timeout=1)
+            except redis.RedisError as redis_error:
+                print(f"[JOB] Redis error, retrying: {redis_error}")
+                self._stop.wait(5)
+
+    def stop_workers(self, timeout: float = 5):
+        """
+        Stop the worker threads once they finish their current job.
+        """
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def _finish_failed(self, context: JobContext, job: Dict[str, Any], job_error: Exception):
+        job_key = self.job_key(context.job_id)
+        if not context.is_last_attempt:
+            self.redis.hset(job_key, mapping={"status": "retrying", "error": str(job_error)})
+            self.redis.lpush(self.queue_key, context.job_id)
+            return
+        self.redis.hset(job_key, mapping={"status": "failed", "finished_at": time.time(), "error": str(job_error)})
+        self._expire(context.job_id)
+        cleanup = self.cleanups.get(job["type"])
+        if cleanup is not None:
+            try:
+                cleanup(context)
+            except Exception as cleanup_error:
+                print(f"[JOB] Cleanup of {context.job_id} failed: {cleanup_error}")
+
+    def _expire(self, job_id: str):
+        self.redis.expire(self.job_key(job_id), self.result_ttl)
+        self.redis.expire(self.results_key(job_id), self.result_ttl)
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+from typing import Dict, List, Optional
+from app.services.database_service import DatabaseService
+
+MIGRATIONS_DIR = os.environ.get(
+    "MIGRATIONS_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "vector_database", "migrations")
+)
+# Key of the advisory lock that serializes migration runs, e.g. several API replicas starting at once
+MIGRATION_LOCK_KEY = 7310284
+# First line of migrations whose statements can't run inside a transaction block (CREATE INDEX CONCURRENTLY)
+NO_TRANSACTION_DIRECTIVE = "-- migrate:no-transaction"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+class MigrationService:
+    """
+    Forward-only schema migrations. Migrations are the SQL files of the migrations directory, named
+    {version}_{name}.sql and applied in version order. Applied versions are recorded with a checksum in the
+    schema_migrations table, and a migration whose file changed after it was applied stops the upgrade.
+
+    Each migration runs in its own transaction, unless its first line is '-- migrate:no-transaction':
+    its statements then run one by one outside a transaction, so indexes can be built CONCURRENTLY on live
+    tables. Such migrations can't be rolled back when they fail halfway, so their statements must be
+    idempotent (IF NOT EXISTS / IF EXISTS) to be run again.
+    """
+
+    def __init__(self, migrations_dir: str = MIGRATIONS_DIR):
+        """
+        Initialize the MigrationService.
+        :param migrations_dir: Directory of the migration files.
+        """
+        self.migrations_dir = migrations_dir
+
+    def load_migrations(self) -> List[Dict]:
+        """
+        Read the migration files.
+        :return: Migrations in version order, with 'version', 'name', 'sql', 'checksum' and 'transactional'.
+        """
+        migrations = {}
+        for file_name in sorted(os.listdir(self.migrations_dir)):
+            match = MIGRATION_FILE_PATTERN.match(file_name)
+            if not match:
+                continue
+            version = int(match.group(1))
+            if version in migrations:
+                raise ValueError(f"Duplicate migration version {version}: {file_name} and {migrations[version]['file']}.")
+            with open(os.path.join(self.migrations_dir, file_name), encoding="utf-8") as f:
+                sql = f.read()
+            migrations[version] = {
+                "version": version,
+                "name": match.group(2),
+                "file": file_name,
+                "sql": sql,
+                "checksum": hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+                "transactional": not sql.lstrip().startswith(NO_TRANSACTION_DIRECTIVE),
+            }
+        return [migrations[version] for version in sorted(migrations)]
+
+    def status(self) -> List[Dict]:
+        """
+        Get the migrations with whether they are applied.
+        :return: Migrations in version order, with 'version', 'name' and 'applied_at' (None if pending).
+        """
+        with DatabaseService() as db:
+            self._create_migrations_table(db)
+            applied = self._applied_migrations(db)
+        return [
+            {
+                "version": migration["version"],
+                "name": migration["name"],
+                "applied_at": applied[migration["version"]]["applied_at"] if migration["version"] in applied else None,
+            }
+            for migration in self.load_migrations()
+        ]
+
+    def upgrade(self, target: Optional[int] = None) -> List[int]:
+        """
+        Apply the pending migrations. Runs are serialized with an advisory lock, a concurrent run waits and
+        then finds the migrations applied.
+        :param target: Apply the migrations up to this version, defaults to all of them.
+        :return: Versions applied by this run.
+        """
+        migrations = self.load_migrations()
+        applied_versions = []
+        with DatabaseService() as db:
+            db.connection.autocommit = True
+            try:
+                db.cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+                try:
+                    self._create_migrations_table(db)
+                    applied = self._applied_migrations(db)
+                    for migration in migrations:
+                        if migration["version"] in applied:
+                            if applied[migration["version"]]["checksum"] != migration["checksum"]:
+                                raise ValueError(
+                                    f"Migration {migration['file']} changed after it was applied. "
+                                    f"Add a new migration instead of editing an applied one."
+                                )
+                            continue
+                        if target is not None and migration["version"] > target:
+                            break
+                        print(f"[MIGRATE] Applying {migration['file']}")
+                        self._apply(db, migration)
+                        applied_versions.append(migration["version"])
+                finally:
+                    db.cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+            finally:
+                db.connection.autocommit = False
+        return applied_versions
+
+    def _apply(self, db: DatabaseService, migration: Dict):
+        record_query = "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)"
+        record_params = (migration["version"], migration["name"], migration["checksum"])
+        if migration["transactional"]:
+            db.connection.autocommit = False
+            try:
+                db.cursor.execute(migration["sql"])
+                db.cursor.execute(record_query, record_params)
+                db.connection.commit()
+            except Exception:
+                db.connection.rollback()
+                raise
+            finally:
+                db.connection.autocommit = True
+            return
+
+        for statement in split_statements(migration["sql"]):
+            index_match = CONCURRENT_INDEX_PATTERN.search(statement)
+            if index_match:
+                self._drop_invalid_index(db, index_match.group(1))
+            db.cursor.execute(statement)
+        db.cursor.execute(record_query, record_params)
+
+    @staticmethod
+    def _drop_invalid_index(db: DatabaseService, name: str):
+        # A failed concurrent build leaves an invalid index behind, which IF NOT EXISTS would keep
+        db.cursor.execute(
+            """
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+            """,
+            (name,)
+        )
+        if db.cursor.fetchone():
+            print(f"[MIGRATE] Dropping invalid index {name} left by an interrupted build")
+            db.cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    @staticmethod
+    def _create_migrations_table(db: DatabaseService):
+        db.cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version integer PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            )
+            """
+        )
+        if not db.connection.autocommit:
+            db.connection.commit()
+
+    @staticmethod
+    def _applied_migrations(db: DatabaseService) -> Dict[int, Dict]:
+        db.cursor.execute("SELECT version, checksum, applied_at FROM schema_migrations")
+        return {record["version"]: record for record in db.cursor.fetchall()}
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split the SQL of a no-transaction migration into statements. Statements end with a semicolon at the end
+    of a line, comments are dropped. Dollar-quoted bodies (DO blocks, functions) aren't supported there,
+    they belong in transactional migrations.
+    """
+    sql = re.sub(r"/\*.*?\*/", "", sql, flags=re.DOTALL)
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE)
+    return [statement.strip() for statement in statements if statement.strip()]
@@ -0,0 +1,129 @@
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def current_rss() -> int:
+    """
+    Get the resident set size of the current process in bytes.
+    Reads /proc/self/statm when available, otherwise falls back to the peak RSS.
+    :return: Resident memory in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+        return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+class _ModelEntry:
+    def __init__(self, name: str, model: Any, rss_bytes: int, load_seconds: float):
+        self.name = name
+        self.model = model
+        self.rss_bytes = rss_bytes
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.refcount = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded models.
+    Every service resolves its models through the registry so each model is loaded exactly once
+    per process, no matter how many services use it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def acquire(self, name: str, loader: Callable[[], Any]) -> Any:
+        """
+        Get a model from the registry, loading it with `loader` if it is not loaded yet.
+        Each call increments the reference count of the model.
+        :param name: Unique name of the model.
+        :param loader: Callable that loads and returns the model.
+        :return: The shared model instance.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load under a per-model lock so concurrent callers wait for a single load
+        # while other models can still be acquired
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    entry.refcount += 1
+                    return entry.model
+
+            rss_before = current_rss()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            rss_bytes = max(current_rss() - rss_before, 0)
+
+            with self._lock:
+                entry = _ModelEntry(name, model, rss_bytes, load_seconds)
+                entry.refcount = 1
+                self._entries[name] = entry
+            print(f"Loaded model '{name}' in {load_seconds:.1f}s (+{rss_bytes / 2**20:.0f} MiB RSS)")
+            return model
+
+    def release(self, name: str) -> None:
+        """
+        Release a reference to a model. The model is unloaded when no references are left.
+        :param name: Name of the model.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            if entry.refcount <= 0:
+                del self._entries[name]
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Get a loaded model without changing its reference count.
+        :param name: Name of the model.
+        :return: The model, or None if it is not loaded.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry.model if entry else None
+
+    def loaded_models(self) -> List[Dict[str, Any]]:
+        """
+        Describe the models currently loaded in this process.
+        :return: List of dictionaries with name, reference count, RSS cost and load time of each model.
+        """
+        with self._lock:
+            return [
+                {
+                    "name": entry.name,
+                    "refcount": entry.refcount,
+                    "rss_bytes": entry.rss_bytes,
+                    "load_seconds": round(entry.load_seconds, 3),
+                    "loaded_at": entry.loaded_at,
+                }
+                for entry in self._entries.values()
+            ]
+
+    def clear(self) -> None:
+        """
+        Drop every loaded model regardless of its reference count.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._load_locks.clear()
+
+
+# Shared registry for the whole process
+model_registry = ModelRegistry()
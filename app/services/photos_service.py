@@ -1,15 +1,119 @@
+import base64
 import json
 import os
 from io import BytesIO
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
 from app.services.embedding_service import EmbeddingService
-from app.services.database_service import DatabaseService
+from app.services.database_service import DatabaseService, decode_vector_binary
 from app.services.upload_service import UploadService
+from app.services.faiss_index_service import FaissIndexService
+from app.services.rendition_service import RenditionService
+
+# Save uploaded photos as they were received instead of encoding them to PNG
+STORE_ORIGINAL_IMAGES = os.environ.get("STORE_ORIGINAL_IMAGES", "true").lower() == "true"
+# Formats browsers display, stored as uploaded. Other formats (TIFF, BMP...) are encoded to PNG.
+WEB_IMAGE_FORMATS = {
+    "JPEG": (".jpg", "image/jpeg"),
+    "PNG": (".png", "image/png"),
+    "WEBP": (".webp", "image/webp"),
+    "GIF": (".gif", "image/gif"),
+}
+# Multi-picture JPEGs written by some cameras, the first picture is a regular JPEG
+FORMAT_ALIASES = {"MPO": "JPEG"}
+
+# Sort keys of the photo listing, NULL sharpness is sorted as NaN (after every value) so the order is total
+LISTING_SORT_EXPRESSIONS = {
+    "id": "id",
+    "created_at": "created_at",
+    "sharpness": "COALESCE(sharpness, 'NaN'::float8)",
+}
+# Fields of the photo listing and the columns they are built from
+LISTING_FIELD_COLUMNS = {
+    "id": [],
+    "name": ["format"],
+    "url": ["format"],
+    "thumbnail_url": ["format"],
+    "resolution": ["width", "height"],
+    "width": ["width"],
+    "height": ["height"],
+    "format": ["format"],
+    "content_type": ["content_type"],
+    "byte_size": ["byte_size"],
+    "sharpness": ["sharpness"],
+    "created_at": ["created_at"],
+}
+
+# Queries run as is by the service and planned by the query-plan check (see query_plan_service.py)
+PHOTOS_BY_ID_QUERY = """
+SELECT id, norm, vector_send(embedding) AS embedding
+FROM images WHERE event_id = %s AND id = ANY(%s)
+"""
+DELETE_PHOTOS_QUERY = "DELETE FROM images WHERE event_id = %s AND id = ANY(%s) RETURNING id, format"
+
+def build_listing_query(sort: str, columns: List[str], after_cursor: bool = False) -> str:
+    """
+    Build the query of a page of the photo listing.
+    Its parameters are the event ID, the sort value and ID of the last photo of the previous page when
+    after_cursor is set, and the number of rows.
+    :param sort: Key of LISTING_SORT_EXPRESSIONS, prefixed with '-' for descending order.
+    :param columns: Columns of the images table to select.
+    :param after_cursor: Whether the page continues after a previous one.
+    :return: The query, it also selects the sort value of each row as 'sort_value'.
+    """
+    descending = sort.startswith("-")
+    sort_expression = LISTING_SORT_EXPRESSIONS[sort.lstrip("-")]
+    direction = "DESC" if descending else "ASC"
+    conditions = "event_id = %s"
+    if after_cursor:
+        conditions += f" AND ({sort_expression}, id) {'<' if descending else '>'} (%s, %s)"
+    return f"""
+    SELECT {', '.join(columns)}, {sort_expression} AS sort_value
+    FROM images WHERE {conditions}
+    ORDER BY {sort_expression} {direction}, id {direction}
+    LIMIT %s
+    """
+
+def encode_cursor(sort: str, sort_value, last_id: int) -> str:
+    payload = json.dumps([sort, sort_value, last_id], default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    try:
+        cursor_sort, sort_value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if cursor_sort != sort:
+        raise ValueError(f"The cursor was created for sort '{cursor_sort}', not '{sort}'.")
+    return sort_value, int(last_id)
+
+def photo_file_name(image_id, image_format: Optional[str]) -> str:
+    """
+    Name of the file of a photo. Photos stored before formats were recorded have no format and are PNGs.
+    """
+    extension, _ = WEB_IMAGE_FORMATS.get(image_format or "PNG", WEB_IMAGE_FORMATS["PNG"])
+    return f"{image_id}{extension}"
+
+class PhotosNotFoundError(LookupError):
+    def __init__(self, event_id, photo_ids: List[int]):
+        self.event_id = event_id
+        self.photo_ids = photo_ids
+        super().__init__(f"Photos {photo_ids} not found in event {event_id}")
 
 class PhotosService:
-    def __init__(self):
+    def __init__(
+            self,
+            embedding_service: Optional[EmbeddingService] = None,
+            search_index: Optional[FaissIndexService] = None,
+            rendition_service: Optional[RenditionService] = None
+            ):
         self.IMAGE_DIR = "uploads/images"
-        self.embedding_service = EmbeddingService()
+        self.embedding_service = embedding_service or EmbeddingService()
         self.upload_service = UploadService()
+        # in-memory search index kept up to date with the images table, if enabled
+        self.search_index = search_index
+        self.rendition_service = rendition_service or RenditionService(image_dir=self.IMAGE_DIR)
         
     def get_photo(self, event_id, photo_id):
         db = DatabaseService()
@@ -17,13 +121,99 @@ class PhotosService:
         db.close()
         return photo
 
+    def get_photos(self, event_id, photo_ids: List[int]) -> Tuple[Dict[int, Dict], List[int]]:
+        """
+        Fetch the embeddings and norms of several photos of an event with a single query.
+        Embeddings are read in pgvector's binary format and decoded with NumPy.
+        :param event_id: Event ID of the photos.
+        :param photo_ids: IDs of the photos.
+        :return: Dictionary mapping photo IDs to their 'embedding' (NumPy array) and 'norm',
+                 and the requested IDs that don't exist in the event.
+        """
+        photo_ids = list(dict.fromkeys(photo_ids))
+        if not photo_ids:
+            return {}, []
+        with DatabaseService() as db:
+            db.cursor.execute(PHOTOS_BY_ID_QUERY, (event_id, photo_ids))
+            records = db.cursor.fetchall()
+
+        photos = {
+            record["id"]: {"embedding": decode_vector_binary(record["embedding"]), "norm": record["norm"]}
+            for record in records
+        }
+        missing_ids = [photo_id for photo_id in photo_ids if photo_id not in photos]
+        return photos, missing_ids
+
+    def list_photos(
+            self,
+            event_id,
+            base_url: str,
+            limit: int = 100,
+            cursor: Optional[str] = None,
+            sort: str = "id",
+            fields: Optional[List[str]] = None
+            ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        List the photos of an event from the images table with keyset pagination.
+        Pages continue after the last (sort key, id) of the previous page, so every page is an index range
+        scan on (event_id, id) or (event_id, created_at, id) no matter how deep it is.
+        Sorting by sharpness reads and sorts the rows of the event.
+        :param event_id: Event ID of the photos.
+        :param base_url: URL of the photos of the event, the photo URLs are built from it.
+        :param limit: Maximum number of photos to return.
+        :param cursor: Cursor returned with the previous page.
+        :param sort: 'id' (upload order), 'created_at' or 'sharpness', prefixed with '-' for descending order.
+        :param fields: Fields to return, see LISTING_FIELD_COLUMNS. Defaults to all of them.
+        :return: The photos and the cursor of the next page, None on the last page.
+        """
+        descending = sort.startswith("-")
+        sort_key = sort.lstrip("-")
+        if sort_key not in LISTING_SORT_EXPRESSIONS:
+            raise ValueError(f"Invalid sort '{sort}'. Expected one of {list(LISTING_SORT_EXPRESSIONS)}, optionally prefixed with '-'.")
+        fields = list(dict.fromkeys(fields or LISTING_FIELD_COLUMNS))
+        invalid_fields = [field for field in fields if field not in LISTING_FIELD_COLUMNS]
+        if invalid_fields:
+            raise ValueError(f"Invalid fields {invalid_fields}. Expected any of {list(LISTING_FIELD_COLUMNS)}.")
+
+        columns = list(dict.fromkeys(["id"] + [column for field in fields for column in LISTING_FIELD_COLUMNS[field]]))
+        params = [event_id]
+        if cursor is not None:
+            sort_value, last_id = decode_cursor(cursor, sort)
+            params += [sort_value, last_id]
+        query = build_listing_query(sort, columns, after_cursor=cursor is not None)
+        # One extra row tells whether there is a next page
+        params.append(limit + 1)
+        with DatabaseService() as db:
+            db.cursor.execute(query, params)
+            records = db.cursor.fetchall()
+
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = encode_cursor(sort, records[-1]["sort_value"], records[-1]["id"])
+        return [self._listing_photo(record, fields, base_url) for record in records], next_cursor
+
+    @staticmethod
+    def _listing_photo(record: Dict, fields: List[str], base_url: str) -> Dict:
+        name = photo_file_name(record["id"], record.get("format"))
+        values = {
+            "id": lambda: record["id"],
+            "name": lambda: name,
+            "url": lambda: f"{base_url}/{name}",
+            "thumbnail_url": lambda: f"{base_url}/{name}?size=thumb",
+            "resolution": lambda: f"{record['width']}x{record['height']}" if record["width"] else None,
+            "format": lambda: record["format"] or "PNG",
+            "created_at": lambda: record["created_at"].isoformat(),
+        }
+        return {field: values[field]() if field in values else record[field] for field in fields}
+
     def add_photo(self, photo, event_id):
         db = DatabaseService()
         image_embedding, norm_factor = self.embedding_service.embed_image(photo)
         #transform norm_factor from eager tensor to float
         norm_factor = norm_factor.numpy()[0]
         norm_factor = float(norm_factor)
-        image_id = db.insert_record("images", {"event_id": event_id, "embedding": json.dumps(image_embedding.tolist()[0]), "norm": norm_factor})
+        image_id = db.insert_record("images", {"event_id": event_id, "embedding": np.asarray(image_embedding, dtype=np.float32)[0], "norm": norm_factor})
         db.close()
         # Convert the PIL image to bytes and save it to the file system
         photo_io = BytesIO()
@@ -36,15 +226,195 @@ class PhotosService:
             event_id=event_id,
             photo_names=[f"{image_id}.png"]
         )  
+        self.index_photos(event_id, [image_id], image_embedding)
         
         return image_id
 
-    def delete_photo(self, event_id, photo_id):
-        db = DatabaseService()
-        db.delete_record("images", {"event_id": event_id, "id": photo_id})
-        db.close()
-        # Delete the image file
-        if not os.path.exists(os.path.join(self.IMAGE_DIR, event_id, f"{photo_id}.png")):
+    def add_photos(self, photos: Iterable, event_id) -> List[int]:
+        """
+        Add several photos at once. Photos are embedded in batches of the embedding service's
+        max batch size and all of them are inserted in a single transaction.
+        :param photos: Iterable of PIL images, consumed lazily so only one batch is decoded at a time.
+        :param event_id: Event ID of the photos.
+        :return: IDs of the inserted photos, in the same order as the input.
+        """
+        image_ids = []
+        saved_paths = []
+        embeddings_list = []
+        with DatabaseService() as db:
+            try:
+                photos = iter(photos)
+                while True:
+                    batch = list(islice(photos, self.embedding_service.max_batch_size))
+                    if not batch:
+                        break
+                    embeddings, norm_factors = self.embedding_service.embed_images(batch)
+                    batch_ids, batch_paths = self.store_photos(db, batch, embeddings, norm_factors, event_id)
+                    image_ids.extend(batch_ids)
+                    saved_paths.extend(batch_paths)
+                    embeddings_list.append(np.asarray(embeddings))
+                db.connection.commit()
+            except Exception:
+                db.connection.rollback()
+                # The rows are gone, remove the files saved for them too
+                for path in saved_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+        if image_ids:
+            self.index_photos(event_id, image_ids, np.concatenate(embeddings_list))
+        return image_ids
+
+    def index_photos(self, event_id, image_ids: List[int], embeddings):
+        """
+        Add committed photos to the in-memory search index, if enabled.
+        :param event_id: Event ID of the photos.
+        :param image_ids: IDs of the photos.
+        :param embeddings: Normalized embeddings, one row per photo.
+        """
+        if self.search_index is None:
             return
-        image_path = os.path.join(self.IMAGE_DIR, event_id, f"{photo_id}.png")
-        os.remove(image_path)
\ No newline at end of file
+        try:
+            self.search_index.add(event_id, image_ids, embeddings)
+        except Exception:
+            # Reloaded from the database on the next search
+            self.search_index.invalidate(event_id)
+            raise
+
+    def store_photos(
+            self,
+            db: DatabaseService,
+            photos: List,
+            embeddings,
+            norm_factors,
+            event_id,
+            originals: Optional[List[Dict]] = None
+            ) -> Tuple[List[int], List[str]]:
+        """
+        Insert already embedded photos into the images table and save their files.
+        The transaction is not committed, the caller owns it.
+        :param db: Database service holding the transaction.
+        :param photos: List of PIL images.
+        :param embeddings: Normalized embeddings, one row per photo.
+        :param norm_factors: Norm factors of the embeddings, one per photo.
+        :param event_id: Event ID of the photos.
+        :param originals: Optional uploaded files of the photos, dictionaries with the encoded 'content' and its
+                          'format', 'width', 'height', 'byte_size' and 'sharpness'. Files in a web format are saved as they are,
+                          the other photos are encoded to PNG.
+        :return: The inserted photo IDs and the paths of the saved files.
+        """
+        norm_factors = np.asarray(norm_factors).reshape(-1)
+        originals = originals or [None] * len(photos)
+        files = [self._stored_file(photo, original) for photo, original in zip(photos, originals)]
+        rows = [
+            {
+                "event_id": event_id,
+                "embedding": embedding,
+                "norm": float(norm_factor),
+                "format": metadata["format"],
+                "content_type": metadata["content_type"],
+                "byte_size": metadata["byte_size"],
+                "width": metadata["width"],
+                "height": metadata["height"],
+                "sharpness": float(original["sharpness"]) if original and original.get("sharpness") is not None else None,
+            }
+            for embedding, norm_factor, (_, metadata), original in zip(
+                np.asarray(embeddings, dtype=np.float32), norm_factors, files, originals
+            )
+        ]
+        image_ids = db.insert_records("images", rows, commit=False)
+
+        saved_paths = []
+        png_sizes = {}
+        for (content, metadata), photo, image_id in zip(files, photos, image_ids):
+            if content is None:
+                # Encode one photo at a time to keep memory bounded
+                content = BytesIO()
+                photo.save(content, format="PNG")
+                png_sizes[image_id] = content.tell()
+                content.seek(0)
+            else:
+                content = BytesIO(content)
+            saved_paths.extend(self.upload_service.upload_images(
+                files=[content],
+                event_id=event_id,
+                photo_names=[photo_file_name(image_id, metadata["format"])]
+            ))
+        if png_sizes:
+            db.cursor.execute(
+                """
+                UPDATE images SET byte_size = sizes.byte_size
+                FROM unnest(%s::bigint[], %s::bigint[]) AS sizes(id, byte_size)
+                WHERE images.id = sizes.id
+                """,
+                (list(png_sizes), list(png_sizes.values()))
+            )
+        return image_ids, saved_paths
+
+    @staticmethod
+    def _stored_file(photo, original: Optional[Dict]) -> Tuple[Optional[bytes], Dict]:
+        # The content to save as is (None when the photo is encoded to PNG) and the metadata of the stored file
+        if original is not None:
+            image_format = FORMAT_ALIASES.get(original["format"], original["format"])
+            if STORE_ORIGINAL_IMAGES and image_format in WEB_IMAGE_FORMATS:
+                return original["content"], {
+                    "format": image_format,
+                    "content_type": WEB_IMAGE_FORMATS[image_format][1],
+                    "byte_size": original["byte_size"],
+                    "width": original["width"],
+                    "height": original["height"],
+                }
+        width, height = photo.size
+        if original is not None:
+            # The photo may have been decoded at a reduced scale, the resolution is the one of the upload
+            width, height = original["width"], original["height"]
+        # The PNG size is only known once encoded
+        return None, {"format": "PNG", "content_type": "image/png", "byte_size": None, "width": width, "height": height}
+
+    def delete_photo(self, event_id, photo_id):
+        deleted_photos, _ = self.delete_photos(event_id, [photo_id])
+        self.remove_photo_files(event_id, deleted_photos)
+
+    def delete_photos(self, event_id, photo_ids: List[int]) -> Tuple[List[Dict], List[int]]:
+        """
+        Delete several photos of an event with a single statement in one transaction, and from the search index
+        so searches stop returning them right away. Their files are not removed, pass the deleted photos to
+        remove_photo_files.
+        :param event_id: Event ID of the photos.
+        :param photo_ids: IDs of the photos.
+        :return: The deleted photos ('id' and 'format') and the requested IDs that don't exist in the event.
+        """
+        photo_ids = list(dict.fromkeys(photo_ids))
+        if not photo_ids:
+            return [], []
+        with DatabaseService() as db:
+            try:
+                db.cursor.execute(DELETE_PHOTOS_QUERY, (event_id, photo_ids))
+                deleted_photos = [dict(record) for record in db.cursor.fetchall()]
+                db.connection.commit()
+            except Exception:
+                db.connection.rollback()
+                raise
+        if self.search_index is not None and deleted_photos:
+            self.search_index.remove(event_id, [photo["id"] for photo in deleted_photos])
+        deleted_ids = {photo["id"] for photo in deleted_photos}
+        missing_ids = [photo_id for photo_id in photo_ids if photo_id not in deleted_ids]
+        return deleted_photos, missing_ids
+
+    def remove_photo_files(self, event_id, deleted_photos: List[Dict]):
+        """
+        Remove the files and renditions of deleted photos.
+        Blocking file system work, meant to run in the background after delete_photos. Photos are served from
+        disk, so they stay fetchable until their files are removed here.
+        :param event_id: Event ID of the photos.
+        :param deleted_photos: Photos returned by delete_photos.
+        """
+        image_ids = [photo["id"] for photo in deleted_photos]
+        # Originals first, a rendition requested in between would otherwise be generated again and never removed
+        for photo in deleted_photos:
+            image_path = os.path.join(self.IMAGE_DIR, str(event_id), photo_file_name(photo["id"], photo["format"]))
+            try:
+                os.remove(image_path)
+            except FileNotFoundError:
+                pass
+        self.rendition_service.remove_renditions(event_id, image_ids)
@@ -16,8 +16,9 @@ class PostUpdateRequest(BaseModel):
 
 # Post service
 class PostService:
-    def __init__ (self, db: DatabaseService):
-        self.db = db
+    # Each method borrows a pooled connection only for its own queries, so requests that do more work
+    # after reading a post (e.g. caption generation) don't hold one
+    def __init__ (self):
         self.table = "posts"
 
     def create_post(self, event_id:int, caption:str, image_ids:List[int], user_id:int) -> int:
@@ -35,7 +36,8 @@ class PostService:
             "image_ids": image_ids,
             "user_id": user_id
         }
-        return self.db.insert_record(self.table, post)
+        with DatabaseService() as db:
+            return db.insert_record(self.table, post)
     
     def get_post(self, post_id:int) -> Optional[Dict[str, Any]]:
         """
@@ -44,7 +46,8 @@ class PostService:
         :return: The post as a dictionary or None if not found
         """
         condition = {"id": post_id}
-        records = self.db.read_records(self.table, condition)
+        with DatabaseService() as db:
+            records = db.read_records(self.table, condition)
         return records[0] if records else None
     
     def get_posts_by_event(self, event_id:int) -> List[Dict[str, Any]]:
@@ -54,7 +57,8 @@ class PostService:
         :return: A list of posts as dictionaries
         """
         condition = {"event_id": event_id}
-        records = self.db.read_records(self.table, condition)
+        with DatabaseService() as db:
+            records = db.read_records(self.table, condition)
         return records if records else []
     
     def update_post(self, post_id: int, event_id: Optional[int] = None, caption: Optional[str] = None, image_ids: Optional[List[int]] = None) -> bool:
@@ -79,7 +83,8 @@ class PostService:
 
         if data:
             conditions = {"id": post_id}
-            rows_updated = self.db.update_record(self.table, data, conditions)
+            with DatabaseService() as db:
+                rows_updated = db.update_record(self.table, data, conditions)
             return rows_updated > 0
         
         return False
@@ -92,7 +97,8 @@ class PostService:
         """
         if self.get_post(post_id):
             conditions = {"id": post_id}
-            self.db.delete_record(self.table, conditions)
+            with DatabaseService() as db:
+                db.delete_record(self.table, conditions)
             return True
         return False   
     
\ No newline at end of file
@@ -0,0 +1,121 @@
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from app.services.context_service import DOCUMENT_BY_TITLE_QUERY, EXISTING_CHUNKS_QUERY, STALE_CHUNKS_QUERY
+from app.services.database_service import DatabaseService
+from app.services.event_teardown_service import EVENT_TABLES, EXISTING_PHOTOS_QUERY, build_teardown_query
+from app.services.image_description_service import STORED_DESCRIPTIONS_QUERY
+from app.services.photos_service import DELETE_PHOTOS_QUERY, PHOTOS_BY_ID_QUERY, build_listing_query
+
+EXPLAINED_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# The filtered queries of the services, each run against a DatabaseService whose cursor explains instead of
+# executing. DatabaseService methods are called as is, hand-written queries are shared with their service.
+QUERY_PLAN_CHECKS: List[Tuple[str, Callable[[DatabaseService], None]]] = [
+    ("events by organization", lambda db: db.read_records("events", {"org_id": 1})),
+    ("event", lambda db: db.read_records("events", {"org_id": 1, "id": 1})),
+    ("feedback of a post", lambda db: db.read_records("feedbacks", {"event_id": 1, "post_id": 1})),
+    ("post", lambda db: db.read_records("posts", {"id": 1})),
+    ("posts of an event", lambda db: db.read_records("posts", {"event_id": 1})),
+    ("contexts of an event", lambda db: db.read_records("contexts", {"event_id": 1})),
+    ("contexts by type", lambda db: db.read_records("contexts", {"event_id": 1, "context_type": "main"})),
+    ("context", lambda db: db.read_records("contexts", {"id": 1})),
+    ("photo", lambda db: db.read_records("images", {"event_id": 1, "id": 1})),
+    ("user by email", lambda db: db.read_records("users", {"email": "user@example.com"})),
+    ("delete event", lambda db: db.delete_record("events", {"org_id": 1, "id": 1})),
+    ("delete feedback", lambda db: db.delete_record("feedbacks", {"event_id": 1, "post_id": 1, "id": 1})),
+    ("photo search", lambda db: db.get_similar_record_ids(
+        "images", "embedding", 1, np.zeros(512, dtype=np.float32), 0.2, limit=20
+    )),
+    ("context retrieval", lambda db: db.get_top_k_similar_records(
+        "contexts", "embedding", 1, np.zeros(384, dtype=np.float32), n=3
+    )),
+    ("photo listing page", lambda db: db.cursor.execute(
+        build_listing_query("id", ["id", "format"], after_cursor=True), (1, 100, 100, 101)
+    )),
+    ("photo listing by upload time", lambda db: db.cursor.execute(
+        build_listing_query("-created_at", ["id", "created_at"], after_cursor=True),
+        (1, "2024-01-01T00:00:00", 100, 101)
+    )),
+    ("photos by ID", lambda db: db.cursor.execute(PHOTOS_BY_ID_QUERY, (1, [1, 2]))),
+    ("delete photos", lambda db: db.cursor.execute(DELETE_PHOTOS_QUERY, (1, [1, 2]))),
+    ("existing photos", lambda db: db.cursor.execute(EXISTING_PHOTOS_QUERY, (1, [1, 2]))),
+    ("image descriptions", lambda db: db.cursor.execute(STORED_DESCRIPTIONS_QUERY, (1, [1, 2], "v1"))),
+    ("document by title", lambda db: db.cursor.execute(DOCUMENT_BY_TITLE_QUERY, (1, "brief", ".pdf"))),
+    ("existing chunks", lambda db: db.cursor.execute(EXISTING_CHUNKS_QUERY, (1, 1, ["a"]))),
+    ("stale document chunks", lambda db: db.cursor.execute(STALE_CHUNKS_QUERY, (1, ["a"]))),
+] + [
+    (f"teardown of {table}", lambda db, table=table: db.cursor.execute(build_teardown_query(table), (1, 1000)))
+    for table in EVENT_TABLES
+]
+
+class ExplainCursor:
+    """
+    Cursor that records the plans of the queries instead of running them. Other statements (SET LOCAL)
+    are run as is, and queries return no rows.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.plans = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        if not query.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            self.cursor.execute(query, params)
+            return
+        self.cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        self.plans.append(self.cursor.fetchone()["QUERY PLAN"][0]["Plan"])
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+class QueryPlanService:
+    """
+    Query-plan regression check: plans the service queries with sequential scans disabled, so a query
+    planned as a Seq Scan has no index it can use. Small tables are read sequentially by the planner
+    anyway, disabling sequential scans makes the check independent of the amount of data.
+    """
+
+    def __init__(self, checks: List[Tuple[str, Callable[[DatabaseService], None]]] = None):
+        """
+        Initialize the QueryPlanService.
+        :param checks: Names and queries to check. Defaults to QUERY_PLAN_CHECKS.
+        """
+        self.checks = checks or QUERY_PLAN_CHECKS
+
+    def check(self) -> List[Dict]:
+        """
+        Plan every query.
+        :return: One result per query, with 'name' and 'seq_scans' (tables read sequentially, empty if none).
+        """
+        results = []
+        with DatabaseService() as db:
+            cursor = db.cursor
+            db.cursor = ExplainCursor(cursor)
+            # Autocommit keeps the setting for the whole session, delete_record commits after each query
+            db.connection.autocommit = True
+            try:
+                cursor.execute("SET enable_seqscan = off")
+                for name, run in self.checks:
+                    db.cursor.plans = []
+                    run(db)
+                    seq_scans = sorted({table for plan in db.cursor.plans for table in find_seq_scans(plan)})
+                    results.append({"name": name, "seq_scans": seq_scans})
+            finally:
+                db.cursor = cursor
+                cursor.execute("RESET enable_seqscan")
+                db.connection.autocommit = False
+        return results
+
+def find_seq_scans(plan: Dict) -> List[str]:
+    """
+    Find the sequential scans of a plan in PostgreSQL's JSON format.
+    :return: Tables read with a Seq Scan.
+    """
+    tables = [plan.get("Relation Name", "?")] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        tables.extend(find_seq_scans(child))
+    return tables
@@ -0,0 +1,144 @@
+import glob
+import os
+import threading
+from typing import Dict, List, Optional
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Longest side in pixels of each rendition
+RENDITION_SIZES = {
+    "thumb": int(os.environ.get("RENDITION_THUMB_SIZE", 320)),
+    "medium": int(os.environ.get("RENDITION_MEDIUM_SIZE", 1280)),
+}
+RENDITION_FORMATS = {
+    "WEBP": (".webp", "image/webp"),
+    "JPEG": (".jpg", "image/jpeg"),
+}
+RENDITION_FORMAT = os.environ.get("RENDITION_FORMAT", "WEBP").upper()
+RENDITION_QUALITY = int(os.environ.get("RENDITION_QUALITY", 80))
+# Number of locks rendition keys are spread over
+LOCK_STRIPES = 64
+
+class RenditionService:
+    """
+    Downscaled copies of the photos (thumbnails and web sizes) for galleries.
+    Renditions are generated once, after upload or on the first request, and stored as files under
+    renditions/{event_id}/{size}/. Generating the same rendition is serialized with a lock per key, so
+    concurrent requests for a new rendition decode the original only once. Files are written to a temporary
+    name and renamed, so other processes never serve a partial rendition.
+    """
+
+    def __init__(
+            self,
+            image_dir: str = "uploads/images",
+            rendition_dir: str = "uploads/renditions",
+            sizes: Optional[Dict[str, int]] = None,
+            image_format: str = RENDITION_FORMAT,
+            quality: int = RENDITION_QUALITY
+            ):
+        """
+        Initialize the RenditionService.
+        :param image_dir: Directory of the original photos.
+        :param rendition_dir: Directory the renditions are stored in.
+        :param sizes: Longest side of each rendition by name. Defaults to RENDITION_SIZES.
+        :param image_format: 'WEBP' or 'JPEG'.
+        :param quality: Encoding quality of the renditions.
+        """
+        if image_format not in RENDITION_FORMATS:
+            raise ValueError(f"Invalid rendition format '{image_format}'. Expected one of {list(RENDITION_FORMATS)}.")
+        self.image_dir = image_dir
+        self.rendition_dir = rendition_dir
+        self.sizes = sizes or RENDITION_SIZES
+        self.image_format = image_format
+        self.extension, self.content_type = RENDITION_FORMATS[image_format]
+        self.quality = quality
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def rendition_path(self, event_id, size: str, image_id) -> str:
+        return os.path.join(self.rendition_dir, str(event_id), size, f"{image_id}{self.extension}")
+
+    def get_rendition(self, event_id, photo_name: str, size: str) -> Optional[str]:
+        """
+        Get the path of a rendition of a photo, generating it if needed.
+        :param event_id: Event ID of the photo.
+        :param photo_name: File name of the original photo, e.g. '12.jpg'.
+        :param size: Name of the rendition, one of sizes.
+        :return: Path of the rendition, or None if the original doesn't exist or isn't a readable image.
+        """
+        if size not in self.sizes:
+            raise ValueError(f"Invalid rendition size '{size}'. Expected one of {list(self.sizes)}.")
+        image_id = os.path.splitext(photo_name)[0]
+        path = self.rendition_path(event_id, size, image_id)
+        if os.path.exists(path):
+            return path
+
+        with self._locks[hash((str(event_id), size, image_id)) % LOCK_STRIPES]:
+            # Another request may have generated it while this one waited
+            if os.path.exists(path):
+                return path
+            original_path = os.path.join(self.image_dir, str(event_id), os.path.basename(photo_name))
+            if not os.path.exists(original_path):
+                return None
+            try:
+                self._render(original_path, {size: path})
+            except UnidentifiedImageError:
+                print(f"[RENDITIONS] {original_path} is not a readable image")
+                return None
+        return path
+
+    def generate_renditions(self, event_id, image_ids: List[int]) -> int:
+        """
+        Generate the missing renditions of photos, decoding each original once for all the sizes.
+        :param event_id: Event ID of the photos.
+        :param image_ids: IDs of the photos.
+        :return: Number of renditions generated.
+        """
+        generated = 0
+        for image_id in image_ids:
+            originals = glob.glob(os.path.join(self.image_dir, str(event_id), f"{image_id}.*"))
+            if not originals:
+                continue
+            targets = {
+                size: self.rendition_path(event_id, size, image_id)
+                for size in self.sizes
+                if not os.path.exists(self.rendition_path(event_id, size, image_id))
+            }
+            if targets:
+                try:
+                    self._render(originals[0], targets)
+                except UnidentifiedImageError:
+                    print(f"[RENDITIONS] {originals[0]} is not a readable image")
+                    continue
+                generated += len(targets)
+        return generated
+
+    def remove_renditions(self, event_id, image_ids: List[int]):
+        """
+        Remove the renditions of deleted photos.
+        """
+        for image_id in image_ids:
+            for size in self.sizes:
+                try:
+                    os.remove(self.rendition_path(event_id, size, image_id))
+                except FileNotFoundError:
+                    pass
+
+    def _render(self, original_path: str, targets: Dict[str, str]):
+        with Image.open(original_path) as original:
+            # JPEGs are decoded at the smallest scale that still covers the largest rendition
+            largest = max(self.sizes[size] for size in targets)
+            original.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(original).convert("RGB")
+
+        # Largest first, each rendition is downscaled from the previous one
+        for size in sorted(targets, key=lambda name: self.sizes[name], reverse=True):
+            max_side = self.sizes[size]
+            image.thumbnail((max_side, max_side), Image.LANCZOS)  # Never upscales
+            path = targets[size]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                image.save(temporary_path, format=self.image_format, quality=self.quality)
+                os.replace(temporary_path, path)
+            finally:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
@@ -1,13 +1,36 @@
-import json
+from typing import List, Optional
+import numpy as np
 from app.services.database_service import DatabaseService
+from app.services.faiss_index_service import FaissIndexService
 
 class SearchService:
-    def search(self, event_id, embedding, threshold):
+    def __init__(self, index: Optional[FaissIndexService] = None):
+        """
+        Initialize the SearchService.
+        :param index: Optional in-memory FAISS index. When set, searches run in-process instead of in pgvector.
+        """
+        self.index = index
+
+    def search(self, event_id, embedding, threshold, limit: Optional[int] = None, offset: int = 0) -> List[int]:
+        """
+        Search the images of an event that are similar to an embedding.
+        :param event_id: Event ID.
+        :param embedding: Normalized query embedding with shape (1, dimension).
+        :param threshold: Only images with a similarity above this value are returned.
+        :param limit: Maximum number of image IDs to return, None for all of them.
+        :param offset: Number of results to skip, for pagination.
+        :return: Image IDs, most similar first.
+        """
+        if self.index is not None:
+            return self.index.search(event_id, embedding, threshold, limit=limit, offset=offset)
+
         db = DatabaseService()
-        embedding = json.dumps(embedding.tolist()[0])
-        similar_records = db.get_similar_records("images", "embedding", event_id, embedding)
-        #return only records with similarity above threshold
-        similar_records = [record for record in similar_records if record['similarity'] > threshold]
+        # NumPy vectors are adapted to pgvector values by the database service
+        embedding = np.asarray(embedding, dtype=np.float32)[0]
+        # The similarity cutoff and pagination run in the database, only ids and scores are fetched
+        similar_records = db.get_similar_record_ids(
+            "images", "embedding", event_id, embedding, threshold, limit=limit, offset=offset
+        )
         db.close()
         # Return the similar records ids, similar_records are RealDictRow objects
-        return [record['id'] for record in similar_records]
\ No newline at end of file
+        return [record['id'] for record in similar_records]
@@ -1,4 +1,5 @@
 import os
+import shutil
 from typing import List, Optional, Union
 from fastapi import UploadFile, HTTPException
 from io import BytesIO
@@ -16,6 +17,7 @@ class UploadService:
         self.remote_server_url = remote_server_url
         self.images_dir = os.path.join(self.base_upload_dir, "images")
         self.documents_dir = os.path.join(self.base_upload_dir, "documents")
+        self.incoming_dir = os.path.join(self.base_upload_dir, "incoming")
 
         # Ensure the necessary directories exist
         self._create_directory(self.base_upload_dir)
@@ -42,11 +44,37 @@ class UploadService:
         for file in files:
             file_path = os.path.join(event_dir, file.filename)
             with open(file_path, "wb") as f:
-                f.write(file.file.read())
+                # Copy in blocks, documents can be large
+                shutil.copyfileobj(file.file, f)
             saved_files.append(file_path)
 
         return saved_files
 
+    def save_incoming(self, files: List[UploadFile], job_id: str) -> List[str]:
+        """
+        Save uploaded files until a background job processes them.
+        :param files: Uploaded files.
+        :param job_id: ID of the job the files belong to, each job gets its own directory.
+        :return: Paths of the saved files, in the order of files.
+        """
+        job_dir = os.path.join(self.incoming_dir, job_id)
+        self._create_directory(job_dir)
+
+        saved_files = []
+        for index, file in enumerate(files):
+            # The index keeps files with the same name apart
+            file_path = os.path.join(job_dir, f"{index}_{os.path.basename(file.filename)}")
+            with open(file_path, "wb") as f:
+                shutil.copyfileobj(file.file, f)
+            saved_files.append(file_path)
+        return saved_files
+
+    def remove_incoming(self, job_id: str):
+        """
+        Remove the files saved for a background job.
+        """
+        shutil.rmtree(os.path.join(self.incoming_dir, job_id), ignore_errors=True)
+
     def upload_images(
         self,
         files: List[Union[UploadFile, BytesIO, Image.Image]],
@@ -87,6 +115,7 @@ class UploadService:
             
             saved_files.append(file_path)
 
+        return saved_files
 
     def _upload_to_remote(self, file: UploadFile):
         """
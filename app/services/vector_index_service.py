@@ -0,0 +1,162 @@
+import argparse
+import math
+from typing import Dict, List, Optional
+from app.services.database_service import DatabaseService
+
+# Distance operator classes, the services query with cosine distance (<=>)
+OPERATOR_CLASSES = {
+    "cosine": "vector_cosine_ops",
+    "l2": "vector_l2_ops",
+    "inner_product": "vector_ip_ops",
+}
+
+class VectorIndexService:
+    """
+    Create and inspect approximate nearest neighbour indexes on vector columns.
+    Indexes are built CONCURRENTLY so they can be (re)created on a live database.
+    """
+
+    def index_name(self, table: str, column: str, method: str) -> str:
+        return f"{table}_{column}_{method}_idx"
+
+    def create_hnsw_index(
+            self,
+            table: str,
+            column: str,
+            m: int = 16,
+            ef_construction: int = 64,
+            distance: str = "cosine",
+            maintenance_work_mem: Optional[str] = None
+            ) -> str:
+        """
+        Create an HNSW index on a vector column.
+        :param table: Name of the table.
+        :param column: Name of the vector column.
+        :param m: Maximum number of connections per layer. Higher values improve recall and use more memory.
+        :param ef_construction: Size of the candidate list while building. Higher values improve recall and slow down builds.
+        :param distance: Distance the index is built for ('cosine', 'l2' or 'inner_product').
+        :param maintenance_work_mem: Optional memory for the build, e.g. '2GB'. Builds are much faster when the graph fits.
+        :return: Name of the index.
+        """
+        name = self.index_name(table, column, "hnsw")
+        query = f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+        ON {table} USING hnsw ({column} {OPERATOR_CLASSES[distance]})
+        WITH (m = %s, ef_construction = %s)
+        """
+        self._execute_ddl(query, (m, ef_construction), maintenance_work_mem)
+        return name
+
+    def create_ivfflat_index(
+            self,
+            table: str,
+            column: str,
+            lists: Optional[int] = None,
+            distance: str = "cosine",
+            maintenance_work_mem: Optional[str] = None
+            ) -> str:
+        """
+        Create an IVFFlat index on a vector column. Build it after the table has data, the lists are trained on it.
+        :param table: Name of the table.
+        :param column: Name of the vector column.
+        :param lists: Number of inverted lists. Defaults to rows / 1000 up to 1M rows and sqrt(rows) above.
+        :param distance: Distance the index is built for ('cosine', 'l2' or 'inner_product').
+        :param maintenance_work_mem: Optional memory for the build, e.g. '2GB'.
+        :return: Name of the index.
+        """
+        if lists is None:
+            rows = self.count_rows(table)
+            lists = max(rows // 1000, 1) if rows <= 1_000_000 else int(math.sqrt(rows))
+        name = self.index_name(table, column, "ivfflat")
+        query = f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+        ON {table} USING ivfflat ({column} {OPERATOR_CLASSES[distance]})
+        WITH (lists = %s)
+        """
+        self._execute_ddl(query, (lists,), maintenance_work_mem)
+        return name
+
+    def drop_index(self, name: str):
+        """
+        Drop an index without blocking reads and writes on its table.
+        :param name: Name of the index.
+        """
+        self._execute_ddl(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    def list_indexes(self, table: str) -> List[Dict]:
+        """
+        List the indexes of a table with their definition and size.
+        :param table: Name of the table.
+        :return: List of dictionaries with the name, definition and size of each index.
+        """
+        with DatabaseService() as db:
+            db.cursor.execute(
+                """
+                SELECT indexname AS name, indexdef AS definition,
+                       pg_size_pretty(pg_relation_size(quote_ident(indexname)::regclass)) AS size
+                FROM pg_indexes
+                WHERE tablename = %s
+                ORDER BY indexname
+                """,
+                (table,)
+            )
+            return db.cursor.fetchall()
+
+    def count_rows(self, table: str) -> int:
+        with DatabaseService() as db:
+            db.cursor.execute(f"SELECT count(*) AS count FROM {table}")
+            return db.cursor.fetchone()["count"]
+
+    def _execute_ddl(self, query: str, params: Optional[tuple] = None, maintenance_work_mem: Optional[str] = None):
+        # CONCURRENTLY can't run inside a transaction block
+        with DatabaseService() as db:
+            db.connection.autocommit = True
+            try:
+                if maintenance_work_mem:
+                    db.cursor.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+                db.cursor.execute(query, params)
+                if maintenance_work_mem:
+                    db.cursor.execute("RESET maintenance_work_mem")
+            finally:
+                db.connection.autocommit = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage vector indexes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    hnsw_parser = subparsers.add_parser("create-hnsw", help="Create an HNSW index")
+    hnsw_parser.add_argument("table")
+    hnsw_parser.add_argument("column")
+    hnsw_parser.add_argument("--m", type=int, default=16)
+    hnsw_parser.add_argument("--ef-construction", type=int, default=64)
+    hnsw_parser.add_argument("--maintenance-work-mem")
+
+    ivfflat_parser = subparsers.add_parser("create-ivfflat", help="Create an IVFFlat index")
+    ivfflat_parser.add_argument("table")
+    ivfflat_parser.add_argument("column")
+    ivfflat_parser.add_argument("--lists", type=int)
+    ivfflat_parser.add_argument("--maintenance-work-mem")
+
+    drop_parser = subparsers.add_parser("drop", help="Drop an index")
+    drop_parser.add_argument("name")
+
+    list_parser = subparsers.add_parser("list", help="List the indexes of a table")
+    list_parser.add_argument("table")
+
+    args = parser.parse_args()
+    service = VectorIndexService()
+    if args.command == "create-hnsw":
+        print(service.create_hnsw_index(
+            args.table, args.column, m=args.m, ef_construction=args.ef_construction,
+            maintenance_work_mem=args.maintenance_work_mem
+        ))
+    elif args.command == "create-ivfflat":
+        print(service.create_ivfflat_index(
+            args.table, args.column, lists=args.lists, maintenance_work_mem=args.maintenance_work_mem
+        ))
+    elif args.command == "drop":
+        service.drop_index(args.name)
+    else:
+        for index in service.list_indexes(args.table):
+            print(f"{index['name']} ({index['size']}): {index['definition']}")
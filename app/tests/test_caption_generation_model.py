@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import MagicMock
+import torch
+import torch.nn as nn
+from transformers import GPT2Config, GPT2LMHeadModel
+from app.features.caption_generation_model_v2 import generate2, generate_batch, top_k_top_p_candidates
+
+# Edge Cases:
+# 1. KV Cache: Ensures incremental decoding generates the same tokens as re-running the whole sequence each step.
+# 2. Stop Token: Ensures decoding stops once the stop token is generated.
+# 3. Top-k Prefilter: Ensures the nucleus matches the one computed with a full sort of the vocabulary.
+# 4. Batched Decoding: Ensures decoding several prefixes together matches decoding them one by one,
+#    including rows that finish early and are pruned from the batch.
+
+class TinyCaptionModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.gpt = GPT2LMHeadModel(GPT2Config(vocab_size=100, n_positions=64, n_embd=32, n_layer=2, n_head=2))
+
+def reference_decode(model, embed, entry_length, stop_token_index):
+    # Previous decoder: full forward pass over the prefix and all generated tokens at every step
+    tokens = []
+    generated = embed
+    with torch.no_grad():
+        for _ in range(entry_length):
+            logits = model.gpt(inputs_embeds=generated).logits[:, -1, :]
+            next_token = torch.argmax(logits, -1).unsqueeze(0)
+            tokens.append(next_token.item())
+            generated = torch.cat((generated, model.gpt.transformer.wte(next_token)), dim=1)
+            if next_token.item() == stop_token_index:
+                break
+    return tokens
+
+class TestCaptionGenerationModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = TinyCaptionModel().eval()
+        self.tokenizer = MagicMock()
+        self.tokenizer.decode.side_effect = lambda tokens: [int(token) for token in tokens]
+        torch.manual_seed(1)
+        self.embed = torch.randn(1, 10, 32)
+
+    def test_kv_cached_decoding_matches_full_recompute(self):
+        self.tokenizer.encode.return_value = [99]  # Stop token that is never generated
+        expected = reference_decode(self.model, self.embed, 12, 99)
+
+        tokens, timings = generate2(self.model, self.tokenizer, embed=self.embed, entry_length=12, return_timings=True)
+
+        # Assertions
+        self.assertEqual(tokens, expected)
+        self.assertEqual(len(timings["step_seconds"]), len(expected) - 1)  # First step is the prefill
+        self.assertGreater(timings["prefill_seconds"], 0)
+
+    def test_stops_at_stop_token(self):
+        first_tokens = reference_decode(self.model, self.embed, 3, stop_token_index=-1)
+        stop_token_index = first_tokens[1]
+        self.tokenizer.encode.return_value = [stop_token_index]
+
+        tokens = generate2(self.model, self.tokenizer, embed=self.embed, entry_length=12)
+
+        # Assertions
+        self.assertEqual(tokens, first_tokens[:first_tokens.index(stop_token_index) + 1])
+
+    def test_batched_decoding_matches_single(self):
+        torch.manual_seed(3)
+        embeds = torch.randn(4, 10, 32)
+        singles = [reference_decode(self.model, embeds[row:row + 1], 12, stop_token_index=-1) for row in range(4)]
+        # Stop on the second token of the first row, so some rows finish before the others
+        stop_token_index = singles[0][1]
+        self.tokenizer.encode.return_value = [stop_token_index]
+        expected = [generate2(self.model, self.tokenizer, embed=embeds[row:row + 1], entry_length=12) for row in range(4)]
+
+        captions = generate_batch(self.model, self.tokenizer, embeds, entry_length=12)
+
+        # Assertions
+        self.assertEqual(captions, expected)
+        self.assertEqual(captions[0][-1], stop_token_index)
+        self.assertTrue(any(len(caption) > len(captions[0]) for caption in captions))  # Other rows kept decoding
+
+    def test_top_k_top_p_matches_full_sort(self):
+        torch.manual_seed(2)
+        logits = torch.randn(2, 1000) * 3
+        candidate_logits, candidate_indices = top_k_top_p_candidates(logits, top_k=200, top_p=0.8)
+
+        # Nucleus computed with a full sort, as in the previous decoder
+        sorted_logits, sorted_indices = torch.sort(logits, descending=True)
+        cumulative_probs = torch.cumsum(torch.softmax(sorted_logits, dim=-1), dim=-1)
+        for row in range(2):
+            keep = int((cumulative_probs[row] <= 0.8).sum()) + 1
+            expected = set(sorted_indices[row, :keep].tolist())
+            kept = set(candidate_indices[row][candidate_logits[row] != -float("Inf")].tolist())
+            self.assertEqual(kept, expected)
+
+if __name__ == "__main__":
+    unittest.main()
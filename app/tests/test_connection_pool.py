@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+from app.services.connection_pool import ConnectionPool, PoolTimeoutError
+
+# Edge Cases:
+# 1. Connection Reuse: Ensures a returned connection is handed out again instead of opening a new one.
+# 2. Exhausted Pool: Ensures callers time out when every connection, including overflow, is checked out.
+# 3. Overflow Connections: Ensures connections above max_size are closed when returned.
+# 4. Dirty Connections: Ensures open transactions are rolled back before a connection is reused.
+# 5. Max Lifetime: Ensures connections older than max_lifetime are replaced.
+
+def make_connection():
+    connection = MagicMock()
+    connection.closed = 0
+    connection.info.transaction_status = TRANSACTION_STATUS_IDLE
+    return connection
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_connection_is_reused(self):
+        connect = MagicMock(side_effect=make_connection)
+        pool = ConnectionPool(connect, max_size=2, max_overflow=0)
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        # Assertions
+        self.assertIs(first, second)
+        connect.assert_called_once()
+        self.assertEqual(pool.metrics()["in_use"], 1)
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool(make_connection, max_size=1, max_overflow=1, timeout=0.05)
+        pool.getconn()
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.getconn()
+        self.assertEqual(pool.metrics()["timeouts"], 1)
+
+    def test_overflow_connection_is_closed_on_return(self):
+        pool = ConnectionPool(make_connection, max_size=1, max_overflow=1)
+        first = pool.getconn()
+        overflow = pool.getconn()
+        self.assertEqual(pool.metrics()["overflow"], 1)
+
+        pool.putconn(overflow)
+        pool.putconn(first)
+
+        # Assertions
+        overflow.close.assert_called_once()
+        first.close.assert_not_called()
+        metrics = pool.metrics()
+        self.assertEqual(metrics["size"], 1)
+        self.assertEqual(metrics["idle"], 1)
+        self.assertEqual(metrics["overflow"], 0)
+
+    def test_open_transaction_is_rolled_back(self):
+        pool = ConnectionPool(make_connection, max_size=1, max_overflow=0)
+        connection = pool.getconn()
+        connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(connection)
+
+        connection.rollback.assert_called_once()
+
+    @patch('app.services.connection_pool.time.monotonic')
+    def test_expired_connection_is_recycled(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        connect = MagicMock(side_effect=make_connection)
+        pool = ConnectionPool(connect, max_size=1, max_overflow=0, max_lifetime=10, health_check_interval=100)
+        old_connection = pool.getconn()
+        pool.putconn(old_connection)
+
+        mock_monotonic.return_value = 20.0
+        new_connection = pool.getconn()
+
+        # Assertions
+        self.assertIsNot(old_connection, new_connection)
+        old_connection.close.assert_called_once()
+        self.assertEqual(connect.call_count, 2)
+        self.assertEqual(pool.metrics()["connections_recycled"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
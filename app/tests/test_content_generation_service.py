@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 import unittest
 import numpy as np
 from app.services.content_generation_service import ContentGenerationService, CaptionRequest
+from app.services.photos_service import PhotosNotFoundError
 
 class TestContentGenerationService(unittest.TestCase):
 
@@ -43,8 +44,9 @@ class TestContentGenerationService(unittest.TestCase):
 
     def test_get_image_descriptions(self):
         # Mock the image description service and photos service
-        self.mock_photos_service.get_photo.return_value = [{"embedding": json.dumps([0.1, 0.2, 0.3]), "norm": 1.5}]
-        self.mock_image_description_service.generate_caption.return_value = "An image of a tomato plant."
+        self.mock_photos_service.get_photos.return_value = ({1: {"embedding": np.array([0.1, 0.2, 0.3]), "norm": 1.5}}, [])
+        self.mock_image_description_service.generate_captions.return_value = ["An image of a tomato plant."]
+        self.mock_image_description_service.get_descriptions.return_value = {}
 
         # Test image description retrieval
         event_id = 123
@@ -53,12 +55,40 @@ class TestContentGenerationService(unittest.TestCase):
 
         # Assertions
         self.assertEqual(descriptions, ["An image of a tomato plant."])
-        self.mock_photos_service.get_photo.assert_called_once()
-        self.mock_image_description_service.generate_caption.assert_called_once()
+        self.mock_photos_service.get_photos.assert_called_once_with(event_id, [1])
+        embeddings = self.mock_image_description_service.generate_captions.call_args[0][0]
+        self.assertTrue(np.allclose(embeddings[0], [0.15, 0.3, 0.45]))  # Unnormalized with the stored norm
+        self.mock_image_description_service.generate_captions.assert_called_once()
+        self.mock_image_description_service.store_descriptions.assert_called_once_with({1: "An image of a tomato plant."})
+
+    def test_get_image_descriptions_reuses_stored(self):
+        # Image 1 was described after upload, only image 2 needs a decode
+        self.mock_photos_service.get_photos.return_value = ({2: {"embedding": np.array([0.1, 0.2, 0.3]), "norm": 1.5}}, [])
+        self.mock_image_description_service.get_descriptions.return_value = {1: "A stage with lights."}
+        self.mock_image_description_service.generate_captions.return_value = ["A crowd of people."]
+
+        descriptions = self.service.get_image_descriptions(123, [1, 2])
+
+        # Assertions
+        self.assertEqual(descriptions, ["A stage with lights.", "A crowd of people."])
+        self.mock_photos_service.get_photos.assert_called_once_with(123, [2])
+        self.mock_image_description_service.get_descriptions.assert_called_once_with(123, [1, 2])
+        self.mock_image_description_service.generate_captions.assert_called_once()
+        self.mock_image_description_service.store_descriptions.assert_called_once_with({2: "A crowd of people."})
+
+    def test_get_image_descriptions_missing_photos(self):
+        self.mock_image_description_service.get_descriptions.return_value = {}
+        self.mock_photos_service.get_photos.return_value = ({}, [7])
+
+        # Assertions
+        with self.assertRaises(PhotosNotFoundError) as context:
+            self.service.get_image_descriptions(123, [7])
+        self.assertEqual(context.exception.photo_ids, [7])
+        self.mock_image_description_service.generate_captions.assert_not_called()
 
     def test_get_image_descriptions_empty(self):
         # Mock the photos service to return no photos
-        self.mock_photos_service.get_photo.return_value = []
+        self.mock_photos_service.get_photos.return_value = ({}, [])
 
         # Test scenario where no image is found
         event_id = 123
@@ -67,7 +97,7 @@ class TestContentGenerationService(unittest.TestCase):
 
         # Assertions
         self.assertEqual(descriptions, [])
-        self.mock_photos_service.get_photo.assert_not_called()
+        self.mock_photos_service.get_photos.assert_not_called()
 
 if __name__ == '__main__':
     unittest.main()
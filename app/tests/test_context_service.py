@@ -0,0 +1,190 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+from app.services.context_service import ContextService, CONTEXT_CHUNK_CONFLICT
+
+# Edge Cases:
+# 1. Batched Ingestion: Ensures all chunks are embedded in one call and inserted with a single statement and commit.
+# 2. Insert Failure: Ensures the transaction is rolled back when the insert fails.
+# 3. Bounded Batches: Ensures streamed chunks are embedded and inserted in batches inside one transaction.
+# 4. Re-upload: Ensures unchanged chunks are neither embedded nor inserted again and stale chunks of the
+#    replaced document are deleted in the same transaction.
+# 5. Shared Chunks: Ensures a chunk two documents share is stored for each of them, so replacing one keeps the other's.
+# 6. Heartbeat: Ensures long documents report progress after each batch, so their job isn't taken as stale.
+# 7. Incremental Chunking: Ensures streamed segments are chunked without losing text across segment boundaries.
+
+class TestContextService(unittest.TestCase):
+
+    @patch('app.services.context_service.UploadService')
+    @patch('app.services.context_service.DatabaseService')
+    def test_add_context_batches_chunks(self, MockDatabaseService, MockUploadService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_embedding_service = MagicMock()
+        mock_embedding_service.embed_contexts.side_effect = lambda chunks: np.ones((len(chunks), 3), dtype=np.float32)
+        service = ContextService(chunk_size=20, chunk_overlap=0, embedding_service=mock_embedding_service)
+
+        service.add_context(7, "The keynote starts at nine. Lunch is served at noon. Doors close at six.", "main_context")
+
+        # Assertions
+        chunks = mock_embedding_service.embed_contexts.call_args[0][0]
+        self.assertGreater(len(chunks), 1)
+        mock_embedding_service.embed_contexts.assert_called_once()  # One batched embedding pass
+        mock_db.insert_records.assert_called_once()  # One statement for all chunks
+        mock_db.connection.commit.assert_called_once()
+        table, rows = mock_db.insert_records.call_args[0]
+        self.assertEqual(table, "contexts")
+        self.assertEqual([row["content"] for row in rows], chunks)
+        self.assertEqual(rows[0]["event_id"], 7)
+        mock_embedding_service.embed_context.assert_not_called()
+
+    @patch('app.services.context_service.UploadService')
+    @patch('app.services.context_service.DatabaseService')
+    def test_add_context_rolls_back_on_error(self, MockDatabaseService, MockUploadService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.insert_records.side_effect = Exception("Insert failure")
+        mock_embedding_service = MagicMock()
+        mock_embedding_service.embed_contexts.return_value = np.ones((1, 3), dtype=np.float32)
+        service = ContextService(embedding_service=mock_embedding_service)
+
+        with self.assertRaises(Exception):
+            service.add_context(7, "Short context.", "main_context")
+
+        # Assertions
+        mock_db.connection.rollback.assert_called_once()
+
+    @patch('app.services.context_service.UploadService')
+    @patch('app.services.context_service.DatabaseService')
+    def test_process_documents_in_bounded_batches(self, MockDatabaseService, MockUploadService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchone.return_value = None  # New document
+        mock_db.cursor.fetchall.return_value = []  # No stored chunks
+        mock_db.insert_records.return_value = [11]
+        MockUploadService.return_value.upload_documents.return_value = ["uploads/documents/7/brochure.pdf"]
+        mock_extraction_service = MagicMock()
+        mock_extraction_service.iter_text.return_value = iter(["Page one text. " * 10, "Page two text. " * 10])
+        mock_embedding_service = MagicMock()
+        mock_embedding_service.embed_contexts.side_effect = lambda chunks: np.ones((len(chunks), 3), dtype=np.float32)
+        service = ContextService(
+            chunk_size=40, chunk_overlap=0, embedding_service=mock_embedding_service,
+            extraction_service=mock_extraction_service, batch_size=2
+        )
+
+        service.process_documents(7, [MagicMock()])
+
+        # Assertions
+        document_call, *chunk_calls = mock_db.insert_records.call_args_list
+        self.assertEqual(document_call[0][0], "documents")
+        self.assertEqual(document_call[0][1][0]["title"], "brochure")
+        self.assertGreater(len(chunk_calls), 1)
+        self.assertTrue(all(len(call[0][1]) <= 2 for call in chunk_calls))  # Bounded batches
+        self.assertTrue(all(call[0][1][0]["doc_id"] == 11 for call in chunk_calls))
+        self.assertTrue(all(call[1]["commit"] is False for call in mock_db.insert_records.call_args_list))
+        mock_db.connection.commit.assert_called_once()  # Document and chunks in one transaction
+
+    @patch('app.services.context_service.UploadService')
+    @patch('app.services.context_service.DatabaseService')
+    def test_process_documents_reupload_skips_unchanged_chunks(self, MockDatabaseService, MockUploadService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchone.return_value = {"id": 11}  # Same title and extension as a stored document
+        unchanged = "Keynote at nine."
+        mock_db.cursor.fetchall.return_value = [{"content_hash": ContextService.content_hash(unchanged)}]
+        MockUploadService.return_value.upload_documents.return_value = ["uploads/documents/7/brief.txt"]
+        mock_extraction_service = MagicMock()
+        mock_extraction_service.iter_text.return_value = iter(["ignored"])
+        mock_embedding_service = MagicMock()
+        mock_embedding_service.embed_contexts.side_effect = lambda chunks: np.ones((len(chunks), 3), dtype=np.float32)
+        service = ContextService(embedding_service=mock_embedding_service, extraction_service=mock_extraction_service)
+        service.iter_chunks = MagicMock(return_value=iter([unchanged, "Lunch at noon.", unchanged]))
+
+        service.process_documents(7, [MagicMock()])
+
+        # Assertions
+        mock_embedding_service.embed_contexts.assert_called_once_with(["Lunch at noon."])  # Only the new chunk
+        table, rows = mock_db.insert_records.call_args[0]
+        self.assertEqual(table, "contexts")  # The document row is reused
+        self.assertEqual([(row["content"], row["doc_id"]) for row in rows], [("Lunch at noon.", 11)])
+        self.assertEqual(mock_db.insert_records.call_args[1]["on_conflict"], CONTEXT_CHUNK_CONFLICT)
+        lookup_params = mock_db.cursor.execute.call_args_list[1][0][1]
+        self.assertEqual(lookup_params[:2], (7, 11))  # Scoped to the document
+        delete_query, delete_params = mock_db.cursor.execute.call_args_list[-1][0]
+        self.assertIn("DELETE FROM contexts", delete_query)
+        self.assertEqual(delete_params[0], 11)
+        self.assertEqual(set(delete_params[1]), {ContextService.content_hash(unchanged), ContextService.content_hash("Lunch at noon.")})
+        mock_db.connection.commit.assert_called_once()
+
+    @patch('app.services.context_service.UploadService')
+    @patch('app.services.context_service.DatabaseService')
+    def test_replacing_document_keeps_shared_chunks(self, MockDatabaseService, MockUploadService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        contexts = []  # Stored (event_id, doc_id, content_hash, content) rows
+
+        def execute(query, params=None):
+            if query.strip().startswith("SELECT content_hash"):
+                event_id, owner, hashes = params
+                mock_db.cursor.fetchall.return_value = [
+                    {"content_hash": row[2]} for row in contexts
+                    if row[0] == event_id and (row[1] or 0) == owner and row[2] in hashes
+                ]
+            elif query.strip().startswith("DELETE FROM contexts"):
+                doc_id, hashes = params
+                contexts[:] = [row for row in contexts if row[1] != doc_id or row[2] in hashes]
+
+        mock_db.cursor.execute.side_effect = execute
+        mock_db.insert_records.side_effect = lambda table, rows, **kwargs: contexts.extend(
+            (row["event_id"], row["doc_id"], row["content_hash"], row["content"]) for row in rows
+        )
+        documents = {"a": ["Shared schedule.", "Only in A."], "b": ["Shared schedule.", "Only in B."]}
+        mock_extraction_service = MagicMock()
+        mock_extraction_service.iter_text.side_effect = lambda path: iter(documents[path.split("/")[-1][0]])
+        mock_embedding_service = MagicMock()
+        mock_embedding_service.embed_contexts.side_effect = lambda chunks: np.ones((len(chunks), 3), dtype=np.float32)
+        service = ContextService(embedding_service=mock_embedding_service, extraction_service=mock_extraction_service)
+        service.iter_chunks = lambda segments: segments
+        service.get_or_create_document = MagicMock(side_effect=lambda db, event_id, name, ext: {"a": 1, "b": 2}[name])
+
+        service.process_document_files(7, ["uploads/documents/7/a.txt", "uploads/documents/7/b.txt"])
+        documents["a"] = ["Only in A."]  # A is replaced by a version without the shared chunk
+        service.process_document_files(7, ["uploads/documents/7/a.txt"])
+
+        # Assertions
+        self.assertEqual(sorted((row[1], row[3]) for row in contexts), [
+            (1, "Only in A."), (2, "Only in B."), (2, "Shared schedule."),
+        ])
+
+    @patch('app.services.context_service.UploadService')
+    @patch('app.services.context_service.DatabaseService')
+    def test_process_document_files_reports_each_batch(self, MockDatabaseService, MockUploadService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchone.return_value = {"id": 11}
+        mock_db.cursor.fetchall.return_value = []
+        mock_extraction_service = MagicMock()
+        mock_extraction_service.iter_text.return_value = iter(["ignored"])
+        mock_embedding_service = MagicMock()
+        mock_embedding_service.embed_contexts.side_effect = lambda chunks: np.ones((len(chunks), 3), dtype=np.float32)
+        service = ContextService(
+            embedding_service=mock_embedding_service, extraction_service=mock_extraction_service, batch_size=2
+        )
+        service.iter_chunks = MagicMock(return_value=iter([f"Chunk {i}." for i in range(5)]))
+        on_batch = MagicMock()
+
+        service.process_document_files(7, ["uploads/documents/7/brief.txt"], on_batch=on_batch)
+
+        # Assertions
+        self.assertEqual(on_batch.call_count, 3)  # Batches of 2, 2 and 1 chunks
+        self.assertEqual(mock_embedding_service.embed_contexts.call_count, 3)
+
+    def test_iter_chunks_across_segments(self):
+        service = ContextService(chunk_size=50, chunk_overlap=0, embedding_service=MagicMock())
+        words = [f"word{i}" for i in range(400)]
+        # Segments break in the middle of the text, like pages or fixed size blocks
+        text = " ".join(words)
+        segments = [text[start:start + 37] for start in range(0, len(text), 37)]
+
+        chunks = list(service.iter_chunks(segments))
+
+        # Assertions
+        self.assertTrue(all(len(chunk) <= 50 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), words)  # No word lost, split or glued to the next one
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import struct
+from unittest.mock import MagicMock, patch
+import numpy as np
+from psycopg2.extensions import adapt
+from app.services.database_service import DatabaseService, decode_vector_binary, decode_vector_text, register_vector_type
+
+# Edge Cases:
+# 1. Search Parameters: Ensures index scan settings are applied with SET LOCAL before the similarity query.
+# 2. Invalid Search Parameter: Ensures unknown settings are rejected instead of being interpolated into SQL.
+# 3. Pooled Connection: Ensures closing the service returns the connection to the pool instead of closing it.
+# 4. Vector Adaptation: Ensures float32 values survive the round trip through pgvector's text and binary formats,
+#    and that non-float arrays are still adapted as SQL arrays.
+# 5. Missing Extension: Ensures no typecaster is registered when the vector type doesn't exist.
+# 6. Event-Scoped Search: Ensures the rows of the event are scanned exactly unless HNSW iterative scans are enabled,
+#    so other events in the table can't crowd the event out of the index candidates.
+
+class TestDatabaseService(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_pool = MagicMock()
+        self.mock_connection = self.mock_pool.getconn.return_value
+        self.mock_cursor = self.mock_connection.cursor.return_value
+        self.service = DatabaseService(pool=self.mock_pool)
+
+    @patch.dict('app.services.database_service.DEFAULT_SEARCH_PARAMS', {"ef_search": None, "probes": None, "iterative_scan": None})
+    def test_get_top_k_similar_records_with_search_params(self):
+        self.mock_cursor.fetchall.return_value = [{"id": 1, "similarity": 0.9}]
+
+        records = self.service.get_top_k_similar_records(
+            "images", "embedding", 3, "[0.1,0.2]", n=5, search_params={"ef_search": 100}
+        )
+
+        # Assertions
+        self.assertEqual(records, [{"id": 1, "similarity": 0.9}])
+        calls = self.mock_cursor.execute.call_args_list
+        self.assertEqual(calls[0][0], ("SET LOCAL hnsw.ef_search = %s", (100,)))
+        self.assertIn("ORDER BY embedding <=> %(vector)s", calls[1][0][0])
+        self.assertEqual(calls[1][0][1], {"vector": "[0.1,0.2]", "event_id": 3, "limit": 5})
+
+    @patch.dict('app.services.database_service.DEFAULT_SEARCH_PARAMS', {"ef_search": None, "probes": None, "iterative_scan": None})
+    def test_top_k_scans_event_rows_exactly_without_iterative_scans(self):
+        self.service.get_top_k_similar_records("contexts", "embedding", 3, "[0.1,0.2]", n=3)
+
+        # Assertions
+        query = " ".join(self.mock_cursor.execute.call_args[0][0].split())
+        # Rows of other events never take the candidates of the event: the event is filtered before ordering
+        self.assertIn("WITH event_rows AS MATERIALIZED (SELECT * FROM contexts WHERE event_id = %(event_id)s)", query)
+        self.assertIn("FROM event_rows", query)
+        self.assertFalse(self.service.uses_vector_index())
+
+    @patch.dict('app.services.database_service.DEFAULT_SEARCH_PARAMS', {"ef_search": None, "probes": None, "iterative_scan": None})
+    def test_similar_record_ids_pages_scan_event_rows(self):
+        self.service.get_similar_record_ids("images", "embedding", 3, "[0.1,0.2]", 0.2, limit=40, offset=40)
+
+        # Assertions
+        query, params = self.mock_cursor.execute.call_args[0]
+        query = " ".join(query.split())
+        # Page 2 is cut from the ordered rows of the event, not from the index candidates of every event
+        self.assertIn("WITH event_rows AS MATERIALIZED (SELECT * FROM images WHERE event_id = %(event_id)s)", query)
+        self.assertIn("ORDER BY embedding <=> %(vector)s, id LIMIT %(limit)s OFFSET %(offset)s", query)  # Stable ties
+        self.assertEqual((params["limit"], params["offset"]), (40, 40))
+
+    @patch.dict('app.services.database_service.DEFAULT_SEARCH_PARAMS', {"ef_search": None, "probes": None, "iterative_scan": None})
+    def test_top_k_uses_vector_index_with_iterative_scans(self):
+        self.service.get_top_k_similar_records(
+            "contexts", "embedding", 3, "[0.1,0.2]", n=3, search_params={"iterative_scan": "relaxed_order"}
+        )
+
+        # Assertions
+        calls = self.mock_cursor.execute.call_args_list
+        self.assertEqual(calls[0][0], ("SET LOCAL hnsw.iterative_scan = %s", ("relaxed_order",)))
+        self.assertNotIn("MATERIALIZED", calls[1][0][0])
+        self.assertIn("FROM contexts", calls[1][0][0])  # Orderable by the vector index
+
+    def test_set_search_params_invalid(self):
+        with self.assertRaises(ValueError):
+            self.service.set_search_params({"work_mem; DROP TABLE images": 1})
+        self.mock_cursor.execute.assert_not_called()
+
+    def test_close_returns_connection_to_pool(self):
+        self.service.close()
+        self.service.close()  # Closing twice is a no-op
+
+        # Assertions
+        self.mock_pool.putconn.assert_called_once_with(self.mock_connection)
+        self.mock_connection.close.assert_not_called()
+
+    def test_vector_adaptation_round_trip(self):
+        vector = np.random.default_rng(0).standard_normal(512).astype(np.float32)
+
+        literal = adapt(vector).getquoted().decode()
+
+        # Assertions
+        self.assertTrue(literal.endswith("]'::vector"))
+        self.assertTrue(np.array_equal(decode_vector_text(literal[1:-len("'::vector")]), vector))  # Lossless for float32
+        binary = struct.pack(">hh3f", 3, 0, 0.5, -1.25, 2.0)
+        self.assertEqual(decode_vector_binary(binary).tolist(), [0.5, -1.25, 2.0])
+        self.assertIsNone(decode_vector_text(None))
+        self.assertEqual(adapt(np.array([1, 2])).getquoted(), b"ARRAY[1,2]")  # Id arrays stay SQL arrays
+
+    @patch('app.services.database_service.psycopg2.extensions.register_type')
+    def test_register_vector_type(self, mock_register_type):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = [(16385,), (None,)]
+
+        register_vector_type(connection)
+        register_vector_type(connection)  # Database without the vector extension
+
+        # Assertions
+        mock_register_type.assert_called_once()
+        self.assertEqual(mock_register_type.call_args[0][1], connection)  # Registered per connection
+        self.assertEqual(connection.commit.call_count, 2)  # Connections are handed to the pool idle
+
+if __name__ == '__main__':
+    unittest.main()
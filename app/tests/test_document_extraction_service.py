@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from docx import Document
+from app.services.document_extraction_service import DocumentExtractionService
+
+# Edge Cases:
+# 1. PDF: Ensures pages are streamed one at a time.
+# 2. DOCX: Ensures empty paragraphs are skipped.
+# 3. Plain Text: Ensures text files are read in blocks and invalid UTF-8 doesn't fail the upload.
+
+def make_pdf(pages):
+    # Minimal PDF with one line of Helvetica text per page
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font_id = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    content += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return content
+
+class TestDocumentExtractionService(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.service = DocumentExtractionService(text_block_size=8)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_pdf_pages(self):
+        with open(self.path("brochure.pdf"), "wb") as f:
+            f.write(make_pdf(["Welcome to the venue", "Keynote at nine"]))
+
+        segments = list(self.service.iter_text(self.path("brochure.pdf")))
+
+        # Assertions
+        self.assertEqual([segment.strip() for segment in segments], ["Welcome to the venue", "Keynote at nine"])
+
+    def test_docx_paragraphs(self):
+        document = Document()
+        document.add_paragraph("Agenda")
+        document.add_paragraph("")
+        document.add_paragraph("Lunch at noon")
+        document.save(self.path("agenda.DOCX"))
+
+        segments = list(self.service.iter_text(self.path("agenda.DOCX")))
+
+        # Assertions
+        self.assertEqual(segments, ["Agenda\n\n", "Lunch at noon\n\n"])
+
+    def test_text_blocks(self):
+        with open(self.path("notes.txt"), "wb") as f:
+            f.write("Doors open at six – bring a badge".encode("utf-8") + b"\xff")
+
+        segments = list(self.service.iter_text(self.path("notes.txt")))
+
+        # Assertions
+        self.assertTrue(all(len(segment) <= 8 for segment in segments))
+        self.assertEqual("".join(segments), "Doors open at six – bring a badge�")
+
+if __name__ == "__main__":
+    unittest.main()
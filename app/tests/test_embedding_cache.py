@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import redis
+from app.services.embedding_cache import EmbeddingCache
+
+# Edge Cases:
+# 1. Normalized Keys: Ensures queries differing only in case and whitespace share an entry.
+# 2. LRU Eviction: Ensures the least recently used entry is dropped when the cache is full.
+# 3. Redis Level: Ensures entries missing from the LRU are served from Redis as float32 bytes.
+# 4. Redis Unavailable: Ensures a Redis error falls back to computing the embedding and is counted.
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def test_normalized_keys_share_entry(self):
+        cache = EmbeddingCache(use_redis=False)
+        compute = MagicMock(return_value=np.array([[0.6, 0.8]]))
+
+        first = cache.get_or_compute("clip", "Stage ", compute)
+        second = cache.get_or_compute("clip", "  stage", compute)
+
+        # Assertions
+        compute.assert_called_once()
+        self.assertTrue(np.array_equal(first, second))
+        self.assertEqual(first.dtype, np.float32)
+        metrics = cache.metrics()
+        self.assertEqual((metrics["l1_hits"], metrics["misses"]), (1, 1))
+        self.assertNotEqual(cache.key("clip", "stage"), cache.key("other", "stage"))  # Keys include the model
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2, use_redis=False)
+        cache.set("clip", "stage", np.array([1.0]))
+        cache.set("clip", "crowd", np.array([2.0]))
+        cache.get("clip", "stage")  # Refresh 'stage' so 'crowd' is the least recently used
+        cache.set("clip", "speaker", np.array([3.0]))
+
+        # Assertions
+        self.assertIsNotNone(cache.get("clip", "stage"))
+        self.assertIsNone(cache.get("clip", "crowd"))
+        self.assertEqual(cache.metrics()["l1_entries"], 2)
+
+    def test_redis_level(self):
+        redis_client = MagicMock()
+        redis_client.get.return_value = np.array([0.6, 0.8], dtype=np.float32).tobytes()
+        cache = EmbeddingCache(redis_client=redis_client, use_redis=True, ttl_seconds=60)
+        compute = MagicMock()
+
+        result = cache.get_or_compute("clip", "crowd", compute)
+        cache.get_or_compute("clip", "crowd", compute)
+
+        # Assertions
+        compute.assert_not_called()
+        self.assertTrue(np.allclose(result, [0.6, 0.8]))
+        redis_client.get.assert_called_once()  # Second lookup is served by the LRU
+        metrics = cache.metrics()
+        self.assertEqual((metrics["l2_hits"], metrics["l1_hits"]), (1, 1))
+
+        cache.set("clip", "speaker", np.array([[1.0, 0.0]]))
+        key, ttl, payload = redis_client.setex.call_args[0]
+        self.assertEqual(ttl, 60)
+        self.assertTrue(np.array_equal(np.frombuffer(payload, dtype=np.float32), [1.0, 0.0]))
+
+    def test_redis_unavailable(self):
+        redis_client = MagicMock()
+        redis_client.get.side_effect = redis.ConnectionError("down")
+        cache = EmbeddingCache(redis_client=redis_client, use_redis=True)
+
+        result = cache.get_or_compute("clip", "stage", lambda: np.array([1.0, 0.0]))
+
+        # Assertions
+        self.assertTrue(np.array_equal(result, [1.0, 0.0]))
+        redis_client.setex.assert_not_called()  # Redis is skipped until the retry delay passes
+        self.assertEqual(cache.metrics()["redis_errors"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import numpy as np
+from app.services.embedding_cache import EmbeddingCache
 from app.services.embedding_service import EmbeddingService
+from app.services.model_registry import model_registry
 
 #test_embed_image : Verifies that the embed_image method correctly transforms and normalizes an input image into a vector embedding. It ensures that the process calls the appropriate methods (transform and normalize) and returns the expected normalized array.
 
@@ -11,6 +13,13 @@ from app.services.embedding_service import EmbeddingService
 
 class TestEmbeddingService(unittest.TestCase):
 
+    def setUp(self):
+        # Models are shared process-wide, drop them so each test gets its own mocks
+        model_registry.clear()
+
+    def tearDown(self):
+        model_registry.clear()
+
     @patch('app.services.embedding_service.ClipEmbedding')
     def test_embed_image(self, MockClipEmbedding):
         # Create mock instance of ClipEmbedding
@@ -53,6 +62,39 @@ class TestEmbeddingService(unittest.TestCase):
         mock_clip_model.transform.assert_called_once_with(text, input_type='text')  # Ensure transform was called with the correct input
         mock_clip_model.normalize.assert_called_once()  # Ensure normalize was called
 
+    @patch('app.services.embedding_service.ClipEmbedding')
+    def test_embed_text_query_is_cached(self, MockClipEmbedding):
+        mock_clip_model = MockClipEmbedding.return_value
+        mock_clip_model.normalize.return_value = (np.array([[0.6, 0.8]]), np.array([[1.0]]))
+        service = EmbeddingService(text_cache=EmbeddingCache(use_redis=False))
+
+        first = service.embed_text_query("Crowd")
+        second = service.embed_text_query("crowd ")
+
+        # Assertions
+        self.assertEqual(first.shape, (1, 2))
+        self.assertTrue(np.allclose(second, [[0.6, 0.8]]))
+        mock_clip_model.transform.assert_called_once_with(["Crowd"], input_type='text')  # Second query hits the cache
+
+    @patch('app.services.embedding_service.ClipEmbedding')
+    def test_embed_images(self, MockClipEmbedding):
+        # Create mock instance of ClipEmbedding
+        mock_clip_model = MockClipEmbedding.return_value
+        mock_clip_model.embed_images.return_value = np.array([[0.1, 0.2], [0.3, 0.4]])
+        mock_clip_model.normalize.return_value = (np.array([[0.4, 0.9], [0.6, 0.8]]), np.array([[0.2], [0.5]]))
+
+        # Initialize the EmbeddingService with a max batch size
+        service = EmbeddingService(max_batch_size=8)
+
+        # Call the embed_images method
+        images = [MagicMock(), MagicMock()]
+        embeddings, norm_factors = service.embed_images(images)
+
+        # Assertions
+        self.assertEqual(embeddings.shape, (2, 2))
+        mock_clip_model.embed_images.assert_called_once_with(images, max_batch_size=8)  # Batched with the configured size
+        mock_clip_model.normalize.assert_called_once()
+
     @patch('app.services.embedding_service.HuggingFaceEmbeddings')
     def test_embed_context(self, MockHuggingFaceEmbeddings):
         # Create mock instance of HuggingFaceEmbeddings
@@ -71,5 +113,19 @@ class TestEmbeddingService(unittest.TestCase):
         # Assertions
         self.assertTrue(np.array_equal(result, np.array([0.7, 0.8, 0.9]) / np.linalg.norm([0.7, 0.8, 0.9])))  # Check normalized result
         mock_hf_model.embed_query.assert_called_once_with(text)  # Ensure embed_query was called with the correct input
+
+    @patch('app.services.embedding_service.HuggingFaceEmbeddings')
+    def test_embed_contexts(self, MockHuggingFaceEmbeddings):
+        mock_hf_model = MockHuggingFaceEmbeddings.return_value
+        mock_hf_model.embed_documents.return_value = [[0.6, 0.8], [1.0, 0.0]]
+        service = EmbeddingService()
+
+        result = service.embed_contexts(["First chunk", "Second chunk"])
+
+        # Assertions
+        self.assertEqual(result.shape, (2, 2))
+        self.assertEqual(result.dtype, np.float32)
+        mock_hf_model.embed_documents.assert_called_once_with(["First chunk", "Second chunk"])  # One batched call
+        self.assertEqual(MockHuggingFaceEmbeddings.call_args[1]["encode_kwargs"], {"normalize_embeddings": True})
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from app.services.event_teardown_service import EventTeardownService, EVENT_TABLES
+
+# Edge Cases:
+# 1. Batched Teardown: Ensures rows are deleted in batches committed one by one, children first, and the directories removed.
+# 2. Failed Batch: Ensures a failing batch is rolled back and the error is raised.
+# 3. Orphan Photo Files: Ensures only files older than the grace period and without a row are reported.
+
+def make_directories(base, event_id, names):
+    for name in names:
+        os.makedirs(os.path.join(base, name, str(event_id)))
+        open(os.path.join(base, name, str(event_id), "1.jpg"), "wb").close()
+
+class TestEventTeardownService(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.search_index = MagicMock()
+        self.teardown_service = EventTeardownService(
+            upload_dir=self.directory.name, batch_size=2, search_index=self.search_index
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @patch('app.services.event_teardown_service.DatabaseService')
+    def test_batched_teardown(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        # images has 3 rows (batches of 2 and 1), the other tables are empty
+        rowcounts = {table: [0] for table in EVENT_TABLES}
+        rowcounts["images"] = [2, 1, 0]
+
+        def execute(query, params):
+            table = query.split("DELETE FROM ")[1].split()[0]
+            mock_db.cursor.rowcount = rowcounts[table].pop(0)
+
+        mock_db.cursor.execute.side_effect = execute
+        make_directories(self.directory.name, 5, ["images", "renditions"])
+        make_directories(self.directory.name, 6, ["images"])
+        steps = []
+        on_batch = MagicMock()
+
+        deleted = self.teardown_service.teardown(5, on_step=steps.append, on_batch=on_batch)
+
+        # Assertions
+        self.assertEqual(deleted, {"feedbacks": 0, "posts": 0, "contexts": 0, "documents": 0, "images": 3, "directories": 2})
+        self.assertEqual([step.get("table") for step in steps], EVENT_TABLES + [None])
+        queried_tables = [call[0][0].split("DELETE FROM ")[1].split()[0] for call in mock_db.cursor.execute.call_args_list]
+        self.assertEqual(queried_tables[0], "feedbacks")  # Children first
+        self.assertEqual(mock_db.cursor.execute.call_args[0][1], (5, 2))
+        self.assertEqual(mock_db.connection.commit.call_count, 7)  # One transaction per batch
+        self.assertEqual(on_batch.call_count, 7)
+        self.search_index.invalidate.assert_called_once_with(5)
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "images", "5")))
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, "images", "6")))  # Other events are kept
+
+    @patch('app.services.event_teardown_service.DatabaseService')
+    def test_failed_batch_rolls_back(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.execute.side_effect = Exception("lock timeout")
+
+        with self.assertRaises(Exception):
+            self.teardown_service.teardown(5)
+
+        # Assertions
+        mock_db.connection.rollback.assert_called_once()
+        mock_db.connection.commit.assert_not_called()
+
+    @patch('app.services.event_teardown_service.DatabaseService')
+    def test_find_orphan_photo_files(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchall.return_value = [{"id": 1}]
+        event_dir = os.path.join(self.directory.name, "images", "5")
+        os.makedirs(event_dir)
+        for name in ["1.jpg", "2.jpg", "2.png", "3.jpg"]:
+            open(os.path.join(event_dir, name), "wb").close()
+        os.utime(os.path.join(event_dir, "3.jpg"))  # Recent, may belong to an upload in progress
+        for name in ["1.jpg", "2.jpg", "2.png"]:
+            os.utime(os.path.join(event_dir, name), (0, 0))
+
+        orphans = self.teardown_service.find_orphan_photo_files(5, min_age_seconds=60)
+
+        # Assertions
+        self.assertEqual(orphans, [os.path.join(event_dir, "2.jpg"), os.path.join(event_dir, "2.png")])
+        self.assertEqual(mock_db.cursor.execute.call_args[0][1], (5, [1, 2]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import unittest
+from app.services.executor_service import ExecutorService
+
+# Edge Cases:
+# 1. Blocking Calls: Ensures blocking functions run off the event loop thread and their results are returned.
+# 2. Invalid Executor: Ensures an unknown executor name raises a ValueError.
+
+class TestExecutorService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = ExecutorService(workers={
+            "db": 1, "cpu": 1, "http": 1, "io": 1, "background": 1, "rendition": 1, "ingestion": 1,
+        })
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_run_executes_off_event_loop(self):
+        async def run():
+            loop_thread = threading.current_thread()
+            result, worker_thread = await self.service.run_db(
+                lambda a, b=0: (a + b, threading.current_thread()), 1, b=2
+            )
+            return result, worker_thread, loop_thread
+
+        result, worker_thread, loop_thread = asyncio.run(run())
+
+        # Assertions
+        self.assertEqual(result, 3)
+        self.assertIsNot(worker_thread, loop_thread)
+        self.assertTrue(worker_thread.name.startswith("db-executor"))
+
+    def test_run_invalid_executor(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.service.run("gpu", lambda: None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import struct
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+from app.services.faiss_index_service import LOCK_STRIPES, FaissIndexService
+
+# Edge Cases:
+# 1. Lazy Loading: Ensures an event index is loaded from the database once and searched in memory afterwards.
+# 2. Threshold and Pagination: Ensures only results above the threshold are returned, sliced by limit and offset.
+# 3. Incremental Updates: Ensures added and removed photos are reflected without reloading the index.
+# 4. Memory Budget: Ensures the least recently used event is evicted when the budget is exceeded.
+# 5. Concurrent Loads: Ensures concurrent first searches of an event load it once, with a fixed number of load locks.
+
+def unit(vector):
+    vector = np.array(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def records(rows):
+    # Embeddings are read in pgvector's binary format
+    return [{"id": image_id, "embedding": struct.pack(">hh3f", 3, 0, *unit(vector))} for image_id, vector in rows]
+
+class TestFaissIndexService(unittest.TestCase):
+
+    @patch('app.services.faiss_index_service.DatabaseService')
+    def test_search_loads_lazily_and_filters(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value
+        mock_db.cursor.fetchall.return_value = records([(1, [1, 0, 0]), (2, [1, 1, 0]), (3, [0, 0, 1])])
+        service = FaissIndexService(dimension=3)
+        query = unit([1, 0, 0]).reshape(1, -1)
+
+        first = service.search(5, query, threshold=0.5)
+        second = service.search(5, query, threshold=0.5, limit=1, offset=1)
+
+        # Assertions
+        self.assertEqual(first, [1, 2])  # Image 3 is orthogonal to the query
+        self.assertEqual(second, [2])
+        MockDatabaseService.assert_called_once()  # Loaded once, then served from memory
+        self.assertEqual(service.stats()["hits"], 1)
+
+    @patch('app.services.faiss_index_service.DatabaseService')
+    def test_incremental_updates(self, MockDatabaseService):
+        MockDatabaseService.return_value.cursor.fetchall.return_value = records([(1, [1, 0, 0])])
+        service = FaissIndexService(dimension=3)
+        query = unit([0, 1, 0]).reshape(1, -1)
+        self.assertEqual(service.search(5, query, threshold=0.5), [])
+
+        service.add(5, [2], unit([0, 1, 0]).reshape(1, -1))
+        self.assertEqual(service.search(5, query, threshold=0.5), [2])
+
+        service.remove(5, [2])
+        self.assertEqual(service.search(5, query, threshold=0.5), [])
+        MockDatabaseService.assert_called_once()
+
+    @patch('app.services.faiss_index_service.DatabaseService')
+    def test_lru_eviction(self, MockDatabaseService):
+        MockDatabaseService.return_value.cursor.fetchall.return_value = records([(1, [1, 0, 0])])
+        # Room for a single one-vector index of dimension 3 (3 * 4 + 8 bytes)
+        service = FaissIndexService(dimension=3, memory_budget_bytes=30)
+        query = unit([1, 0, 0]).reshape(1, -1)
+
+        service.search(1, query, threshold=0.5)
+        service.search(2, query, threshold=0.5)
+
+        # Assertions
+        stats = service.stats()
+        self.assertEqual(list(stats["events"].keys()), [2])
+        self.assertEqual(stats["evictions"], 1)
+
+    @patch('app.services.faiss_index_service.DatabaseService')
+    def test_concurrent_loads(self, MockDatabaseService):
+        MockDatabaseService.return_value.cursor.fetchall.side_effect = lambda: time.sleep(0.05) or records([(1, [1, 0, 0])])
+        service = FaissIndexService(dimension=3)
+        query = unit([1, 0, 0]).reshape(1, -1)
+
+        threads = [threading.Thread(target=service.search, args=(5, query, 0.5)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        MockDatabaseService.return_value.cursor.fetchall.side_effect = None
+        MockDatabaseService.return_value.cursor.fetchall.return_value = records([(1, [1, 0, 0])])
+        for event_id in range(100):
+            service.search(event_id, query, threshold=0.5)
+
+        # Assertions
+        self.assertEqual(service.stats()["loads"], 100)  # Event 5 loaded once by the concurrent searches
+        self.assertEqual(len(service._load_locks), LOCK_STRIPES)
+
+if __name__ == '__main__':
+    unittest.main()
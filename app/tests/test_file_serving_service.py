@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from email.utils import formatdate
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.services.file_serving_service import FileServingService, content_etag
+
+# Edge Cases:
+# 1. Validators: Ensures the ETag is a hash of the content and missing files return None.
+# 2. Conditional Requests: Ensures a matching If-None-Match or a current If-Modified-Since returns 304 with the validators.
+# 3. Cache Policy: Ensures full responses carry the ETag and the immutable Cache-Control.
+# 4. Range Requests: Ensures single byte ranges return 206, and If-Range with a stale ETag returns the whole file.
+
+class TestFileServingService(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "7.jpg")
+        with open(self.path, "wb") as f:
+            f.write(bytes(range(256)) * 4)
+        self.file_serving_service = FileServingService(cache_control="public, max-age=60, immutable")
+
+        app = FastAPI()
+
+        @app.get("/photo")
+        async def photo(request: Request):
+            stat_result, etag = self.file_serving_service.validators(self.path)
+            return self.file_serving_service.response(request.headers, self.path, stat_result, etag, "image/jpeg")
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_validators(self):
+        stat_result, etag = self.file_serving_service.validators(self.path)
+
+        other_path = os.path.join(self.directory.name, "8.jpg")
+        with open(other_path, "wb") as f:
+            f.write(bytes(range(256)) * 4)
+        _, other_etag = self.file_serving_service.validators(other_path)
+
+        # Assertions
+        self.assertEqual(stat_result.st_size, 1024)
+        self.assertEqual(etag, other_etag)  # Same content, same ETag
+        self.assertIsNone(self.file_serving_service.validators(os.path.join(self.directory.name, "9.jpg")))
+        self.assertIsNone(self.file_serving_service.validators(self.directory.name))  # Not a file
+        self.assertGreater(content_etag.cache_info().currsize, 0)
+
+    def test_conditional_requests(self):
+        full = self.client.get("/photo")
+        etag = full.headers["etag"]
+
+        not_modified = self.client.get("/photo", headers={"If-None-Match": f'"other", W/{etag}'})
+        modified = self.client.get("/photo", headers={"If-None-Match": '"other"'})
+        since = self.client.get("/photo", headers={"If-Modified-Since": formatdate(os.stat(self.path).st_mtime + 5, usegmt=True)})
+        before = self.client.get("/photo", headers={"If-Modified-Since": formatdate(0, usegmt=True)})
+
+        # Assertions
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.headers["cache-control"], "public, max-age=60, immutable")
+        self.assertEqual(full.headers["content-type"], "image/jpeg")
+        self.assertEqual(len(full.content), 1024)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.headers["etag"], etag)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(modified.status_code, 200)
+        self.assertEqual(since.status_code, 304)
+        self.assertEqual(before.status_code, 200)
+
+    def test_range_requests(self):
+        etag = self.client.get("/photo").headers["etag"]
+
+        partial = self.client.get("/photo", headers={"Range": "bytes=256-511"})
+        if_range = self.client.get("/photo", headers={"Range": "bytes=0-9", "If-Range": etag})
+        stale_if_range = self.client.get("/photo", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+
+        # Assertions
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.headers["content-range"], "bytes 256-511/1024")
+        self.assertEqual(partial.content, bytes(range(256)))
+        self.assertEqual(if_range.status_code, 206)
+        self.assertEqual(len(if_range.content), 10)
+        self.assertEqual(stale_if_range.status_code, 200)
+        self.assertEqual(len(stale_if_range.content), 1024)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import struct
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+from app.services.image_description_service import ImageDescriptionService
+
+# Edge Cases:
+# 1. Stored Descriptions: Ensures images already described for the model version are not decoded again.
+# 2. Model Version: Ensures lookups and inserts are scoped to the event and the caption model version.
+# 3. Concurrent First Use: Ensures the caption model is acquired once when threads resolve it at the same time.
+
+def vector_binary(values):
+    # pgvector binary format: dimension, unused, big-endian float4 values
+    return struct.pack(f">hh{len(values)}f", len(values), 0, *values)
+
+class TestImageDescriptionService(unittest.TestCase):
+
+    @patch('app.services.image_description_service.execute_values')
+    @patch('app.services.image_description_service.DatabaseService')
+    def test_precompute_skips_stored_descriptions(self, MockDatabaseService, mock_execute_values):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchall.side_effect = [
+            [{"image_id": 1, "description": "A stage with lights."}],  # stored descriptions
+            [{"id": 2, "embedding": vector_binary([0.6, 0.8]), "norm": 2.0}],  # embeddings of the missing images
+        ]
+        service = ImageDescriptionService(registry=MagicMock(), model_version="test-v1")
+        service.registry.acquire.return_value.evaluate_batch.return_value = ["A crowd of people."]
+
+        generated = service.precompute_descriptions(5, [1, 2])
+
+        # Assertions
+        self.assertEqual(generated, 1)
+        embeddings = service.registry.acquire.return_value.evaluate_batch.call_args[0][0]
+        self.assertTrue(np.allclose(embeddings, [[1.2, 1.6]]))  # Decoded from the unnormalized embedding
+        lookup_params = mock_db.cursor.execute.call_args_list[0][0][1]
+        self.assertEqual(lookup_params, (5, [1, 2], "test-v1"))
+        embedding_params = mock_db.cursor.execute.call_args_list[1][0][1]
+        self.assertEqual(embedding_params, (5, [2]))
+        rows = mock_execute_values.call_args[0][2]
+        self.assertEqual(rows, [(2, "test-v1", "A crowd of people.")])
+        mock_db.connection.commit.assert_called_once()
+
+    def test_concurrent_first_use_acquires_once(self):
+        registry = MagicMock()
+        registry.acquire.side_effect = lambda key, factory: time.sleep(0.05) or MagicMock()
+        service = ImageDescriptionService(registry=registry)
+
+        threads = [threading.Thread(target=lambda: service.caption_generation_model) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        service.close()
+
+        # Assertions
+        registry.acquire.assert_called_once()
+        registry.release.assert_called_once()  # The reference is released
+
+if __name__ == "__main__":
+    unittest.main()
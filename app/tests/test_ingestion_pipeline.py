@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from io import BytesIO
+import cv2
+import numpy as np
+from PIL import Image
+from app.services.ingestion_pipeline import IngestionPipeline
+
+# Edge Cases:
+# 1. Mixed Upload: Ensures sharp images are embedded in batches and stored, blurry images are counted and unreadable files reported.
+# 2. Persistence Failure: Ensures the transaction is rolled back and the error is raised when storing a batch fails.
+# 3. Indexing Failure: Ensures committed photos and files are kept when adding them to the search index fails.
+# 4. Unfiltered JPEG: Ensures images are decoded at a reduced scale and the uploaded bytes and resolution are stored.
+# 5. Rotated JPEG: Ensures the resolution of portrait photos rotated by EXIF is stored as displayed.
+
+def make_file(name, image=None, content=None):
+    if content is None:
+        content = cv2.imencode(".png", image)[1].tobytes()
+    upload = MagicMock()
+    upload.filename = name
+    upload.file = BytesIO(content)
+    return upload
+
+def sharp_image():
+    return np.random.default_rng(0).integers(0, 255, (32, 32, 3), dtype=np.uint8)
+
+def blurry_image():
+    return np.full((32, 32, 3), 128, dtype=np.uint8)
+
+class TestIngestionPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.photos_service = MagicMock()
+        self.photos_service.embedding_service.max_batch_size = 2
+        self.photos_service.embedding_service.embed_images.side_effect = lambda images: (
+            np.ones((len(images), 3)), np.ones((len(images), 1))
+        )
+        next_ids = iter(range(1, 100))
+        self.photos_service.store_photos.side_effect = lambda db, photos, embeddings, norms, event_id, originals: (
+            [next(next_ids) for _ in photos], []
+        )
+        self.pipeline = IngestionPipeline(self.photos_service, decode_workers=2)
+
+    @patch('app.services.ingestion_pipeline.DatabaseService')
+    def test_run_mixed_upload(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value
+        files = [
+            make_file("a.png", sharp_image()),
+            make_file("b.png", blurry_image()),
+            make_file("c.png", sharp_image()),
+            make_file("d.png", content=b"not an image"),
+            make_file("e.png", sharp_image()),
+        ]
+
+        on_commit = MagicMock()
+
+        result = self.pipeline.run(event_id=7, files=files, blur_threshold=100.0, on_commit=on_commit)
+
+        # Assertions
+        self.assertEqual(result["uploaded_image_ids"], [1, 2, 3])
+        on_commit.assert_called_once_with([1, 2, 3])
+        self.assertEqual(result["sharp_count"], 3)
+        self.assertEqual(result["blurred_count"], 1)
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertIn("d.png", result["errors"][0])
+        self.assertEqual(self.photos_service.embedding_service.embed_images.call_count, 2)  # Batches of 2 and 1
+        self.assertEqual(result["stats"]["stages"]["decode"]["items"], 5)
+        self.assertEqual(result["stats"]["stages"]["embed"]["items"], 3)
+        self.assertEqual(result["stats"]["stages"]["persist"]["items"], 3)
+        MockDatabaseService.assert_called_once()  # Single connection and transaction
+        mock_db.connection.commit.assert_called_once()
+        mock_db.close.assert_called_once()
+
+    @patch('app.services.ingestion_pipeline.DatabaseService')
+    def test_run_persist_failure_rolls_back(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value
+        self.photos_service.store_photos.side_effect = Exception("Disk full")
+        files = [make_file(f"{i}.png", sharp_image()) for i in range(4)]
+
+        with self.assertRaises(Exception) as context:
+            self.pipeline.run(event_id=7, files=files, blur_threshold=100.0)
+
+        # Assertions
+        self.assertIn("Disk full", str(context.exception))
+        mock_db.connection.rollback.assert_called_once()
+        mock_db.connection.commit.assert_not_called()
+
+    @patch('app.services.ingestion_pipeline.os.remove')
+    @patch('app.services.ingestion_pipeline.DatabaseService')
+    def test_run_index_failure_keeps_committed_photos(self, MockDatabaseService, mock_remove):
+        mock_db = MockDatabaseService.return_value
+        self.photos_service.store_photos.side_effect = lambda db, photos, embeddings, norms, event_id, originals: (
+            [1], ["uploads/images/7/1.png"]
+        )
+        self.photos_service.index_photos.side_effect = RuntimeError("index unavailable")
+
+        result = self.pipeline.run(event_id=7, files=[make_file("a.png", sharp_image())], blur_threshold=100.0)
+
+        # Assertions
+        self.assertEqual(result["uploaded_image_ids"], [1])
+        mock_db.connection.commit.assert_called_once()
+        mock_db.connection.rollback.assert_not_called()
+        mock_remove.assert_not_called()
+
+    @patch('app.services.ingestion_pipeline.DatabaseService')
+    def test_run_unfiltered_jpeg_keeps_original(self, MockDatabaseService):
+        content = cv2.imencode(".jpg", np.zeros((1000, 800, 3), dtype=np.uint8))[1].tobytes()
+
+        result = self.pipeline.run(
+            event_id=7, files=[make_file("a.jpg", content=content)], blur_threshold=100.0, apply_filter=False
+        )
+
+        # Assertions
+        self.assertEqual(result["uploaded_image_ids"], [1])
+        embedded_image = self.photos_service.embedding_service.embed_images.call_args[0][0][0]
+        self.assertLess(embedded_image.width, 800)  # Draft mode decode
+        self.assertGreaterEqual(min(embedded_image.size), 224)
+        original = self.photos_service.store_photos.call_args[1]["originals"][0]
+        self.assertEqual(original["content"], content)
+        self.assertEqual(
+            (original["format"], original["width"], original["height"], original["byte_size"]),
+            ("JPEG", 800, 1000, len(content))
+        )
+
+    @patch('app.services.ingestion_pipeline.DatabaseService')
+    def test_run_rotated_jpeg_records_displayed_resolution(self, MockDatabaseService):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 degrees, a portrait photo taken with the camera held upright
+        buffer = BytesIO()
+        Image.new("RGB", (1000, 800)).save(buffer, format="JPEG", exif=exif)
+
+        self.pipeline.run(
+            event_id=7, files=[make_file("a.jpg", content=buffer.getvalue())], blur_threshold=100.0, apply_filter=False
+        )
+
+        # Assertions
+        original = self.photos_service.store_photos.call_args[1]["originals"][0]
+        self.assertEqual((original["width"], original["height"]), (800, 1000))
+        embedded_image = self.photos_service.embedding_service.embed_images.call_args[0][0][0]
+        self.assertLess(embedded_image.width, embedded_image.height)  # Decoded upright as well
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+from unittest.mock import MagicMock
+from app.services.job_service import JobService
+
+class InMemoryRedis:
+    """
+    Minimal in-memory replacement for the Redis commands used by JobService.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.lists = {}
+        self.expirations = {}
+
+    def pipeline(self):
+        redis_client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            def execute(self):
+                return [getattr(redis_client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self.hashes.setdefault(key, {})
+        for name, item in (mapping or {field: value}).items():
+            values[name] = str(item)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hincrby(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        removed = items.count(value)
+        self.lists[key] = [item for item in items if item != value]
+        return removed
+
+    def brpoplpush(self, source, destination, timeout=0):
+        if not self.lists.get(source):
+            return None
+        value = self.lists[source].pop()
+        self.lpush(destination, value)
+        return value
+
+    def delete(self, key):
+        self.lists.pop(key, None)
+        self.hashes.pop(key, None)
+
+    def expire(self, key, seconds):
+        self.expirations[key] = seconds
+
+# Edge Cases:
+# 1. Successful Job: Ensures per-item results, failed item counts and the handler result are reported.
+# 2. Retries: Ensures a failing job is queued again until max_attempts, then marked as failed and cleaned up.
+# 3. Empty Queue: Ensures process_next returns False without a job.
+# 4. Stale Jobs: Ensures jobs of a worker that stopped reporting progress are queued again.
+# 5. Missing Job: Ensures get_job returns None for unknown job IDs.
+# 6. Checkpoint: Ensures progress saved by a failed attempt is given to the retry.
+
+class TestJobService(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.job_service = JobService(redis_client=self.redis, max_attempts=2, result_ttl=60)
+
+    def test_successful_job(self):
+        def handler(context):
+            context.item_done({"file": "a.png", "status": "uploaded", "image_id": 1})
+            context.item_done({"file": "b.png", "status": "error", "error": "Unable to read image"})
+            return {"uploaded_image_ids": [1], "event_id": context.params["event_id"]}
+
+        self.job_service.register_handler("photos", handler)
+        job_id = self.job_service.enqueue("photos", {"event_id": 3}, total_items=2)
+        self.assertEqual(self.job_service.get_job(job_id)["status"], "queued")
+
+        processed = self.job_service.process_next(timeout=0)
+        job = self.job_service.get_job(job_id)
+
+        # Assertions
+        self.assertTrue(processed)
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual((job["total_items"], job["processed_items"], job["failed_items"]), (2, 2, 1))
+        self.assertEqual(job["result"], {"uploaded_image_ids": [1], "event_id": 3})
+        self.assertEqual([item["file"] for item in job["items"]], ["a.png", "b.png"])
+        self.assertIsNotNone(job["items_per_second"])
+        self.assertEqual(self.redis.lists[self.job_service.processing_key], [])
+        self.assertEqual(self.redis.expirations[self.job_service.job_key(job_id)], 60)
+
+    def test_retries_then_fails(self):
+        handler = MagicMock(side_effect=RuntimeError("database unavailable"))
+        cleanup = MagicMock()
+        self.job_service.register_handler("context", handler, cleanup=cleanup)
+        job_id = self.job_service.enqueue("context", {"event_id": 1, "text": "Keynote"}, total_items=1)
+
+        self.job_service.process_next(timeout=0)
+        retrying = self.job_service.get_job(job_id)
+        self.job_service.process_next(timeout=0)
+        failed = self.job_service.get_job(job_id)
+
+        # Assertions
+        self.assertEqual(retrying["status"], "retrying")
+        self.assertEqual(failed["status"], "failed")
+        self.assertEqual(failed["attempts"], 2)
+        self.assertEqual(failed["error"], "database unavailable")
+        self.assertEqual(handler.call_count, 2)
+        cleanup.assert_called_once()
+        self.assertFalse(self.job_service.process_next(timeout=0))  # Not queued a third time
+
+    def test_empty_queue(self):
+        # Assertions
+        self.assertFalse(self.job_service.process_next(timeout=0))
+
+    def test_recover_stale_jobs(self):
+        job_id = self.job_service.enqueue("photos", {"event_id": 1})
+        self.redis.brpoplpush(self.job_service.queue_key, self.job_service.processing_key)  # Worker crashed
+        self.redis.hset(self.job_service.job_key(job_id), "heartbeat_at", 0)
+
+        recovered = self.job_service.recover_stale_jobs()
+
+        # Assertions
+        self.assertEqual(recovered, 1)
+        self.assertEqual(self.redis.lists[self.job_service.queue_key], [job_id])
+        self.assertEqual(self.redis.lists[self.job_service.processing_key], [])
+
+    def test_checkpoint_kept_across_retries(self):
+        checkpoints = []
+
+        def handler(context):
+            checkpoints.append(context.checkpoint)
+            if context.checkpoint is None:
+                context.save_checkpoint({"uploaded_image_ids": [1, 2]})
+                raise RuntimeError("renditions failed")
+            return context.checkpoint
+
+        self.job_service.register_handler("photos", handler)
+        job_id = self.job_service.enqueue("photos", {"event_id": 1})
+
+        self.job_service.process_next(timeout=0)
+        self.job_service.process_next(timeout=0)
+        job = self.job_service.get_job(job_id)
+
+        # Assertions
+        self.assertEqual(checkpoints, [None, {"uploaded_image_ids": [1, 2]}])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"], {"uploaded_image_ids": [1, 2]})
+
+    def test_missing_job(self):
+        # Assertions
+        self.assertIsNone(self.job_service.get_job("unknown"))
+
+if __name__ == "__main__":
+    unittest.main()
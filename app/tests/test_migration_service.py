@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.services.migration_service import MigrationService, MIGRATION_LOCK_KEY, split_statements
+
+# Edge Cases:
+# 1. Loading: Ensures migrations are read in version order, other files are ignored and duplicate versions are rejected.
+# 2. Upgrade: Ensures only pending migrations run under the advisory lock, each recorded, and the lock is released on failure.
+# 3. Changed Migration: Ensures an applied migration whose file changed stops the upgrade.
+# 4. No-Transaction Migrations: Ensures statements run one by one and invalid indexes of interrupted builds are dropped first.
+
+class TestMigrationService(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.write("0001_baseline.sql", "ALTER TABLE images ADD COLUMN IF NOT EXISTS width integer;\n")
+        self.write("0002_indexes.sql", (
+            "-- migrate:no-transaction\n"
+            "/* Built on live tables */\n"
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS events_org_id_idx ON events (org_id);\n"
+            "-- Redundant\n"
+            "DROP INDEX CONCURRENTLY IF EXISTS feedbacks_event_id_idx;\n"
+        ))
+        self.write("README.md", "not a migration")
+        self.migration_service = MigrationService(migrations_dir=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, file_name, sql):
+        with open(os.path.join(self.directory.name, file_name), "w") as f:
+            f.write(sql)
+
+    def executed(self, mock_db):
+        return [" ".join(call[0][0].split()) for call in mock_db.cursor.execute.call_args_list]
+
+    def test_load_migrations(self):
+        migrations = self.migration_service.load_migrations()
+
+        # Assertions
+        self.assertEqual([(m["version"], m["name"], m["transactional"]) for m in migrations], [(1, "baseline", True), (2, "indexes", False)])
+        self.write("02_other.sql", "SELECT 1;")
+        with self.assertRaises(ValueError):
+            self.migration_service.load_migrations()
+
+    def test_split_statements(self):
+        statements = split_statements(self.migration_service.load_migrations()[1]["sql"])
+
+        # Assertions
+        self.assertEqual(statements, [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS events_org_id_idx ON events (org_id)",
+            "DROP INDEX CONCURRENTLY IF EXISTS feedbacks_event_id_idx",
+        ])
+
+    @patch('app.services.migration_service.DatabaseService')
+    def test_upgrade_applies_pending_migrations(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        checksum = self.migration_service.load_migrations()[0]["checksum"]
+        # Version 1 is applied, the index of an interrupted build is invalid
+        mock_db.cursor.fetchall.return_value = [{"version": 1, "checksum": checksum, "applied_at": None}]
+        mock_db.cursor.fetchone.return_value = {"?column?": 1}
+
+        applied = self.migration_service.upgrade()
+
+        # Assertions
+        executed = self.executed(mock_db)
+        self.assertEqual(applied, [2])
+        self.assertEqual(mock_db.cursor.execute.call_args_list[0][0], ("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,)))
+        self.assertEqual(mock_db.cursor.execute.call_args_list[-1][0], ("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,)))
+        self.assertNotIn("ALTER TABLE images ADD COLUMN IF NOT EXISTS width integer;", executed)
+        self.assertIn("DROP INDEX CONCURRENTLY IF EXISTS events_org_id_idx", executed)
+        self.assertLess(
+            executed.index("DROP INDEX CONCURRENTLY IF EXISTS events_org_id_idx"),
+            executed.index("CREATE INDEX CONCURRENTLY IF NOT EXISTS events_org_id_idx ON events (org_id)")
+        )
+        self.assertEqual(mock_db.cursor.execute.call_args_list[-2][0][1][:2], (2, "indexes"))  # Recorded
+        self.assertFalse(mock_db.connection.autocommit)
+
+    @patch('app.services.migration_service.DatabaseService')
+    def test_upgrade_rolls_back_failed_migration(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchall.return_value = []
+
+        def execute(query, params=None):
+            if "ALTER TABLE" in query:
+                raise Exception("lock timeout")
+
+        mock_db.cursor.execute.side_effect = execute
+
+        with self.assertRaises(Exception):
+            self.migration_service.upgrade()
+
+        # Assertions
+        mock_db.connection.rollback.assert_called_once()
+        self.assertNotIn("CREATE INDEX CONCURRENTLY IF NOT EXISTS events_org_id_idx ON events (org_id)", self.executed(mock_db))
+        self.assertEqual(mock_db.cursor.execute.call_args[0], ("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,)))
+
+    @patch('app.services.migration_service.DatabaseService')
+    def test_upgrade_rejects_changed_migration(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchall.return_value = [{"version": 1, "checksum": "edited", "applied_at": None}]
+
+        with self.assertRaises(ValueError):
+            self.migration_service.upgrade()
+
+        # Assertions
+        self.assertNotIn("DROP INDEX CONCURRENTLY IF EXISTS feedbacks_event_id_idx", self.executed(mock_db))
+
+if __name__ == "__main__":
+    unittest.main()
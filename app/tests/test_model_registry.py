@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import MagicMock
+import threading
+from app.services.model_registry import ModelRegistry
+
+# Edge Cases:
+# 1. Shared Model: Ensures a model is loaded only once no matter how many times it is acquired.
+# 2. Reference Counting: Ensures a model is unloaded only when its last reference is released.
+# 3. Concurrent Loading: Ensures concurrent callers wait for a single load instead of loading the model twice.
+
+class TestModelRegistry(unittest.TestCase):
+
+    def test_acquire_loads_model_once(self):
+        registry = ModelRegistry()
+        loader = MagicMock(return_value="model")
+
+        first = registry.acquire("clip", loader)
+        second = registry.acquire("clip", loader)
+
+        # Assertions
+        self.assertEqual(first, "model")
+        self.assertIs(first, second)
+        loader.assert_called_once()
+        self.assertEqual(registry.loaded_models()[0]["refcount"], 2)
+
+    def test_release_unloads_model_when_unreferenced(self):
+        registry = ModelRegistry()
+        registry.acquire("clip", lambda: "model")
+        registry.acquire("clip", lambda: "model")
+
+        registry.release("clip")
+        self.assertEqual(registry.get("clip"), "model")  # Still referenced once
+
+        registry.release("clip")
+        self.assertIsNone(registry.get("clip"))
+        self.assertEqual(registry.loaded_models(), [])
+
+    def test_concurrent_acquire_loads_once(self):
+        registry = ModelRegistry()
+        load_started = threading.Event()
+        release_load = threading.Event()
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            load_started.set()
+            release_load.wait(timeout=5)
+            return object()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.acquire("clip", slow_loader))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        load_started.wait(timeout=5)
+        release_load.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        # Assertions
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(registry.loaded_models()[0]["refcount"], 4)
+
+if __name__ == '__main__':
+    unittest.main()
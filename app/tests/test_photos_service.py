@@ -2,8 +2,11 @@ import unittest
 from unittest.mock import patch, MagicMock
 from PIL import Image
 import numpy as np
-from app.services.photos_service import PhotosService
-import json
+from app.services.photos_service import PhotosService, encode_cursor
+import struct
+import os
+import tempfile
+from datetime import datetime, timezone
 
 class TestPhotosService(unittest.TestCase):
     
@@ -35,5 +38,203 @@ class TestPhotosService(unittest.TestCase):
         mock_db.insert_record.assert_called_once()
         mock_upload_service.upload_images.assert_called_once()
 
+    @patch('app.services.photos_service.DatabaseService')
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_add_photos(self, MockUploadService, MockEmbeddingService, MockDatabaseService):
+        # Create mock instances
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_embedding_service = MockEmbeddingService.return_value
+        mock_upload_service = MockUploadService.return_value
+
+        # Set up the mock return values, batches of 2 images
+        mock_embedding_service.max_batch_size = 2
+        mock_embedding_service.embed_images.side_effect = lambda batch: (
+            np.ones((len(batch), 3)), np.full((len(batch), 1), 0.5)
+        )
+        mock_db.insert_records.side_effect = [[1, 2], [3]]
+        mock_upload_service.upload_images.side_effect = lambda files, event_id, photo_names: photo_names
+
+        # Create test images
+        photos = [Image.new('RGB', (10, 10)) for _ in range(3)]
+
+        # Initialize the PhotosService
+        service = PhotosService()
+
+        # Call the add_photos method
+        image_ids = service.add_photos(iter(photos), event_id=123)
+
+        # Assertions
+        self.assertEqual(image_ids, [1, 2, 3])
+        self.assertEqual(mock_embedding_service.embed_images.call_count, 2)  # One forward pass per batch
+        self.assertEqual(mock_db.insert_records.call_count, 2)
+        rows = mock_db.insert_records.call_args_list[0][0][1]
+        self.assertEqual(rows[0]["norm"], 0.5)
+        self.assertTrue(np.array_equal(rows[0]["embedding"], [1.0, 1.0, 1.0]))
+        self.assertEqual(rows[0]["embedding"].dtype, np.float32)  # Adapted to a pgvector value by the database service
+        mock_db.connection.commit.assert_called_once()  # Single transaction
+        mock_db.connection.rollback.assert_not_called()
+
+    @patch('app.services.photos_service.DatabaseService')
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_add_photos_rolls_back_on_error(self, MockUploadService, MockEmbeddingService, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_embedding_service = MockEmbeddingService.return_value
+        mock_embedding_service.max_batch_size = 2
+        mock_embedding_service.embed_images.side_effect = Exception("Model failure")
+
+        service = PhotosService()
+
+        with self.assertRaises(Exception):
+            service.add_photos([Image.new('RGB', (10, 10))], event_id=123)
+
+        # Assertions
+        mock_db.connection.rollback.assert_called_once()
+        mock_db.connection.commit.assert_not_called()
+
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_store_photos_keeps_originals(self, MockUploadService, MockEmbeddingService):
+        mock_db = MagicMock()
+        mock_db.insert_records.return_value = [4, 5]
+        mock_upload_service = MockUploadService.return_value
+        jpeg = {"content": b"jpeg bytes", "format": "MPO", "width": 4000, "height": 3000, "byte_size": 10}
+        tiff = {"content": b"tiff bytes", "format": "TIFF", "width": 20, "height": 10, "byte_size": 10}
+
+        service = PhotosService()
+        image_ids, _ = service.store_photos(
+            mock_db, [Image.new('RGB', (224, 168)), Image.new('RGB', (20, 10))],
+            np.ones((2, 3)), np.ones(2), event_id=123, originals=[jpeg, tiff]
+        )
+
+        # Assertions
+        self.assertEqual(image_ids, [4, 5])
+        rows = mock_db.insert_records.call_args[0][1]
+        self.assertEqual(
+            [(row["format"], row["content_type"], row["width"], row["byte_size"]) for row in rows],
+            [("JPEG", "image/jpeg", 4000, 10), ("PNG", "image/png", 20, None)]  # TIFF is not a web format
+        )
+        uploads = mock_upload_service.upload_images.call_args_list
+        self.assertEqual(uploads[0][1]["photo_names"], ["4.jpg"])
+        self.assertEqual(uploads[0][1]["files"][0].read(), b"jpeg bytes")  # Saved as uploaded
+        self.assertEqual(uploads[1][1]["photo_names"], ["5.png"])
+        sizes = mock_db.cursor.execute.call_args[0][1]
+        self.assertEqual(sizes[0], [5])  # Size of the encoded PNG recorded after saving it
+
+    @patch('app.services.photos_service.DatabaseService')
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_get_photos(self, MockUploadService, MockEmbeddingService, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        # Embeddings in pgvector's binary format: dimension, unused, big-endian float4 values
+        mock_db.cursor.fetchall.return_value = [
+            {"id": 2, "norm": 1.5, "embedding": struct.pack(">hh3f", 3, 0, 0.5, 0.25, 1.0)},
+        ]
+
+        service = PhotosService()
+        photos, missing_ids = service.get_photos(123, [2, 5, 2])
+
+        # Assertions
+        self.assertEqual(missing_ids, [5])
+        self.assertTrue(np.array_equal(photos[2]["embedding"], np.array([0.5, 0.25, 1.0], dtype=np.float32)))
+        self.assertEqual(photos[2]["norm"], 1.5)
+        mock_db.cursor.execute.assert_called_once()  # Single query for all photos
+        self.assertEqual(mock_db.cursor.execute.call_args[0][1], (123, [2, 5]))
+
+    @patch('app.services.photos_service.DatabaseService')
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_list_photos_keyset_pagination(self, MockUploadService, MockEmbeddingService, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        created_at = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+        mock_db.cursor.fetchall.return_value = [
+            {"id": 9, "format": "JPEG", "width": 4000, "height": 3000, "created_at": created_at, "sort_value": created_at},
+            {"id": 8, "format": None, "width": None, "height": None, "created_at": created_at, "sort_value": created_at},
+            {"id": 7, "format": "WEBP", "width": 10, "height": 10, "created_at": created_at, "sort_value": created_at},
+        ]
+
+        service = PhotosService()
+        photos, next_cursor = service.list_photos(
+            1, "http://api/events/1/photos", limit=2, sort="-created_at", fields=["id", "thumbnail_url", "resolution"]
+        )
+
+        # Assertions
+        self.assertEqual(photos, [
+            {"id": 9, "thumbnail_url": "http://api/events/1/photos/9.jpg?size=thumb", "resolution": "4000x3000"},
+            {"id": 8, "thumbnail_url": "http://api/events/1/photos/8.png?size=thumb", "resolution": None},
+        ])
+        query, params = mock_db.cursor.execute.call_args[0]
+        self.assertIn("SELECT id, format, width, height, created_at AS sort_value", query)  # Projection
+        self.assertIn("ORDER BY created_at DESC, id DESC", query)
+        self.assertEqual(params, [1, 3])  # One extra row to detect the next page
+
+        mock_db.cursor.fetchall.return_value = []
+        photos, last_cursor = service.list_photos(1, "http://api/events/1/photos", limit=2, sort="-created_at", cursor=next_cursor)
+        query, params = mock_db.cursor.execute.call_args[0]
+        self.assertIn("(created_at, id) < (%s, %s)", query)  # Continues after the last row
+        self.assertEqual(params[2], 8)
+        self.assertIsNone(last_cursor)
+
+    @patch('app.services.photos_service.DatabaseService')
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_list_photos_invalid_arguments(self, MockUploadService, MockEmbeddingService, MockDatabaseService):
+        service = PhotosService()
+        cursor = encode_cursor("id", 3, 3)
+
+        # Assertions
+        with self.assertRaises(ValueError):
+            service.list_photos(1, "", sort="name")
+        with self.assertRaises(ValueError):
+            service.list_photos(1, "", fields=["id", "embedding"])
+        with self.assertRaises(ValueError):
+            service.list_photos(1, "", cursor="not a cursor")
+        with self.assertRaises(ValueError):
+            service.list_photos(1, "", sort="sharpness", cursor=cursor)  # Cursor of another sort
+
+    @patch('app.services.photos_service.DatabaseService')
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_delete_photos(self, MockUploadService, MockEmbeddingService, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        mock_db.cursor.fetchall.return_value = [{"id": 3, "format": "JPEG"}, {"id": 4, "format": None}]
+        search_index = MagicMock()
+
+        service = PhotosService(search_index=search_index)
+        deleted_photos, not_found_ids = service.delete_photos(1, [3, 4, 5, 3])
+
+        # Assertions
+        self.assertEqual(deleted_photos, [{"id": 3, "format": "JPEG"}, {"id": 4, "format": None}])
+        self.assertEqual(not_found_ids, [5])
+        mock_db.cursor.execute.assert_called_once()  # Single statement for all photos
+        self.assertIn("id = ANY(%s)", mock_db.cursor.execute.call_args[0][0])
+        self.assertEqual(mock_db.cursor.execute.call_args[0][1], (1, [3, 4, 5]))
+        mock_db.connection.commit.assert_called_once()
+        search_index.remove.assert_called_once_with(1, [3, 4])  # Not left to the file cleanup
+
+    @patch('app.services.photos_service.EmbeddingService')
+    @patch('app.services.photos_service.UploadService')
+    def test_remove_photo_files(self, MockUploadService, MockEmbeddingService):
+        search_index = MagicMock()
+        rendition_service = MagicMock()
+        service = PhotosService(search_index=search_index, rendition_service=rendition_service)
+        with tempfile.TemporaryDirectory() as directory:
+            service.IMAGE_DIR = directory
+            os.makedirs(os.path.join(directory, "1"))
+            for name in ["3.jpg", "4.png", "6.jpg"]:
+                open(os.path.join(directory, "1", name), "wb").close()
+            # Renditions are removed once no original is left to generate them from
+            rendition_service.remove_renditions.side_effect = lambda event_id, ids: self.assertEqual(
+                os.listdir(os.path.join(directory, "1")), ["6.jpg"]
+            )
+
+            service.remove_photo_files(1, [{"id": 3, "format": "JPEG"}, {"id": 4, "format": None}, {"id": 5, "format": "PNG"}])
+
+            # Assertions
+            self.assertEqual(os.listdir(os.path.join(directory, "1")), ["6.jpg"])  # Missing files are skipped
+        search_index.remove.assert_not_called()
+        rendition_service.remove_renditions.assert_called_once_with(1, [3, 4, 5])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from app.services.database_service import DatabaseService
+from app.services.query_plan_service import ExplainCursor, QueryPlanService, QUERY_PLAN_CHECKS, find_seq_scans
+
+# Edge Cases:
+# 1. Plan Inspection: Ensures Seq Scans are found in nested plan nodes.
+# 2. Check: Ensures queries are explained with sequential scans disabled and not run, and the session setting is reset.
+# 3. Checked Queries: Ensures every check runs its service query with one parameter per placeholder.
+
+INDEX_PLAN = {"Node Type": "Limit", "Plans": [{"Node Type": "Index Scan", "Relation Name": "images"}]}
+SEQ_SCAN_PLAN = {
+    "Node Type": "Hash Join",
+    "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "feedbacks"},
+        {"Node Type": "Hash", "Plans": [{"Node Type": "Bitmap Heap Scan", "Relation Name": "posts"}]},
+    ],
+}
+
+class TestQueryPlanService(unittest.TestCase):
+
+    def test_find_seq_scans(self):
+        # Assertions
+        self.assertEqual(find_seq_scans(INDEX_PLAN), [])
+        self.assertEqual(find_seq_scans(SEQ_SCAN_PLAN), ["feedbacks"])
+
+    @patch('app.services.query_plan_service.DatabaseService')
+    def test_check(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value.__enter__.return_value
+        cursor = mock_db.cursor
+        cursor.fetchone.side_effect = [{"QUERY PLAN": [{"Plan": INDEX_PLAN}]}, {"QUERY PLAN": [{"Plan": SEQ_SCAN_PLAN}]}]
+        checks = [
+            ("photo", lambda db: db.cursor.execute("SELECT * FROM images WHERE id = %s", (1,))),
+            ("feedback", lambda db: db.cursor.execute("SELECT * FROM feedbacks WHERE post_id = %s", (1,))),
+        ]
+
+        results = QueryPlanService(checks=checks).check()
+
+        # Assertions
+        executed = [call[0][0] for call in cursor.execute.call_args_list]
+        self.assertEqual(results, [{"name": "photo", "seq_scans": []}, {"name": "feedback", "seq_scans": ["feedbacks"]}])
+        self.assertEqual(executed[0], "SET enable_seqscan = off")
+        self.assertEqual(executed[1], "EXPLAIN (FORMAT JSON) SELECT * FROM images WHERE id = %s")
+        self.assertEqual(executed[-1], "RESET enable_seqscan")
+        self.assertIs(mock_db.cursor, cursor)
+        self.assertGreater(len(QUERY_PLAN_CHECKS), 20)
+
+    def test_checked_queries(self):
+        for name, run in QUERY_PLAN_CHECKS:
+            with self.subTest(name=name):
+                db = DatabaseService(pool=MagicMock())
+                cursor = MagicMock()
+                cursor.fetchone.return_value = {"QUERY PLAN": [{"Plan": INDEX_PLAN}]}
+                db.cursor = ExplainCursor(cursor)
+                run(db)
+
+                # Assertions
+                explained = [call[0] for call in cursor.execute.call_args_list if call[0][0].startswith("EXPLAIN")]
+                self.assertTrue(explained)
+                for query, params in explained:
+                    if not isinstance(params, dict):  # Named parameters are checked by psycopg2
+                        self.assertEqual(query.count("%s"), len(params))
+
+if __name__ == "__main__":
+    unittest.main()
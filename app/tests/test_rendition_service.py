@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from app.services.rendition_service import RenditionService
+
+# Edge Cases:
+# 1. Lazy Rendition: Ensures a rendition is generated on first request, downscaled and served from disk afterwards.
+# 2. Concurrent Requests: Ensures concurrent requests for a new rendition decode the original only once.
+# 3. Missing Original: Ensures None is returned for photos that don't exist or aren't readable images.
+# 4. Invalid Size: Ensures unknown rendition sizes raise a ValueError.
+# 5. Upload Time Generation: Ensures all the sizes are generated and small photos are not upscaled.
+
+class TestRenditionService(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.image_dir = os.path.join(self.directory.name, "images")
+        os.makedirs(os.path.join(self.image_dir, "1"))
+        Image.new("RGB", (1600, 1200), (200, 30, 30)).save(os.path.join(self.image_dir, "1", "7.jpg"))
+        Image.new("RGB", (200, 100), (30, 200, 30)).save(os.path.join(self.image_dir, "1", "8.png"))
+        self.rendition_service = RenditionService(
+            image_dir=self.image_dir,
+            rendition_dir=os.path.join(self.directory.name, "renditions"),
+            sizes={"thumb": 320, "medium": 800}
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lazy_rendition(self):
+        path = self.rendition_service.get_rendition(1, "7.jpg", "thumb")
+
+        # Assertions
+        self.assertTrue(path.endswith(os.path.join("1", "thumb", "7.webp")))
+        with Image.open(path) as rendition:
+            self.assertEqual(rendition.format, "WEBP")
+            self.assertEqual(rendition.size, (320, 240))
+        with patch.object(self.rendition_service, "_render") as render:
+            self.assertEqual(self.rendition_service.get_rendition(1, "7.jpg", "thumb"), path)
+            render.assert_not_called()
+
+    def test_concurrent_requests_render_once(self):
+        render = self.rendition_service._render
+        with patch.object(self.rendition_service, "_render", side_effect=render) as mock_render:
+            threads = [
+                threading.Thread(target=self.rendition_service.get_rendition, args=(1, "7.jpg", "medium"))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # Assertions
+        mock_render.assert_called_once()
+
+    def test_missing_original(self):
+        # Assertions
+        self.assertIsNone(self.rendition_service.get_rendition(1, "9.jpg", "thumb"))
+
+    def test_corrupt_original(self):
+        with open(os.path.join(self.image_dir, "1", "10.jpg"), "wb") as f:
+            f.write(b"not an image")
+
+        # Assertions
+        self.assertIsNone(self.rendition_service.get_rendition(1, "10.jpg", "thumb"))
+        self.assertEqual(self.rendition_service.generate_renditions(1, [10, 7]), 2)  # Other photos are still rendered
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            self.rendition_service.get_rendition(1, "7.jpg", "huge")
+
+    def test_generate_renditions(self):
+        generated = self.rendition_service.generate_renditions(1, [7, 8, 9])
+
+        # Assertions
+        self.assertEqual(generated, 4)  # Two sizes for each existing photo
+        with Image.open(self.rendition_service.rendition_path(1, "medium", 7)) as rendition:
+            self.assertEqual(rendition.size, (800, 600))
+        with Image.open(self.rendition_service.rendition_path(1, "medium", 8)) as rendition:
+            self.assertEqual(rendition.size, (200, 100))  # Not upscaled
+        self.assertEqual(self.rendition_service.generate_renditions(1, [7]), 0)  # Already generated
+
+        self.rendition_service.remove_renditions(1, [7])
+        self.assertFalse(os.path.exists(self.rendition_service.rendition_path(1, "thumb", 7)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,12 @@
-
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import ANY, patch, MagicMock
 from app.services.search_service import SearchService
 import numpy as np
-import json
 
 
 #Edge Case 1: The database returns an empty list, ensuring the method can handle a lack of results gracefully.
-#Edge Case 2: Only some records meet the similarity threshold, ensuring proper filtering logic.
+#Edge Case 2: Only some records meet the similarity threshold, ensuring the threshold is pushed down to the database query.
+#Edge Case 3: Pagination parameters are passed down to the database query.
 
 class TestSearchService(unittest.TestCase):
     
@@ -17,7 +16,7 @@ class TestSearchService(unittest.TestCase):
         mock_db = MockDatabaseService.return_value
         
         # Simulate no similar records from the database
-        mock_db.get_similar_records.return_value = []
+        mock_db.get_similar_record_ids.return_value = []
         
         # Initialize the SearchService
         service = SearchService()
@@ -32,9 +31,10 @@ class TestSearchService(unittest.TestCase):
         
         # Assertions
         self.assertEqual(result, [])  # No records should be returned
-        mock_db.get_similar_records.assert_called_once_with(
-            "images", "embedding", event_id, json.dumps(embedding.tolist()[0])
+        mock_db.get_similar_record_ids.assert_called_once_with(
+            "images", "embedding", event_id, ANY, threshold, limit=None, offset=0
         )
+        self.assertTrue(np.allclose(mock_db.get_similar_record_ids.call_args[0][3], embedding[0]))  # Query vector passed as a NumPy array
         mock_db.close.assert_called_once()
 
     @patch('app.services.search_service.DatabaseService')
@@ -42,11 +42,10 @@ class TestSearchService(unittest.TestCase):
         # Create a mock database instance
         mock_db = MockDatabaseService.return_value
         
-        # Simulate similar records returned from the database
-        mock_db.get_similar_records.return_value = [
-            {'id': 1, 'similarity': 0.6},
-            {'id': 2, 'similarity': 0.4},  # Below threshold
-            {'id': 3, 'similarity': 0.8}
+        # Simulate the records above the threshold returned from the database, most similar first
+        mock_db.get_similar_record_ids.return_value = [
+            {'id': 3, 'similarity': 0.8},
+            {'id': 1, 'similarity': 0.6}
         ]
         
         # Initialize the SearchService
@@ -61,11 +60,28 @@ class TestSearchService(unittest.TestCase):
         result = service.search(event_id, embedding, threshold)
         
         # Assertions
-        self.assertEqual(result, [1, 3])  # Only IDs with similarity > threshold
-        mock_db.get_similar_records.assert_called_once_with(
-            "images", "embedding", event_id, json.dumps(embedding.tolist()[0])
+        self.assertEqual(result, [3, 1])  # IDs in the order returned by the database
+        mock_db.get_similar_record_ids.assert_called_once_with(
+            "images", "embedding", event_id, ANY, threshold, limit=None, offset=0
         )
+        self.assertTrue(np.allclose(mock_db.get_similar_record_ids.call_args[0][3], embedding[0]))  # Query vector passed as a NumPy array
         mock_db.close.assert_called_once()
 
+    @patch('app.services.search_service.DatabaseService')
+    def test_search_paginated(self, MockDatabaseService):
+        mock_db = MockDatabaseService.return_value
+        mock_db.get_similar_record_ids.return_value = [{'id': 7, 'similarity': 0.7}]
+
+        service = SearchService()
+        embedding = np.array([[0.1, 0.2, 0.3]])
+        result = service.search(123, embedding, 0.5, limit=10, offset=20)
+
+        # Assertions
+        self.assertEqual(result, [7])
+        mock_db.get_similar_record_ids.assert_called_once_with(
+            "images", "embedding", 123, ANY, 0.5, limit=10, offset=20
+        )
+        self.assertTrue(np.allclose(mock_db.get_similar_record_ids.call_args[0][3], embedding[0]))  # Query vector passed as a NumPy array
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,47 @@
+"""
+Generate the missing thumbnail and medium renditions of photos uploaded before renditions existed.
+Existing renditions are kept, so the command can be interrupted and run again.
+
+Usage:
+    python backfill_renditions.py --event-id 1 2
+    python backfill_renditions.py --all --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.rendition_service import RenditionService
+
+IMAGE_DIR = "uploads/images"
+
+def event_image_ids(event_id):
+    event_dir = os.path.join(IMAGE_DIR, str(event_id))
+    if not os.path.isdir(event_dir):
+        return []
+    return [os.path.splitext(name)[0] for name in os.listdir(event_dir) if not name.startswith(".")]
+
+def backfill(event_ids, workers):
+    rendition_service = RenditionService(image_dir=IMAGE_DIR)
+    for event_id in event_ids:
+        image_ids = event_image_ids(event_id)
+        start = time.perf_counter()
+        # One photo per task, each decodes its original once for all the sizes
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            generated = sum(executor.map(
+                lambda image_id: rendition_service.generate_renditions(event_id, [image_id]), image_ids
+            ))
+        print(f"Event {event_id}: {len(image_ids)} photos, {generated} renditions generated "
+              f"in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate missing photo renditions.")
+    parser.add_argument("--event-id", type=int, nargs="*", default=[])
+    parser.add_argument("--all", action="store_true", help="Backfill every event in the images directory.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    event_ids = args.event_id
+    if args.all:
+        event_ids = sorted(int(name) for name in os.listdir(IMAGE_DIR) if name.isdigit())
+    if not event_ids:
+        parser.error("Pass --event-id or --all.")
+    backfill(event_ids, args.workers)
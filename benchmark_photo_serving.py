@@ -0,0 +1,87 @@
+"""
+Photo serving benchmark: the previous handler (plain FileResponse) against the cached handler
+(content-hash ETag, 304 revalidation, ranges).
+
+Each scenario is requested repeatedly and reports the median and p95 latency and the bytes transferred.
+Without --url both handlers are served in-process on the given photo. With --url the requests go to a
+running API, e.g. one started on this commit and one on the previous commit to compare them.
+
+Usage:
+    python benchmark_photo_serving.py --photo uploads/images/1/12.jpg
+    python benchmark_photo_serving.py --url http://localhost:8000/events/1/photos/12.jpg --requests 500
+"""
+import argparse
+import os
+import statistics
+import time
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.testclient import TestClient
+from app.services.file_serving_service import FileServingService
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+def build_app(photo_path):
+    app = FastAPI()
+    file_serving_service = FileServingService()
+
+    @app.get("/baseline")
+    async def baseline():
+        # The handler before conditional requests were supported
+        if not os.path.exists(os.path.dirname(photo_path)):
+            return JSONResponse(status_code=404, content={"error": "No images found for the event."})
+        if not os.path.exists(photo_path):
+            return JSONResponse(status_code=404, content={"error": "Image not found."})
+        return FileResponse(photo_path, media_type="image/jpeg", filename=os.path.basename(photo_path))
+
+    @app.get("/cached")
+    async def cached(request: Request):
+        stat_result, etag = file_serving_service.validators(photo_path)
+        return file_serving_service.response(request.headers, photo_path, stat_result, etag, "image/jpeg")
+
+    return app
+
+def run_scenario(client, url, headers, requests):
+    latencies = []
+    transferred = 0
+    status_code = None
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        transferred += len(response.content)
+        status_code = response.status_code
+    return status_code, latencies, transferred
+
+def run_benchmark(client, urls, requests):
+    print(f"{'handler':<10}{'scenario':<16}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'MB sent':>10}")
+    for name, url in urls.items():
+        first = client.get(url)
+        validators = {"If-None-Match": first.headers["etag"]} if "etag" in first.headers else {}
+        scenarios = {
+            "full": {},
+            "revalidate": validators,
+            "range 64KB": {"Range": "bytes=0-65535"},
+        }
+        for scenario, headers in scenarios.items():
+            status_code, latencies, transferred = run_scenario(client, url, headers, requests)
+            print(f"{name:<10}{scenario:<16}{status_code:>7}{statistics.median(latencies) * 1000:>10.2f}"
+                  f"{percentile(latencies, 0.95) * 1000:>10.2f}{transferred / 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark photo serving.")
+    parser.add_argument("--photo", help="Photo file served in-process by both handlers.")
+    parser.add_argument("--url", nargs="*", default=[], help="Photo URLs of running APIs.")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    if args.url:
+        with httpx.Client() as client:
+            run_benchmark(client, {f"url{i}": url for i, url in enumerate(args.url)}, args.requests)
+    elif args.photo:
+        with TestClient(build_app(args.photo)) as client:
+            run_benchmark(client, {"baseline": "/baseline", "cached": "/cached"}, args.requests)
+    else:
+        parser.error("Pass --photo or --url.")
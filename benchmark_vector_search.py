@@ -0,0 +1,81 @@
+"""
+Recall vs latency benchmark for the vector indexes.
+
+Samples stored vectors of an event as queries, computes the exact top-k with index scans disabled
+and compares it with the approximate top-k for each ef_search (HNSW) or probes (IVFFlat) value.
+
+Usage:
+    python benchmark_vector_search.py --event-id 1 --table images --k 10 --ef-search 10 20 40 80 160
+    python benchmark_vector_search.py --event-id 1 --table images --k 10 --probes 1 5 10 20
+"""
+import argparse
+import statistics
+import time
+from app.services.database_service import DatabaseService
+
+def sample_queries(db, table, event_id, count):
+    db.cursor.execute(
+        f"SELECT embedding FROM {table} WHERE event_id = %s ORDER BY random() LIMIT %s",
+        (event_id, count)
+    )
+    return [record["embedding"] for record in db.cursor.fetchall()]
+
+def top_k(db, table, event_id, query_vector, k, settings):
+    for setting, value in settings.items():
+        db.cursor.execute(f"SET LOCAL {setting} = %s", (value,))
+    start = time.perf_counter()
+    db.cursor.execute(
+        f"SELECT id FROM {table} WHERE event_id = %s ORDER BY embedding <=> %s LIMIT %s",
+        (event_id, query_vector, k)
+    )
+    ids = [record["id"] for record in db.cursor.fetchall()]
+    elapsed = time.perf_counter() - start
+    db.connection.rollback()  # end the transaction so SET LOCAL doesn't leak into the next run
+    return ids, elapsed
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+def run_benchmark(event_id, table, k, queries, ef_search_values, probes_values):
+    with DatabaseService() as db:
+        query_vectors = sample_queries(db, table, event_id, queries)
+        if not query_vectors:
+            print(f"No vectors found in {table} for event {event_id}.")
+            return
+
+        exact_settings = {"enable_indexscan": "off"}
+        exact = []
+        exact_latencies = []
+        for query_vector in query_vectors:
+            ids, elapsed = top_k(db, table, event_id, query_vector, k, exact_settings)
+            exact.append(set(ids))
+            exact_latencies.append(elapsed)
+
+        print(f"{len(query_vectors)} queries, top {k} in {table} for event {event_id}")
+        print(f"{'setting':<22}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        print(f"{'exact':<22}{1.0:>8.3f}{statistics.median(exact_latencies) * 1000:>10.2f}"
+              f"{percentile(exact_latencies, 0.95) * 1000:>10.2f}")
+
+        runs = [("hnsw.ef_search", value) for value in ef_search_values] + \
+               [("ivfflat.probes", value) for value in probes_values]
+        for setting, value in runs:
+            recalls = []
+            latencies = []
+            for query_vector, expected in zip(query_vectors, exact):
+                ids, elapsed = top_k(db, table, event_id, query_vector, k, {setting: value})
+                recalls.append(len(expected & set(ids)) / max(len(expected), 1))
+                latencies.append(elapsed)
+            print(f"{setting + '=' + str(value):<22}{statistics.mean(recalls):>8.3f}"
+                  f"{statistics.median(latencies) * 1000:>10.2f}{percentile(latencies, 0.95) * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency of the vector indexes.")
+    parser.add_argument("--event-id", type=int, required=True)
+    parser.add_argument("--table", default="images", choices=["images", "contexts"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[10, 20, 40, 80, 160])
+    parser.add_argument("--probes", type=int, nargs="*", default=[])
+    args = parser.parse_args()
+    run_benchmark(args.event_id, args.table, args.k, args.queries, args.ef_search, args.probes)
@@ -9,8 +9,18 @@ BASE_URL = "http://127.0.0.1:8000"
 
 def get_all_photos(event_id):
     url = f"{BASE_URL}/events/{event_id}/photos"
-    response = requests.get(url)
-    return response.json()
+    photos = []
+    params = {"limit": 1000}
+    # Follow the pages until the last one, which has no X-Next-Cursor header
+    while True:
+        response = requests.get(url, params=params)
+        if response.status_code != 200:
+            return response.json()
+        photos.extend(response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return photos
+        params["cursor"] = next_cursor
 
 def get_photo(event_id, photo_name):
     url = f"{BASE_URL}/events/{event_id}/photos/{photo_name}"
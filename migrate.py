@@ -0,0 +1,51 @@
+"""
+Upgrade the database schema with the migrations in vector_database/migrations, and check that the service
+queries are planned with indexes. Run the upgrade before starting a new version of the API.
+
+Usage:
+    python migrate.py upgrade
+    python migrate.py upgrade --target 1
+    python migrate.py status
+    python migrate.py check-plans
+"""
+import argparse
+import sys
+from app.services.migration_service import MigrationService
+from app.services.query_plan_service import QueryPlanService
+
+def upgrade(target):
+    applied = MigrationService().upgrade(target=target)
+    print(f"Applied {len(applied)} migrations: {applied}" if applied else "The database is up to date")
+
+def status():
+    for migration in MigrationService().status():
+        applied_at = migration["applied_at"] or "pending"
+        print(f"{migration['version']:04d} {migration['name']}: {applied_at}")
+
+def check_plans():
+    results = QueryPlanService().check()
+    failures = [result for result in results if result["seq_scans"]]
+    for result in results:
+        if result["seq_scans"]:
+            print(f"FAIL {result['name']}: Seq Scan on {', '.join(result['seq_scans'])}")
+        else:
+            print(f"ok   {result['name']}")
+    print(f"{len(results) - len(failures)}/{len(results)} queries use indexes")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the database schema.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply the pending migrations")
+    upgrade_parser.add_argument("--target", type=int, help="Apply the migrations up to this version")
+    subparsers.add_parser("status", help="List the migrations and whether they are applied")
+    subparsers.add_parser("check-plans", help="Fail if a service query is planned with a Seq Scan")
+
+    args = parser.parse_args()
+    if args.command == "upgrade":
+        upgrade(args.target)
+    elif args.command == "status":
+        status()
+    else:
+        sys.exit(check_plans())
@@ -0,0 +1,52 @@
+"""
+Find and purge what deleted events and photos left behind: rows and upload directories of events that
+no longer exist, and photo files of existing events without a row in the images table.
+Only reports by default, pass --purge to delete.
+
+Usage:
+    python reconcile_orphans.py
+    python reconcile_orphans.py --purge --batch-size 5000
+"""
+import argparse
+import os
+from app.services.database_service import DatabaseService
+from app.services.event_teardown_service import EventTeardownService
+from app.services.rendition_service import RenditionService
+
+def existing_event_ids():
+    with DatabaseService() as db:
+        db.cursor.execute("SELECT id FROM events ORDER BY id")
+        return [record["id"] for record in db.cursor.fetchall()]
+
+def reconcile(purge, batch_size, min_age_seconds):
+    teardown_service = EventTeardownService(batch_size=batch_size)
+    rendition_service = RenditionService()
+
+    orphan_events = teardown_service.find_orphan_events()
+    print(f"{len(orphan_events)} deleted events with leftover rows or files: {orphan_events}")
+    for event_id in orphan_events:
+        if purge:
+            deleted = teardown_service.teardown(event_id)
+            print(f"Event {event_id}: {deleted}")
+
+    orphan_files = 0
+    for event_id in existing_event_ids():
+        paths = teardown_service.find_orphan_photo_files(event_id, min_age_seconds=min_age_seconds)
+        orphan_files += len(paths)
+        if paths:
+            print(f"Event {event_id}: {len(paths)} photo files without a row")
+        if purge and paths:
+            for path in paths:
+                os.remove(path)
+            image_ids = sorted({int(os.path.splitext(os.path.basename(path))[0]) for path in paths})
+            rendition_service.remove_renditions(event_id, image_ids)
+    print(f"{orphan_files} orphan photo files" + ("" if purge else ", run with --purge to delete them"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find and purge orphan rows and files of deleted events and photos.")
+    parser.add_argument("--purge", action="store_true", help="Delete the orphans instead of only reporting them.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per transaction.")
+    parser.add_argument("--min-age", type=float, default=3600,
+                        help="Seconds a photo file must exist before it is considered an orphan.")
+    args = parser.parse_args()
+    reconcile(args.purge, args.batch_size, args.min_age)
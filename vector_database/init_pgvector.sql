@@ -1,8 +1,13 @@
 CREATE EXTENSION IF NOT EXISTS vector;
+/*
+Creates the current schema on an empty database. Existing databases are upgraded with the migrations in
+vector_database/migrations (python migrate.py upgrade), which must leave them with the same schema.
+*/
 -- Drop tables if they exist
 DROP TABLE IF EXISTS embeddings CASCADE;
 DROP TABLE IF EXISTS contexts CASCADE;
 DROP TABLE IF EXISTS documents CASCADE;
+DROP TABLE IF EXISTS image_descriptions CASCADE;
 DROP TABLE IF EXISTS images CASCADE;
 DROP TABLE IF EXISTS posts CASCADE;
 DROP TABLE IF EXISTS events CASCADE;
@@ -17,9 +22,13 @@ CREATE TABLE contexts (
     doc_id integer, -- id of the document if context_type is document
     context_type TEXT, -- main context (from text input), or text from documents
     content TEXT, 
+    content_hash TEXT, -- sha256 of content, chunks are stored once per document and once for the main context
     embedding vector(384)
 );
 
+-- Chunks are unique per owner, doc_id is NULL for the main context
+CREATE UNIQUE INDEX contexts_owner_content_hash_key ON contexts (event_id, COALESCE(doc_id, 0), content_hash);
+
 -- table to store documents for event context
 CREATE TABLE documents (
     id bigserial PRIMARY KEY, 
@@ -33,7 +42,44 @@ CREATE TABLE images (
     id bigserial PRIMARY KEY, 
     event_id integer,
     norm float,
-    embedding vector(512)
+    embedding vector(512),
+    format TEXT, -- format of the stored file (JPEG, PNG, WEBP or GIF), NULL for photos stored as PNG before it was recorded
+    content_type TEXT,
+    byte_size bigint, -- size of the stored file
+    width integer, -- resolution of the uploaded photo
+    height integer,
+    sharpness float, -- variance of the Laplacian, NULL for photos uploaded without the blur check
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Keyset pagination of the photo listing
+CREATE INDEX images_event_id_id_idx ON images (event_id, id);
+CREATE INDEX images_event_id_created_at_idx ON images (event_id, created_at, id);
+
+/*
+Approximate nearest neighbour indexes for similarity search.
+The services search with cosine distance (<=>) on normalized vectors, so the indexes use vector_cosine_ops.
+m / ef_construction trade build time and memory for recall, they can be rebuilt with other values using
+python -m app.services.vector_index_service. Scans are tuned per query with hnsw.ef_search.
+Event-scoped searches only use them with hnsw.iterative_scan (pgvector >= 0.8), see DatabaseService.uses_vector_index.
+*/
+CREATE INDEX images_embedding_hnsw_idx ON images USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX contexts_embedding_hnsw_idx ON contexts USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- every search is scoped to an event, small events are searched exactly through these indexes
+CREATE INDEX images_event_id_idx ON images (event_id);
+CREATE INDEX contexts_event_id_idx ON contexts (event_id);
+CREATE INDEX contexts_event_id_context_type_idx ON contexts (event_id, context_type);
+-- stale chunks are deleted by document when it is uploaded again
+CREATE INDEX contexts_doc_id_idx ON contexts (doc_id);
+
+-- ClipCap descriptions, generated once per image and caption model version and reused by caption generation
+CREATE TABLE image_descriptions (
+    image_id bigint REFERENCES images(id) ON DELETE CASCADE,
+    model_version TEXT,
+    description TEXT,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (image_id, model_version)
 );
 
 CREATE TABLE posts (
@@ -51,6 +97,8 @@ CREATE TABLE events (
     description TEXT
 );
 
+CREATE INDEX events_org_id_idx ON events (org_id);
+
 CREATE TABLE feedbacks (
     id bigserial PRIMARY KEY, 
     post_id integer,
@@ -60,6 +108,12 @@ CREATE TABLE feedbacks (
     created_at TIMESTAMPTZ DEFAULT now()
 );
 
+-- Event teardown deletes rows by event. contexts and images are covered by their (event_id, ...) indexes.
+CREATE INDEX documents_event_id_idx ON documents (event_id);
+CREATE INDEX posts_event_id_idx ON posts (event_id);
+-- Feedback of a post, the event_id prefix also serves event teardown
+CREATE INDEX feedbacks_event_id_post_id_idx ON feedbacks (event_id, post_id);
+
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
     first_name VARCHAR(50) NOT NULL,
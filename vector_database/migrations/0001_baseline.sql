@@ -0,0 +1,22 @@
+/*
+Columns and tables added since databases were created from an older init_pgvector.sql.
+Every statement is a no-op on a database created from the current one.
+*/
+ALTER TABLE contexts ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+ALTER TABLE images ADD COLUMN IF NOT EXISTS format TEXT;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS content_type TEXT;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS byte_size bigint;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS width integer;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS height integer;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS sharpness float;
+-- now() is evaluated once, existing rows get the time of the migration without rewriting the table
+ALTER TABLE images ADD COLUMN IF NOT EXISTS created_at timestamptz NOT NULL DEFAULT now();
+
+CREATE TABLE IF NOT EXISTS image_descriptions (
+    image_id bigint REFERENCES images(id) ON DELETE CASCADE,
+    model_version TEXT,
+    description TEXT,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (image_id, model_version)
+);
@@ -0,0 +1,33 @@
+-- migrate:no-transaction
+/*
+Indexes on the columns the services filter on, built CONCURRENTLY so reads and writes continue while they build.
+Each statement runs on its own, the migration can be run again if it is interrupted.
+*/
+
+-- Events of an organization
+CREATE INDEX CONCURRENTLY IF NOT EXISTS events_org_id_idx ON events (org_id);
+
+-- Photo search, listing (keyset pagination) and bulk deletes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS images_event_id_idx ON images (event_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS images_event_id_id_idx ON images (event_id, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS images_event_id_created_at_idx ON images (event_id, created_at, id);
+
+-- Context by event and type, chunk deduplication and stale chunks of re-uploaded documents
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contexts_event_id_idx ON contexts (event_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contexts_event_id_context_type_idx ON contexts (event_id, context_type);
+-- Chunks are unique per owner: the document, or the main context of the event (doc_id NULL)
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS contexts_owner_content_hash_key ON contexts (event_id, COALESCE(doc_id, 0), content_hash);
+-- Databases created from an earlier init_pgvector.sql made chunks unique per event
+ALTER TABLE contexts DROP CONSTRAINT IF EXISTS contexts_event_id_content_hash_key;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contexts_doc_id_idx ON contexts (doc_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_event_id_idx ON documents (event_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_event_id_idx ON posts (event_id);
+
+-- Feedback of a post, the event_id prefix also serves event teardown
+CREATE INDEX CONCURRENTLY IF NOT EXISTS feedbacks_event_id_post_id_idx ON feedbacks (event_id, post_id);
+DROP INDEX CONCURRENTLY IF EXISTS feedbacks_event_id_idx;
+
+-- Similarity search, see app/services/vector_index_service.py to rebuild them with other parameters
+CREATE INDEX CONCURRENTLY IF NOT EXISTS images_embedding_hnsw_idx ON images USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contexts_embedding_hnsw_idx ON contexts USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
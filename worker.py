@@ -0,0 +1,28 @@
+"""
+Run background jobs (photo and document ingestion) in a separate process.
+Start the API with JOB_WORKERS=0 to only run jobs in these processes.
+
+    python worker.py --threads 2
+"""
+import argparse
+import signal
+import threading
+from app.main import job_service
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Viscura background jobs.")
+    parser.add_argument("--threads", type=int, default=1, help="Number of jobs run concurrently.")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    job_service.start_workers(args.threads)
+    print(f"[JOB] Worker started with {args.threads} threads")
+    stop.wait()
+    # Running jobs are finished, or recovered by the next worker if they take too long
+    job_service.stop_workers(timeout=60)
+
+if __name__ == "__main__":
+    main()